@@ -5,7 +5,7 @@ a = Analysis(
     ['backend\\run_backend.py'],
     pathex=['backend'],
     binaries=[],
-    datas=[('backend\\core\\user_data.csv', 'core')],
+    datas=[('backend\\core\\user_data.csv', 'core'), ('backend\\reports\\config\\regras_classificacao.json', 'reports\\config')],
     hiddenimports=['server.settings', 'server.health'],
     hookspath=[],
     hooksconfig={},
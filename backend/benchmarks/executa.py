@@ -0,0 +1,267 @@
+# backend/benchmarks/executa.py
+"""
+Benchmark por etapa do pipeline da Reduzida sobre extratos sintéticos
+(benchmarks/gerador.py), sem SAP: os lookups usam respostas fabricadas a
+partir do próprio extrato.
+
+    python backend/benchmarks/executa.py --tamanhos 100k 1m --repeticoes 3
+    python backend/benchmarks/executa.py --compara antes.json depois.json
+
+Cada execução grava um JSON (ambiente + tempos por etapa) em
+runs_dir()/benchmarks, ou em --saida, para comparar com execuções anteriores.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    repo_root = Path(__file__).resolve().parents[2]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+except Exception:
+    pass
+
+import numpy as np
+import pandas as pd
+
+from backend.benchmarks.gerador import gera_extrato, linhas_do_tamanho
+from backend.core.paths import runs_dir
+from backend.reports.colunar import disponivel as colunar_disponivel, salva_colunar
+from backend.reports.escrita import salva_csv
+from backend.reports.metricas import pico_rss_mb
+from backend.reports.reduzida_etapas import (
+    ResultadosSap,
+    adiciona_colunas_novas,
+    aplica_gerencia,
+    aplica_gestor_contrato,
+    chaves_sap,
+    converte_valores,
+    filtra_expurgados,
+    preenche_bem_servico,
+    preenche_tipo_gasto,
+)
+from backend.reports.regras import carrega_regras
+from backend.reports.resumo import AcumuladorResumo
+from backend.reports.schema import YSCLNRCL, le_extrato
+
+# ordem do pipeline (reduzida.py); cada etapa recebe o df da anterior
+ETAPAS = (
+    "leitura",
+    "expurgo",
+    "valores",
+    "classificacao",
+    "enriquecimento",
+    "disciplina",
+    "resumo",
+    "escrita_csv",
+    "escrita_colunar",
+)
+
+def respostas_sap(df: pd.DataFrame) -> ResultadosSap:
+    """
+    Respostas SAP fabricadas para as chaves do extrato: todo contrato tem
+    gerente, toda ordem OR aponta para um centro E e todo centro tem gerência.
+    """
+    contratos, objetos = chaves_sap(df)
+    centros = [o for o in objetos if o.startswith("E")]
+    ordens = [o for o in objetos if o.startswith("OR")]
+    gerencias = ["LMS/OP", "POCOS/SUP", "SUB/ENG", "SH/GEO", "EXP/AEXP", "CORP/TI"]
+    return ResultadosSap(
+        gerentes_por_contrato={c: f"GERENTE {i % 97}" for i, c in enumerate(contratos)},
+        or_para_e={o: centros[i % len(centros)] for i, o in enumerate(ordens)} if centros else {},
+        gerencias_por_objeto={c: gerencias[i % len(gerencias)] for i, c in enumerate(centros)},
+    )
+
+
+def executa_pipeline(arquivo: Path, pasta_saida: Path, etapas: Tuple[str, ...]) -> Dict[str, float]:
+    """Uma passada completa; devolve {etapa: segundos}."""
+    regras = carrega_regras()
+    tempos: Dict[str, float] = {}
+    caminho_saida = pasta_saida / (arquivo.stem + "_Reduzida.txt")
+
+    def mede(nome: str, funcao: Callable[[], Any]) -> Any:
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos[nome] = time.perf_counter() - inicio
+        return resultado
+
+    # leitura, expurgo e valores são pré-requisito das demais: sempre rodam
+    df = mede("leitura", lambda: le_extrato(arquivo, YSCLNRCL))
+    df, _removidas = mede("expurgo", lambda: filtra_expurgados(df))
+    df = mede("valores", lambda: converte_valores(df))
+
+    def classificacao() -> pd.DataFrame:
+        d = preenche_tipo_gasto(adiciona_colunas_novas(df))
+        preenche_bem_servico(d, regras)
+        return d
+
+    df = mede("classificacao", classificacao)
+
+    sap = respostas_sap(df)  # fora da medição: no pipeline real vem do SAP/cache/snapshot
+    if "enriquecimento" in etapas:
+        df = mede(
+            "enriquecimento",
+            lambda: aplica_gerencia(
+                aplica_gestor_contrato(df, sap.gerentes_por_contrato),
+                sap.or_para_e,
+                sap.gerencias_por_objeto,
+            ),
+        )
+    if "disciplina" in etapas:
+        df = mede("disciplina", lambda: regras.aplica(df, "Disciplina"))
+    if "resumo" in etapas:
+        def resumo() -> pd.DataFrame:
+            acumulador = AcumuladorResumo()
+            acumulador.adiciona(df)
+            return acumulador.resultado()
+
+        mede("resumo", resumo)
+    if "escrita_csv" in etapas:
+        mede("escrita_csv", lambda: salva_csv(df, caminho_saida, formato_brasileiro=True))
+    if "escrita_colunar" in etapas and colunar_disponivel():
+        mede("escrita_colunar", lambda: salva_colunar(df, caminho_saida))
+    return {e: tempos[e] for e in ETAPAS if e in tempos}
+
+
+def _estatisticas(tempos: List[float], linhas: int) -> Dict[str, Any]:
+    mediana = median(tempos)
+    return {
+        "tempos_s": [round(t, 4) for t in tempos],
+        "min_s": round(min(tempos), 4),
+        "mediana_s": round(mediana, 4),
+        "linhas_por_s": round(linhas / mediana) if mediana > 0 else None,
+    }
+
+
+def benchmark(
+    tamanho: str,
+    semente: int = 0,
+    repeticoes: int = 3,
+    etapas: Tuple[str, ...] = ETAPAS,
+) -> Dict[str, Any]:
+    linhas = linhas_do_tamanho(tamanho)
+    inicio = time.perf_counter()
+    arquivo = gera_extrato(linhas, semente=semente)
+    geracao_s = time.perf_counter() - inicio
+
+    por_etapa: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_reduzida_") as tmp:
+        for _ in range(repeticoes):
+            for etapa, segundos in executa_pipeline(arquivo, Path(tmp), etapas).items():
+                por_etapa.setdefault(etapa, []).append(segundos)
+
+    totais = [sum(t) for t in zip(*por_etapa.values())]
+    return {
+        "tamanho": tamanho,
+        "linhas": linhas,
+        "semente": semente,
+        "arquivo": str(arquivo),
+        "arquivo_mb": round(arquivo.stat().st_size / 1e6, 1),
+        "geracao_s": round(geracao_s, 2),
+        "repeticoes": repeticoes,
+        "etapas": {e: _estatisticas(t, linhas) for e, t in por_etapa.items()},
+        "total": _estatisticas(totais, linhas),
+        "pico_rss_mb": pico_rss_mb(),
+    }
+
+
+def _commit_atual() -> Optional[str]:
+    try:
+        r = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return r.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def ambiente() -> Dict[str, Any]:
+    versoes = {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__}
+    try:
+        import pyarrow
+        versoes["pyarrow"] = pyarrow.__version__
+    except ImportError:
+        pass
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "versoes": versoes,
+        "regras": carrega_regras().versao,
+    }
+
+
+def compara(antes_path: Path, depois_path: Path) -> None:
+    """Tabela etapa a etapa (mediana) entre dois JSON de resultado."""
+    antes = json.loads(antes_path.read_text(encoding="utf-8"))
+    depois = json.loads(depois_path.read_text(encoding="utf-8"))
+    por_tamanho = {r["tamanho"]: r for r in antes["resultados"]}
+
+    print(f"antes:  {antes['ambiente'].get('commit')} ({antes['ambiente']['data']})")
+    print(f"depois: {depois['ambiente'].get('commit')} ({depois['ambiente']['data']})")
+    for r in depois["resultados"]:
+        base = por_tamanho.get(r["tamanho"])
+        if base is None:
+            continue
+        print(f"\n== {r['tamanho']} ({r['linhas']} linhas)")
+        print(f"{'etapa':<18}{'antes (s)':>12}{'depois (s)':>12}{'ganho':>9}")
+        nomes = [e for e in ETAPAS if e in r["etapas"] and e in base["etapas"]]
+        for nome, a, d in [(e, base["etapas"][e], r["etapas"][e]) for e in nomes] + [("total", base["total"], r["total"])]:
+            ganho = a["mediana_s"] / d["mediana_s"] if d["mediana_s"] else float("inf")
+            print(f"{nome:<18}{a['mediana_s']:>12.3f}{d['mediana_s']:>12.3f}{ganho:>8.2f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark por etapa da Reduzida (extratos sintéticos).")
+    parser.add_argument("--tamanhos", nargs="+", default=["100k"], help="100k, 1m, 10m ou nº de linhas")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument("--saida", help="pasta dos JSON (padrão: runs_dir()/benchmarks)")
+    parser.add_argument("--compara", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois JSON de resultado")
+    args = parser.parse_args()
+
+    if args.compara:
+        compara(Path(args.compara[0]), Path(args.compara[1]))
+        return 0
+
+    # df filtrado seguido de atribuição de coluna (igual à Reduzida): só ruído aqui
+    warnings.simplefilter("ignore", pd.errors.SettingWithCopyWarning)
+
+    resultado = {"ambiente": ambiente(), "resultados": []}
+    for tamanho in args.tamanhos:
+        print(f"== {tamanho}: gerando/reaproveitando extrato e medindo {args.repeticoes}x...", flush=True)
+        r = benchmark(tamanho, args.semente, args.repeticoes, tuple(args.etapas))
+        resultado["resultados"].append(r)
+        for etapa, est in r["etapas"].items():
+            print(f"  {etapa:<18}{est['mediana_s']:>10.3f} s  ({est['linhas_por_s']} linhas/s)")
+        print(f"  {'total':<18}{r['total']['mediana_s']:>10.3f} s  pico RSS {r['pico_rss_mb']} MB", flush=True)
+
+    pasta = Path(args.saida) if args.saida else runs_dir() / "benchmarks"
+    pasta.mkdir(parents=True, exist_ok=True)
+    destino = pasta / f"bench_{datetime.now():%Y%m%d-%H%M%S}.json"
+    destino.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[OK] {destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
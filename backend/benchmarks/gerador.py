@@ -0,0 +1,252 @@
+# backend/benchmarks/gerador.py
+"""
+Gerador de extratos YSCLNRCL sintéticos (mesmo layout do relatório do SAP)
+para medir o pipeline sem depender de arquivo real.
+
+- todas as colunas de YSCLNRCL.colunas, na ordem do SAP (inclusive a
+  "Denominação" repetida)
+- valores no formato SAP ("1,234.56-"), datas dd.mm.aaaa
+- Contrato / Objeto parceiro / Material com distribuição concentrada (poucos
+  valores respondem pela maioria das linhas, como nos extratos reais) e
+  prefixos que casam com as regras de config/regras_classificacao.json
+- determinístico: mesma semente + mesmo nº de linhas = mesmo arquivo
+
+    python backend/benchmarks/gerador.py 1m --semente 42
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+try:
+    repo_root = Path(__file__).resolve().parents[2]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+except Exception:
+    pass
+
+import numpy as np
+import pandas as pd
+
+from backend.core.paths import cache_dir
+from backend.reports.schema import YSCLNRCL
+
+TAMANHOS: Dict[str, int] = {
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+LINHAS_POR_BLOCO = 250_000
+
+# tamanho dos "vocabulários" de cada coluna (valores distintos)
+_N_CONTRATOS = 5_000
+_N_CENTROS = 800
+_N_ORDENS = 3_000
+_N_MATERIAIS = 20_000
+_N_VALORES = 50_000
+_N_TEXTOS = 2_000
+
+_SIGLAS = [
+    "LMS-A", "US-LOG-SUP", "US-SOEP", "US-AP-2", "LOEP/OP", "5331541", "53337010", "53684762",
+    "POCOS/CPM", "CPM-SUB", "EP-CPM", "E&P-CPM/X", "E&P-SERV", "SUB/OPS", "IPSUB", "SH-1", "SRGE",
+    "EXP-GEO", "AEXP", "OEXP", "CORP/TI", "RH", "FIN-CTB", "JUR",
+]
+_PREFIXOS_CENTRO = ["E8", "E9", "E5", "E7", "EI", "EJ", "E4", "EY", "EZ", "E1", "E2", "SH"]
+_UNIDADES = ["PP001", "PP013", "PP045", "PU011", "PS015", "N1002", "PC017", "PD008", "PM041", "PU431", "ZZ01", "AB12"]
+_PREFIXOS_MATERIAL = ["50", "70", "80", "10", "11", "12", "30", "99"]
+_EMPRESAS = ["1000", "1100", "2000", "3100"]
+_MOEDAS = ["BRL", "USD", "EUR"]
+_TP_DOC = ["KR", "RE", "WE", "SA", "ZP", "AB"]
+
+
+@dataclass
+class Vocabulario:
+    """Valores distintos sorteados uma vez; as linhas só escolhem índices."""
+    contratos: np.ndarray
+    centros: np.ndarray
+    ordens: np.ndarray
+    materiais: np.ndarray
+    valores: np.ndarray
+    textos: np.ndarray
+
+
+def formata_sap(valores: np.ndarray) -> np.ndarray:
+    """float -> "1,234.56" / "1,234.56-" (negativo no final, como o SAP exporta)."""
+    return np.array(
+        [f"{abs(v):,.2f}-" if v < 0 else f"{v:,.2f}" for v in valores.tolist()],
+        dtype=object,
+    )
+
+
+def vocabulario(semente: int) -> Vocabulario:
+    rng = np.random.default_rng([semente, 0])
+    centros = np.array(
+        [f"{rng.choice(_PREFIXOS_CENTRO)}{rng.integers(0, 10**5):05d}" for _ in range(_N_CENTROS)],
+        dtype=object,
+    )
+    materiais = np.array(
+        [f"{rng.choice(_PREFIXOS_MATERIAL)}{rng.integers(0, 10**6):06d}" for _ in range(_N_MATERIAIS)],
+        dtype=object,
+    )
+    # valores com cauda longa: muitos lançamentos pequenos, poucos enormes
+    valores = rng.lognormal(mean=7.0, sigma=2.5, size=_N_VALORES) * np.where(rng.random(_N_VALORES) < 0.15, -1, 1)
+    return Vocabulario(
+        contratos=np.array([f"46{n:08d}" for n in rng.choice(10**8, _N_CONTRATOS, replace=False)], dtype=object),
+        centros=centros,
+        ordens=np.array([f"OR{n:06d}" for n in rng.choice(10**6, _N_ORDENS, replace=False)], dtype=object),
+        materiais=materiais,
+        valores=formata_sap(valores),
+        textos=np.array([f"TXT {i:04d} {'ABCDEFGH'[i % 8] * (1 + i % 12)}" for i in range(_N_TEXTOS)], dtype=object),
+    )
+
+
+def _zipf(rng: np.random.Generator, n_valores: int, linhas: int, a: float = 1.3) -> np.ndarray:
+    """Índices em [0, n_valores) com distribuição concentrada (Zipf truncada)."""
+    return (rng.zipf(a, linhas) - 1) % n_valores
+
+
+def _escolhe(rng: np.random.Generator, opcoes: List[str], linhas: int, p: Optional[List[float]] = None) -> np.ndarray:
+    return np.asarray(opcoes, dtype=object)[rng.choice(len(opcoes), linhas, p=p)]
+
+
+def _com_vazios(rng: np.random.Generator, valores: np.ndarray, fracao: float) -> np.ndarray:
+    valores = valores.astype(object, copy=True)
+    valores[rng.random(len(valores)) < fracao] = ""
+    return valores
+
+
+def gera_bloco(voc: Vocabulario, semente: int, indice: int, linhas: int) -> Dict[str, np.ndarray]:
+    """Colunas de um bloco (dict nome -> array); não depende do tamanho dos outros blocos."""
+    rng = np.random.default_rng([semente, 1, indice])
+    n = linhas
+
+    ano = rng.choice([2023, 2024, 2025], n, p=[0.2, 0.5, 0.3])
+    mes = rng.integers(1, 13, n)
+    dia = rng.integers(1, 29, n)
+    datas = pd.Series(dia).map("{:02d}".format) + "." + pd.Series(mes).map("{:02d}".format) + "." + pd.Series(ano).astype(str)
+    datas = datas.to_numpy(dtype=object)
+
+    # Objeto parceiro: centros E (KS13), ordens OR (KO03) e vazios
+    tipo_obj = rng.random(n)
+    objeto = np.where(
+        tipo_obj < 0.45,
+        voc.centros[_zipf(rng, len(voc.centros), n)],
+        np.where(tipo_obj < 0.70, voc.ordens[_zipf(rng, len(voc.ordens), n)], ""),
+    ).astype(object)
+
+    contrato = voc.contratos[_zipf(rng, len(voc.contratos), n)]
+    sorteio = rng.random(n)
+    contrato = np.where(sorteio < 0.30, "", np.where(sorteio < 0.32, "*", contrato)).astype(object)
+
+    material = voc.materiais[_zipf(rng, len(voc.materiais), n, a=1.1)]
+    material = np.where(rng.random(n) < 0.05, np.char.add("  ", material.astype(str)), material).astype(object)
+
+    # Protocolo > 0 -> Direto; Doc.material 49xxxxxxxx -> Estoque
+    protocolo = np.where(rng.random(n) < 0.35, rng.integers(1, 10**6, n).astype(str), "").astype(object)
+    doc_material = np.where(
+        rng.random(n) < 0.20,
+        rng.integers(4_900_000_000, 5_000_000_000, n).astype(str),
+        np.where(rng.random(n) < 0.5, rng.integers(10**9, 4 * 10**9, n).astype(str), ""),
+    ).astype(object)
+
+    expurgado = np.where(rng.random(n) < 0.03, "X", "").astype(object)
+
+    def valor() -> np.ndarray:
+        return _com_vazios(rng, voc.valores[rng.integers(0, len(voc.valores), n)], 0.03)
+
+    def texto() -> np.ndarray:
+        return _com_vazios(rng, voc.textos[_zipf(rng, len(voc.textos), n)], 0.10)
+
+    especiais: Dict[str, np.ndarray] = {
+        "Empresa": _escolhe(rng, _EMPRESAS, n, [0.55, 0.2, 0.15, 0.1]),
+        "Exercício": ano.astype(str).astype(object),
+        "Período": mes.astype(str).astype(object),
+        "Trimestre/Ano": ((mes - 1) // 3 + 1).astype(str).astype(object) + "T/" + ano.astype(str).astype(object),
+        "Data lçto.": datas,
+        "Data documento": datas,
+        "Data Doc. Fiscal": _com_vazios(rng, datas, 0.4),
+        "Moeda do objeto": _escolhe(rng, _MOEDAS, n, [0.8, 0.15, 0.05]),
+        "Moeda da ACC": _escolhe(rng, _MOEDAS, n, [0.8, 0.15, 0.05]),
+        "Moeda transação": _escolhe(rng, _MOEDAS, n, [0.8, 0.15, 0.05]),
+        "Tp.doc.": _escolhe(rng, _TP_DOC, n),
+        "Centro": _escolhe(rng, ["1001", "1002", "2001", "3001", "4001"], n),
+        "Sigla da Gerência": _escolhe(rng, _SIGLAS, n),
+        "Código da unidade": _escolhe(rng, _UNIDADES, n),
+        "Objeto parceiro": objeto,
+        "Contrato": contrato,
+        "Material": material,
+        "Protocolo": protocolo,
+        "Doc.material": doc_material,
+        "Doc custo Expurgado": expurgado,
+        "Taxa câmbio": _escolhe(rng, ["1.0000", "5.1234", "5.4321", "6.0123"], n),
+    }
+    for col in YSCLNRCL.numericas:
+        especiais[col] = valor()
+
+    colunas: Dict[str, np.ndarray] = {}
+    for i, col in enumerate(YSCLNRCL.colunas):
+        chave = col if col not in colunas else f"{col}.{i}"  # "Denominação" repetida
+        colunas[chave] = especiais[col] if col in especiais else texto()
+    return colunas
+
+
+def caminho_padrao(linhas: int, semente: int) -> Path:
+    pasta = cache_dir() / "benchmarks"
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta / f"YSCLNRCL_{linhas}_s{semente}.txt"
+
+
+def gera_extrato(
+    linhas: int,
+    caminho: Optional[Union[str, Path]] = None,
+    semente: int = 0,
+    linhas_por_bloco: int = LINHAS_POR_BLOCO,
+    reaproveita: bool = True,
+) -> Path:
+    """
+    Grava o extrato sintético (';' / UTF-8, layout do SAP) e devolve o caminho.
+    Com reaproveita=True, um arquivo já gerado com a mesma semente e tamanho
+    é usado como está (gerar 10M linhas leva minutos).
+    """
+    destino = Path(caminho) if caminho else caminho_padrao(linhas, semente)
+    if reaproveita and destino.exists():
+        return destino
+
+    voc = vocabulario(semente)
+    tmp = destino.with_name(destino.name + ".tmp")
+    with tmp.open("w", encoding="utf-8", newline="") as f:
+        f.write(";".join(YSCLNRCL.colunas) + "\n")
+        for indice, inicio in enumerate(range(0, linhas, linhas_por_bloco)):
+            n = min(linhas_por_bloco, linhas - inicio)
+            bloco = pd.DataFrame(gera_bloco(voc, semente, indice, n))
+            bloco.to_csv(f, sep=";", index=False, header=False, lineterminator="\n")
+    tmp.replace(destino)
+    return destino
+
+
+def linhas_do_tamanho(tamanho: str) -> int:
+    """"100k" / "1m" / "10m" (ou um número) -> nº de linhas."""
+    tamanho = tamanho.strip().lower()
+    if tamanho in TAMANHOS:
+        return TAMANHOS[tamanho]
+    return int(tamanho.replace("_", ""))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Gera extrato YSCLNRCL sintético.")
+    parser.add_argument("tamanho", help="100k, 1m, 10m ou nº de linhas")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo de saída (padrão: cache_dir()/benchmarks)")
+    args = parser.parse_args()
+
+    caminho = gera_extrato(linhas_do_tamanho(args.tamanho), args.saida, args.semente, reaproveita=False)
+    print(f"[OK] {caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+# backend/benchmarks/sap.py
+"""
+Benchmark das consultas SAP (YSRELCONT / KO03 / KS13) contra a sessão
+simulada (sap_manager/simulador.py), sem SAP GUI: conta chamadas COM,
+idas ao servidor e tempo por consulta. KO03 / KS13 são as leituras em lote
+(SE16N na AUFK / CSKS); KO03_POR_ORDEM / KS13_POR_HELP são os caminhos
+antigos, mantidos como fallback.
+
+    python backend/benchmarks/sap.py --contratos 500 --ordens 300 --centros 200
+    python backend/benchmarks/sap.py --roundtrip-ms 40 --propriedade-ms 2
+    python backend/benchmarks/sap.py --fita ks13_gravado.json
+    python backend/benchmarks/sap.py --roundtrip-ms 40 --sessoes 3
+
+--sessoes N (> 1) roda também o enriquecimento inteiro (consulta_sap) em 1 e
+em N sessões simuladas (SessoesSimuladas + ExecutorSessoes) e compara o
+tempo de parede; os resultados das duas rodadas têm de ser iguais.
+
+As esperas (time.sleep) dos scripts são contadas e não esperadas, a menos
+que --esperas-reais seja passado; as esperas por prontidão
+(sap_manager/espera.py) saem por rótulo em "esperas".
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import time
+from contextlib import redirect_stdout
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    repo_root = Path(__file__).resolve().parents[2]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+except Exception:
+    pass
+
+from backend.benchmarks.executa import ambiente
+from backend.core.paths import runs_dir
+from backend.reports.enriquecimento import consulta_sap
+from backend.sap_manager.espera import drena_esperas, zera_esperas
+from backend.sap_manager.ko03 import executar_ko03, executar_ko03_por_ordem
+from backend.sap_manager.ks13 import executar_ks13, executar_ks13_por_help
+from backend.sap_manager.simulador import DadosSimulados, Latencia, SessaoSimulada, SessoesSimuladas, mede
+from backend.sap_manager.ysrelcont import executar_ysrelcont
+
+
+def _amostra(chaves: List[str], n: int, rng: random.Random) -> List[str]:
+    # ~5% de chaves inexistentes, como nos extratos reais
+    escolhidas = rng.sample(chaves, min(n, len(chaves)))
+    faltando = max(1, len(escolhidas) // 20) if escolhidas else 0
+    return escolhidas + [f"{c}X" for c in escolhidas[:faltando]]
+
+
+def executa(
+    dados: DadosSimulados,
+    latencia: Latencia,
+    n_contratos: int,
+    n_ordens: int,
+    n_centros: int,
+    esperas: str = "contadas",
+    semente: int = 0,
+) -> Dict[str, Any]:
+    rng = random.Random(semente)
+    sessao = SessaoSimulada(dados, latencia)
+    ordens = _amostra(dados.chaves_ordens(), n_ordens, rng)
+    centros = _amostra(dados.chaves_centros(), n_centros, rng)
+    consultas = [
+        ("YSRELCONT", executar_ysrelcont, _amostra(dados.chaves_contratos(), n_contratos, rng)),
+        ("KO03", executar_ko03, ordens),
+        ("KO03_POR_ORDEM", executar_ko03_por_ordem, ordens),
+        ("KS13", executar_ks13, centros),
+        ("KS13_POR_HELP", executar_ks13_por_help, centros),
+    ]
+
+    resultados: Dict[str, Any] = {}
+    for nome, funcao, chaves in consultas:
+        zera_esperas()
+        resposta, relatorio = mede(sessao, funcao, chaves, esperas=esperas)
+        resultados[nome] = {
+            "chaves": len(chaves),
+            "respostas": len(resposta or {}),
+            # a consulta pode passar por outra transação (KO03 em lote -> SE16N)
+            "transacoes": sorted(relatorio),
+            **_soma(relatorio),
+            "esperas": drena_esperas(),
+        }
+    return resultados
+
+
+def executa_paralelo(
+    dados: DadosSimulados,
+    latencia: Latencia,
+    n_contratos: int,
+    n_ordens: int,
+    n_centros: int,
+    sessoes: int,
+    semente: int = 0,
+) -> Dict[str, Any]:
+    """
+    consulta_sap inteira (YSRELCONT + KO03 -> KS13) em 1 e em `sessoes`
+    sessões simuladas, com a KO03 em lote e ordem a ordem.
+    """
+    rng = random.Random(semente)
+    contratos = _amostra(dados.chaves_contratos(), n_contratos, rng)
+    ordens = _amostra(dados.chaves_ordens(), n_ordens, rng)
+    objetos = _amostra(dados.chaves_centros(), n_centros, rng) + [f"OR{o}" for o in ordens]
+
+    resultados: Dict[str, Any] = {}
+    for ko03_lote in (True, False):
+        referencia = None
+        for n in dict.fromkeys((1, sessoes)):
+            provedor = SessoesSimuladas(dados, latencia, maximo=n)
+            inicio = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                resposta = consulta_sap(contratos, objetos, ko03_lote=ko03_lote, sessoes=n, provedor_sessoes=provedor)
+            parede = time.perf_counter() - inicio
+            if referencia is None:
+                referencia = resposta
+            elif resposta != referencia:
+                raise AssertionError(f"consulta_sap em {n} sessões diverge da sessão única (ko03_lote={ko03_lote})")
+            nome = f"{'PIPELINE' if ko03_lote else 'PIPELINE_POR_ORDEM'}_{n}S"
+            resultados[nome] = {
+                "chaves": len(contratos) + len(objetos),
+                "respostas": len(resposta.gerentes_por_contrato) + len(resposta.gerencias_por_objeto),
+                "sessoes": len(provedor.sessoes),
+                "parede_s": round(parede, 4),
+                **_soma(provedor.relatorio()),
+            }
+    return resultados
+
+
+def _soma(relatorio: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    total: Dict[str, Any] = {"chamadas": 0, "roundtrips": 0, "tempo_s": 0.0, "latencia_s": 0.0, "espera_fixa_s": 0.0}
+    for r in relatorio.values():
+        for campo in total:
+            total[campo] += r.get(campo, 0)
+    for campo in ("tempo_s", "latencia_s", "espera_fixa_s"):
+        total[campo] = round(total[campo], 4)
+    return total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark das consultas SAP na sessão simulada.")
+    parser.add_argument("--contratos", type=int, default=500, help="contratos consultados na YSRELCONT")
+    parser.add_argument("--ordens", type=int, default=300, help="ordens consultadas na KO03 (lote e ordem a ordem)")
+    parser.add_argument("--centros", type=int, default=200, help="centros consultados na KS13")
+    parser.add_argument("--roundtrip-ms", type=float, default=0.0, help="latência de press/sendVKey/select")
+    parser.add_argument("--propriedade-ms", type=float, default=0.0, help="latência das demais chamadas COM")
+    parser.add_argument("--fita", help="fita gravada (GravadorSessao) ou DadosSimulados salvos")
+    parser.add_argument("--sessoes", type=int, default=1, help="> 1: compara o enriquecimento em 1 e em N sessões simuladas")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--esperas-reais", action="store_true", help="espera de fato os time.sleep dos scripts")
+    parser.add_argument("--saida", help="pasta do JSON (padrão: runs_dir()/benchmarks)")
+    args = parser.parse_args()
+
+    if args.fita:
+        dados = DadosSimulados.carrega(args.fita)
+    else:
+        # universo maior que a consulta: o SAP responde só o que foi pedido
+        dados = DadosSimulados.sinteticos(
+            n_contratos=args.contratos * 4,
+            n_centros=args.centros * 4,
+            n_ordens=args.ordens * 4,
+            semente=args.semente,
+        )
+    latencia = Latencia(args.propriedade_ms / 1000, args.roundtrip_ms / 1000)
+
+    resultados = executa(
+        dados,
+        latencia,
+        args.contratos,
+        args.ordens,
+        args.centros,
+        esperas="reais" if args.esperas_reais else "contadas",
+        semente=args.semente,
+    )
+    if args.sessoes > 1:
+        resultados.update(executa_paralelo(
+            dados, latencia, args.contratos, args.ordens, args.centros, args.sessoes, semente=args.semente,
+        ))
+
+    print(f"{'consulta':<22}{'chaves':>8}{'resp.':>8}{'COM':>9}{'roundtrips':>12}{'tempo (s)':>11}{'latência (s)':>14}{'sleep (s)':>11}{'parede (s)':>12}")
+    for nome, r in resultados.items():
+        print(
+            f"{nome:<22}{r['chaves']:>8}{r['respostas']:>8}{r.get('chamadas', 0):>9}{r.get('roundtrips', 0):>12}"
+            f"{r.get('tempo_s', 0):>11.3f}{r.get('latencia_s', 0):>14.3f}{r.get('espera_fixa_s', 0):>11.1f}"
+            + (f"{r['parede_s']:>12.3f}" if "parede_s" in r else "")
+        )
+
+    resultado = {
+        "ambiente": ambiente(),
+        "latencia": {"propriedade_s": latencia.propriedade_s, "roundtrip_s": latencia.roundtrip_s},
+        "fita": args.fita,
+        "resultados": resultados,
+    }
+    pasta = Path(args.saida) if args.saida else runs_dir() / "benchmarks"
+    pasta.mkdir(parents=True, exist_ok=True)
+    destino = pasta / f"bench_sap_{datetime.now():%Y%m%d-%H%M%S}.json"
+    destino.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[OK] {destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
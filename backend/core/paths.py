@@ -60,6 +60,10 @@ def runs_dir() -> Path:
 def config_dir() -> Path:
     return ensure_dir(local_appdata_dir() / "config")
 
+def cache_dir() -> Path:
+    """Caches locais (ex: respostas das consultas SAP)."""
+    return ensure_dir(local_appdata_dir() / "cache")
+
 def requests_json_path() -> Path:
     """
     requests.json NÃO deve ficar dentro do frontend no exe.
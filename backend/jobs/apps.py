@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class JobsApiConfig(AppConfig):
     name = 'jobs'
+
+    def ready(self):
+        # processos das etapas de relatório sobem com o backend (imports já quentes)
+        from jobs.services.worker_pool import inicia_no_boot
+        inicia_no_boot()
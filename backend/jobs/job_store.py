@@ -26,8 +26,9 @@ def job_state_path(job_id: str) -> Path:
 def save_job_state(job: Any) -> None:
     """
     Persiste estado mínimo do job em JSON.
-    Aceita JobRuntime (do views.py).
+    Aceita JobRuntime (do views.py); com JobState, guarda também as métricas por etapa.
     """
+    state = getattr(job, "state", None)
     payload: Dict[str, Any] = {
         "job_id": getattr(job, "job_id", ""),
         "job_type": getattr(job, "job_type", ""),
@@ -37,6 +38,7 @@ def save_job_state(job: Any) -> None:
         "created_at": getattr(job, "created_at", None),
         "finished_at": getattr(job, "finished_at", None),
         "updated_at": time.time(),
+        "metricas": state.snapshot().get("metricas", []) if state is not None else [],
     }
     save_json_atomic(job_state_path(payload["job_id"]), payload)
 
@@ -3,12 +3,15 @@ from __future__ import annotations
 
 import json
 import logging
+import time
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .file_io import load_json, save_json_atomic, ensure_destino_list, set_status
-from .subprocess_runner import build_python_cmd, run_capture, spawn_stream
+from .file_io import load_json, save_json_atomic, set_status
+from .subprocess_runner import Completed, build_python_cmd, run_capture, spawn_stream
 from .state import JobState
+from .step_cache import CacheEtapas, versao_codigo, versao_regras, versao_snapshot
+from .worker_pool import ETAPAS as ETAPAS_POOL, PoolEtapas, nome_etapa
 
 import logging
 log = logging.getLogger(__name__)
@@ -16,12 +19,23 @@ log = logging.getLogger(__name__)
 log.info("Job iniciado")
 log.exception("Falha no job %s")
 
+# switches do frontend que pedem a separação por Tipo de Gasto
+SWITCHES_SPLIT = ("diretos", "indiretos", "estoques", "outros")
+
+# linha de stdout dos scripts com a métrica de uma etapa (reports/metricas.py)
+PREFIXO_METRICA = "METRIC_JSON:"
+
+# linha de stdout da Reduzida ao começar cada arquivo (reports/reduzida.py)
+PREFIXO_PROGRESSO = "PROGRESSO_JSON:"
+
+
 class JobRunner:
     """
-    Orquestra: SAP -> COMPLETA -> REDUZIDA
+    Orquestra: SAP -> COMPLETA -> REDUZIDA -> (separação por Tipo de Gasto)
 
     - Atualiza STATE (mensagens, done, logs)
-    - Usa subprocess_runner (anti-deadlock)
+    - Usa subprocess_runner (anti-deadlock) ou, com pool, os processos já
+      aquecidos do worker_pool para completa/reduzida/split
     - Escreve requests.json com IO atômico
     """
 
@@ -34,6 +48,9 @@ class JobRunner:
         reduzida_script: Path,
         creationflags: int = 0,
         logger: Optional[logging.Logger] = None,
+        step_cache: Optional[CacheEtapas] = None,
+        split_script: Optional[Path] = None,
+        pool: Optional[PoolEtapas] = None,
     ) -> None:
         self.state = state
         self.requests_path = requests_path
@@ -42,6 +59,12 @@ class JobRunner:
         self.reduzida_script = reduzida_script
         self.creationflags = creationflags
         self.log = logger or logging.getLogger(__name__)
+        self.step_cache = step_cache
+        self.split_script = split_script
+        self.pool = pool
+        # totais do resumo devolvidos em memória pela Reduzida (pool), por _Reduzida.txt
+        self._resumos: Dict[str, Dict[str, Any]] = {}
+        self._memoizada = False  # última etapa publicada do cache de etapas
 
     # --------------------
     # Helpers
@@ -62,10 +85,10 @@ class JobRunner:
             return destinos[0] if isinstance(destinos, list) else destinos
         return None
 
-    def _write_file_completa1(self, value: Any) -> None:
+    def _write_destino_files(self, files: List[str]) -> None:
+        """destino = [{file_completa1..N}]: lista que split / resumo / cache de etapas leem."""
         data = load_json(self.requests_path)
-        ensure_destino_list(data)
-        data["destino"][0]["file_completa1"] = value
+        data["destino"] = [{f"file_completa{i}": f for i, f in enumerate(files, start=1)}]
         save_json_atomic(self.requests_path, data)
 
     def _status_update(self, key: str, status: str) -> None:
@@ -78,6 +101,13 @@ class JobRunner:
             return [str(file_reduzida)]
         if isinstance(file_reduzida, list):
             return [str(x) for x in file_reduzida]
+        if isinstance(file_reduzida, dict):
+            # destino[0] do SAP/Completa: file_completa1, 2, 3... na ordem
+            chaves = sorted(
+                (k for k in file_reduzida if k.startswith("file_completa") and file_reduzida[k]),
+                key=lambda x: int(x.replace("file_completa", "") or 0),
+            )
+            return [str(file_reduzida[k]) for k in chaves]
         if file_reduzida is None:
             return []
         return [str(file_reduzida)]
@@ -98,6 +128,200 @@ class JobRunner:
         )
         return any(k in s for k in keywords)
 
+    # --------------------
+    # Métricas por etapa (eventos "metric")
+    # --------------------
+    def _publica_metrica(self, line: str) -> bool:
+        """Linha METRIC_JSON: de um script -> state.add_metrica; False se não for métrica."""
+        if not line.startswith(PREFIXO_METRICA):
+            return False
+        try:
+            metrica = json.loads(line[len(PREFIXO_METRICA):])
+        except Exception:
+            return True
+        if isinstance(metrica, dict):
+            self.state.add_metrica(metrica)
+        return True
+
+    def _publica_metricas(self, stdout: str) -> None:
+        for line in (stdout or "").splitlines():
+            self._publica_metrica(line.strip())
+
+    def _metrica_job(self, etapa: str, inicio: float, ok: bool, arquivo: str = "") -> None:
+        """Tempo total de uma etapa do job, visto pelo JobRunner (inclui subprocess/pool)."""
+        self.state.add_metrica({
+            "script": "job",
+            "arquivo": arquivo,
+            "etapa": etapa,
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "ok": ok,
+            "memoizada": self._memoizada,
+        })
+        self._memoizada = False
+
+    # --------------------
+    # Memoização das etapas (ver step_cache.py)
+    # --------------------
+    def _arquivos_destino(self, data: Dict[str, Any]) -> List[Path]:
+        """Mesma lista/ordem de arquivos que os scripts leem de destino[*].file_completaN."""
+        arquivos: List[Path] = []
+        destinos = data.get("destino", [])
+        if not isinstance(destinos, list):
+            destinos = [destinos]
+        for d in destinos:
+            if not isinstance(d, dict):
+                continue
+            chaves = sorted(
+                (k for k in d if k.startswith("file_completa")),
+                key=lambda x: int(x.replace("file_completa", "") or 0),
+            )
+            for k in chaves:
+                if d.get(k) and Path(d[k]).exists():
+                    arquivos.append(Path(d[k]))
+        return arquivos
+
+    def _path_saida(self, data: Dict[str, Any], chave: str) -> str:
+        paths = data.get("paths") or [{}]
+        return ((paths[0] if isinstance(paths, list) else paths).get(chave) or "").strip()
+
+    def _artefatos(self, etapa: str, data: Dict[str, Any], entradas: List[Path]) -> Dict[str, Path]:
+        """{nome: caminho final} de tudo que a etapa grava para estas entradas."""
+        artefatos: Dict[str, Path] = {}
+        if etapa == "completa":
+            pasta = Path(self._path_saida(data, "path2"))
+            for i, entrada in enumerate(entradas):
+                artefatos[f"xlsx:{i}"] = pasta / (entrada.stem + ".xlsx")
+                artefatos[f"parquet:{i}"] = entrada.with_suffix(".parquet")
+                artefatos[f"arrow:{i}"] = entrada.with_suffix(".arrow")
+        else:
+            pasta = Path(self._path_saida(data, "path3"))
+            for i, entrada in enumerate(entradas):
+                txt = pasta / entrada.name.replace(".txt", "_Reduzida.txt")
+                # .txt antes das cópias colunares: elas têm de ficar mais novas que ele
+                artefatos[f"txt:{i}"] = txt
+                artefatos[f"parquet:{i}"] = txt.with_suffix(".parquet")
+                artefatos[f"arrow:{i}"] = txt.with_suffix(".arrow")
+                artefatos[f"xlsx:{i}"] = txt.with_suffix(".xlsx")  # opcoes.saida_excel
+                for ext, resumo in self._resumo_reduzida(txt).items():
+                    artefatos[f"resumo_{ext}:{i}"] = resumo
+        return artefatos
+
+    def _resumo_reduzida(self, txt: Path) -> Dict[str, Path]:
+        """Arquivos do cubo de totais (reports/resumo.py) de uma _Reduzida.txt."""
+        base = txt.with_name(txt.stem + "_Resumo.txt")
+        return {ext.lstrip("."): base.with_suffix(ext) for ext in (".txt", ".parquet", ".xlsx", ".json")}
+
+    def _publica_resumo(self) -> None:
+        """Totais de cada Reduzida (x_Reduzida_Resumo.json) para a tela, sem abrir o detalhe."""
+        data = load_json(self.requests_path)
+        pasta = Path(self._path_saida(data, "path3"))
+        resumos = []
+        for entrada in self._arquivos_destino(data):
+            txt = pasta / entrada.name.replace(".txt", "_Reduzida.txt")
+            resumo = self._resumos.get(txt.name) or load_json(self._resumo_reduzida(txt)["json"], default={})
+            if resumo:
+                resumos.append(resumo)
+        if resumos:
+            self.state.set_resumo(resumos)
+
+    def _versoes(self, etapa: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        backend_root = Path(self.reduzida_script).resolve().parents[1]
+        versoes: Dict[str, Any] = {
+            "codigo": versao_codigo(backend_root),
+            "opcoes": data.get("opcoes") or {},
+        }
+        if etapa == "reduzida":
+            versoes["regras"] = versao_regras(backend_root)
+            versoes["snapshot"] = versao_snapshot()
+        return versoes
+
+    def _run_memoizado(
+        self,
+        etapa: str,
+        status_key: str,
+        executar: Callable[[], Tuple[bool, str]],
+    ) -> Tuple[bool, str]:
+        """
+        Mesma entrada + mesmas versões (código, regras, snapshot, opções) de uma
+        execução anterior: publica os artefatos guardados em vez de rodar o script.
+        """
+        if self.step_cache is None:
+            return executar()
+
+        data = load_json(self.requests_path)
+        entradas = self._arquivos_destino(data)
+        if not entradas:
+            return executar()
+
+        artefatos = self._artefatos(etapa, data, entradas)
+        chave = None
+        try:
+            versoes = self._versoes(etapa, data)
+            chave = self.step_cache.chave(etapa, entradas, versoes)
+            if self.step_cache.publica(chave, artefatos):
+                self._memoizada = True
+                self._status_update(status_key, "status_success")
+                self.state.append_log(f"{etapa.upper()}: resultado reaproveitado (mesma entrada, regras e snapshot).")
+                return True, "status_success"
+        except Exception as e:
+            self.log.warning("Cache de etapas indisponível (%s): %s", etapa, e)
+            chave = None
+
+        inicio, inicio_relogio = time.perf_counter(), time.time()
+        ok, out = executar()
+        if ok and chave:
+            try:
+                self.step_cache.grava(
+                    chave, etapa, entradas, artefatos, time.perf_counter() - inicio, versoes,
+                    desde=inicio_relogio - 1,  # folga p/ resolução de mtime do sistema de arquivos
+                )
+            except Exception as e:
+                self.log.warning("Falha ao guardar resultado da etapa %s: %s", etapa, e)
+        return ok, out
+
+    def _roda_script(
+        self,
+        script: Path,
+        on_line: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Completed, Any]:
+        """
+        Roda um script de relatório: no pool (imports já quentes, resultado em
+        memória) quando há um; senão, ou se o pool quebrar, num subprocess.
+        Com `on_line`, o stdout chega linha a linha enquanto o script roda
+        (métricas publicadas na hora, o resto vai para on_line).
+        """
+        nome = nome_etapa(script)
+        linha_a_linha = None
+        if on_line is not None:
+            def linha_a_linha(line: str) -> None:
+                line = (line or "").rstrip("\r\n").strip()
+                if not self._publica_metrica(line):
+                    on_line(line)
+
+        if self.pool is not None and nome in ETAPAS_POOL:
+            try:
+                r = self.pool.executa(nome, register_proc=self.state.register_proc, on_line=linha_a_linha)
+                if linha_a_linha is None:
+                    self._publica_metricas(r.stdout)
+                return Completed(stdout=r.stdout, stderr=r.stderr, returncode=r.returncode), r.resultado
+            except Exception as e:
+                self._cancel_point()
+                self.log.warning("Pool de etapas indisponível (%s), usando subprocess: %s", nome, e)
+
+        cmd = build_python_cmd(script)
+        if linha_a_linha is not None:
+            rc, stdout_total = spawn_stream(
+                cmd,
+                on_line=linha_a_linha,
+                creationflags=self.creationflags,
+                cancel_check=self.state.cancel_requested,
+                register_proc=self.state.register_proc,
+            )
+            return Completed(stdout=stdout_total, stderr="", returncode=rc), None
+        r = run_capture(cmd, creationflags=self.creationflags)
+        self._publica_metricas(r.stdout)
+        return r, None
+
     # --------------------
     # Steps
     # --------------------
@@ -108,6 +332,7 @@ class JobRunner:
         """
         self._cancel_point()
         destinos_dict: Optional[dict] = None
+        inicio = time.perf_counter()
 
         self.state.clear_logs()
         self.state.append_log("Iniciando SAP...")
@@ -120,6 +345,9 @@ class JobRunner:
             if line:
                 self.log.info(line)
 
+            if self._publica_metrica(line.strip()):
+                return
+
             # log UI
             if self._should_surface_sap_line(line):
                 self.state.append_log(line)
@@ -158,12 +386,18 @@ class JobRunner:
             save_json_atomic(self.requests_path, data)
 
         self.state.append_log("SAP finalizado." if ok else "SAP finalizado com erro.")
+        self._metrica_job("sap", inicio, ok)
         return ok, destinos_dict, stdout_total
 
     def run_completa(self) -> Tuple[bool, str]:
         self._cancel_point()
-        cmd = build_python_cmd(self.completa_script)
-        r = run_capture(cmd, creationflags=self.creationflags)
+        inicio = time.perf_counter()
+        ok, out = self._run_memoizado("completa", "completa_xl.py", self._executa_completa)
+        self._metrica_job("completa", inicio, ok)
+        return ok, out
+
+    def _executa_completa(self) -> Tuple[bool, str]:
+        r, _ = self._roda_script(self.completa_script)
 
         if r.stdout:
             self.log.info(r.stdout)
@@ -176,9 +410,26 @@ class JobRunner:
         return ok, r.stdout
 
     def run_reduzida(self) -> Tuple[bool, str]:
+        """Uma execução da Reduzida para todos os arquivos de destino (SAP consultado uma vez)."""
         self._cancel_point()
-        cmd = build_python_cmd(self.reduzida_script)
-        r = run_capture(cmd, creationflags=self.creationflags)
+        inicio = time.perf_counter()
+        ok, out = self._run_memoizado("reduzida", "reduzida.py", self._executa_reduzida)
+        self._metrica_job("reduzida", inicio, ok)
+        return ok, out
+
+    def _progresso_reduzida(self, line: str) -> None:
+        if not line.startswith(PREFIXO_PROGRESSO):
+            return
+        try:
+            p = json.loads(line[len(PREFIXO_PROGRESSO):])
+            self.state.set_message(f"Etapa REDUZIDA — processando {p['indice']}/{p['total']} ({p['arquivo']})")
+        except Exception:
+            pass
+
+    def _executa_reduzida(self) -> Tuple[bool, str]:
+        r, resumos = self._roda_script(self.reduzida_script, on_line=self._progresso_reduzida)
+        for resumo in resumos or []:
+            self._resumos[resumo.get("arquivo", "")] = resumo
 
         if r.stdout:
             self.log.info(r.stdout)
@@ -190,6 +441,23 @@ class JobRunner:
         ok = (r.returncode == 0) and (status == "status_success")
         return ok, r.stdout
 
+    def run_split(self) -> Tuple[bool, str]:
+        """Separa as Reduzidas por Tipo de Gasto (Direto/Indireto/Estoque/Outros) numa leitura só."""
+        self._cancel_point()
+        inicio = time.perf_counter()
+        r, _ = self._roda_script(self.split_script)
+
+        if r.stdout:
+            self.log.info(r.stdout)
+        if r.stderr:
+            self.log.error(r.stderr)
+
+        status = "status_success" if "status_success" in r.stdout else "status_error"
+        self._status_update("split_tipo_gasto.py", status)
+        ok = (r.returncode == 0) and (status == "status_success")
+        self._metrica_job("split", inicio, ok)
+        return ok, r.stdout
+
     # --------------------
     # Public orchestration
     # --------------------
@@ -235,13 +503,8 @@ class JobRunner:
                     file_completa = files
                     paths["file_completa"] = files
 
-                # compat: escreve destino[0].file_completa1
-                if isinstance(file_completa, dict):
-                    file_completa_value = file_completa.get("file_completa1") or next(iter(file_completa.values()))
-                else:
-                    file_completa_value = file_completa
-
-                self._write_file_completa1(file_completa_value)
+                # destino[0] = file_completa1..N (arquivos escolhidos na tela, ou os do SAP)
+                self._write_destino_files(self._normalize_files_iter(file_completa))
 
                 ok, _out = self.run_completa()
                 if not ok:
@@ -278,16 +541,28 @@ class JobRunner:
                     self.state.set_done(False, "Nenhum arquivo para processar na REDUZIDA.")
                     return
 
-                for idx, file_txt in enumerate(files_iter, start=1):
-                    self._cancel_point()
-                    nome = Path(file_txt).name
-                    self.state.set_message(f"Etapa REDUZIDA — executando {idx}/{total} ({nome})")
+                # uma Reduzida para a lista inteira: destino[0] = file_completa1..N
+                self._write_destino_files(files_iter)
+                self.state.set_message(f"Etapa REDUZIDA — {total} arquivo(s)...")
+                ok, _out = self.run_reduzida()
+                if not ok:
+                    self.state.set_done(False, "Falha no job REDUZIDA.")
+                    return
+
+                try:
+                    self._publica_resumo()
+                except Exception as e:
+                    self.log.warning("Falha ao ler o resumo da Reduzida: %s", e)
 
-                    self._write_file_completa1(file_txt)
-                    ok, _out = self.run_reduzida()
-                    if not ok:
-                        self.state.set_done(False, f"Falha no job REDUZIDA ({idx}/{total}).")
-                        return
+            self._cancel_point()
+
+            # 4) SEPARAÇÃO POR TIPO DE GASTO (opcional)
+            if self.split_script and any(switches.get(k) for k in SWITCHES_SPLIT):
+                self.state.set_message("Etapa SEPARAÇÃO POR TIPO DE GASTO...")
+                ok, _out = self.run_split()
+                if not ok:
+                    self.state.set_done(False, "Falha na separação por Tipo de Gasto.")
+                    return
 
             self.state.set_done(True, "Jobs concluídos em sequência.")
 
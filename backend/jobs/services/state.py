@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, asdict, field
 from threading import Event, Lock
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 import subprocess
 
 
@@ -13,6 +13,8 @@ class JobStatus:
     success: Optional[bool] = None
     message: str = ""
     logs: List[str] = field(default_factory=list)  # ✅ NOVO: logs/progresso
+    resumo: List[Dict[str, Any]] = field(default_factory=list)  # totais por Reduzida (reports/resumo.py)
+    metricas: List[Dict[str, Any]] = field(default_factory=list)  # tempo/linhas/RSS por etapa (reports/metricas.py)
 
 
 class JobState:
@@ -45,6 +47,8 @@ class JobState:
             self._status.running = True
             self._status.success = None
             self._status.message = message
+            self._status.resumo = []
+            self._status.metricas = []
             if clear_logs:
                 self._status.logs.clear()
 
@@ -80,6 +84,16 @@ class JobState:
         with self._lock:
             self._status.logs = list(lines)[-max_lines:]
 
+    # -------- resumo (totais da Reduzida) --------
+    def set_resumo(self, resumo: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._status.resumo = list(resumo)
+
+    # -------- métricas por etapa --------
+    def add_metrica(self, metrica: Dict[str, Any]) -> None:
+        with self._lock:
+            self._status.metricas.append(dict(metrica))
+
     # -------- cancelamento --------
     def request_cancel(self) -> None:
         self._cancel_event.set()
@@ -0,0 +1,295 @@
+# backend/jobs/services/step_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from core.paths import cache_dir, runs_dir
+
+from .file_io import load_json, save_json_atomic
+
+_BLOCO_HASH = 4 * 1024 * 1024
+
+LIMITE_PADRAO_MB = 10 * 1024   # artefatos guardados (xlsx/txt/parquet chegam a GB cada)
+IDADE_MAXIMA_PADRAO_DIAS = 30  # resultado sem uso há mais tempo que isso sai do cache
+
+# objeto/.tmp mais novo que isso pode ser de um grava() em andamento: a limpeza não toca
+_FOLGA_LIMPEZA_S = 3600
+
+
+def hash_arquivo(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for bloco in iter(lambda: f.read(_BLOCO_HASH), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def versao_regras(backend_root: Path) -> str:
+    """
+    "versao" declarada em reports/config/regras_classificacao.json + hash do
+    conteúdo (editar o arquivo sem mudar a versão também invalida o cache).
+    """
+    path = backend_root / "reports" / "config" / "regras_classificacao.json"
+    try:
+        conteudo = path.read_bytes()
+        versao = str(json.loads(conteudo.decode("utf-8")).get("versao", ""))
+        return f"{versao}:{hashlib.sha256(conteudo).hexdigest()[:12]}"
+    except Exception:
+        return "sem_regras"
+
+
+# pastas cujo código define a saída das etapas: reports/ gera os arquivos e
+# sap_manager/ responde os lookups (KO03/KS13/YSRELCONT) que entram na Reduzida
+_PASTAS_CODIGO = ("reports", "sap_manager")
+
+
+def versao_codigo(backend_root: Path) -> str:
+    """Hash dos scripts de reports/ e sap_manager/ (mudou o código, muda a saída)."""
+    h = hashlib.sha256()
+    for pasta in _PASTAS_CODIGO:
+        for path in sorted((backend_root / pasta).glob("*.py")):
+            h.update(f"{pasta}/{path.name}".encode("utf-8"))
+            h.update(path.read_bytes())
+    return h.hexdigest()[:12]
+
+
+def versao_snapshot() -> str:
+    """
+    Versões do snapshot de dados mestre (sap_manager/snapshot.py).
+    Sem snapshot, os lookups vêm do SAP na hora: a chave leva a data, então
+    um resultado só é reaproveitado no mesmo dia.
+    """
+    path = cache_dir() / "dados_mestres.sqlite3"
+    try:
+        if path.exists():
+            with sqlite3.connect(str(path)) as conn:
+                linhas = conn.execute(
+                    "SELECT fonte, MAX(versao) FROM snapshot_versoes GROUP BY fonte ORDER BY fonte"
+                ).fetchall()
+            if linhas:
+                return ",".join(f"{fonte}={versao}" for fonte, versao in linhas)
+    except sqlite3.Error:
+        pass
+    return f"sem_snapshot:{date.today().isoformat()}"
+
+
+class CacheEtapas:
+    """
+    Resultados memoizados das etapas do JobRunner (COMPLETA, REDUZIDA) em
+    runs_dir()/etapas.
+
+    - chave = etapa + hash do conteúdo das entradas + versões (regras, snapshot, opções)
+    - objetos/<sha256>: artefatos por conteúdo (saída idêntica = um arquivo só)
+    - manifesto.json: resultados (hashes de entrada e saída, tamanhos, tempo
+      da execução original, usos) e hash dos arquivos de entrada por (tamanho, mtime)
+    - limite_mb / idade_maxima_dias: despejo LRU depois de cada grava() (limpa())
+    """
+
+    def __init__(
+        self,
+        raiz: Optional[Path] = None,
+        limite_mb: float = LIMITE_PADRAO_MB,
+        idade_maxima_dias: float = IDADE_MAXIMA_PADRAO_DIAS,
+    ) -> None:
+        self.raiz = Path(raiz) if raiz else runs_dir() / "etapas"
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.idade_maxima_s = idade_maxima_dias * 86400
+        self.objetos = self.raiz / "objetos"
+        self.objetos.mkdir(parents=True, exist_ok=True)
+        self.manifesto_path = self.raiz / "manifesto.json"
+        self._lock = threading.Lock()
+
+    # -------- manifesto --------
+    def _le_manifesto(self) -> Dict[str, Any]:
+        m = load_json(self.manifesto_path, default={})
+        m.setdefault("resultados", {})
+        m.setdefault("hashes", {})
+        return m
+
+    def _grava_manifesto(self, m: Dict[str, Any]) -> None:
+        save_json_atomic(self.manifesto_path, m)
+
+    # -------- chaves --------
+    def hash_entrada(self, path: Path) -> str:
+        """sha256 do arquivo; reaproveita o hash se tamanho e mtime não mudaram."""
+        st = path.stat()
+        ident = str(path.resolve())
+        with self._lock:
+            m = self._le_manifesto()
+            h = m["hashes"].get(ident)
+            if h and h.get("tamanho") == st.st_size and h.get("mtime") == st.st_mtime:
+                return h["sha256"]
+
+        sha = hash_arquivo(path)
+        with self._lock:
+            m = self._le_manifesto()
+            m["hashes"][ident] = {"tamanho": st.st_size, "mtime": st.st_mtime, "sha256": sha}
+            self._grava_manifesto(m)
+        return sha
+
+    def chave(self, etapa: str, entradas: Sequence[Path], versoes: Dict[str, Any]) -> str:
+        partes = {
+            "etapa": etapa,
+            "entradas": [self.hash_entrada(p) for p in entradas],
+            "versoes": versoes,
+        }
+        return hashlib.sha256(json.dumps(partes, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # -------- objetos --------
+    def _objeto(self, sha: str) -> Path:
+        return self.objetos / sha[:2] / sha
+
+    def _guarda_objeto(self, origem: Path) -> str:
+        sha = hash_arquivo(origem)
+        destino = self._objeto(sha)
+        if not destino.exists():  # dedup: mesmo conteúdo, mesmo objeto
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            tmp = destino.with_name(destino.name + ".tmp")
+            shutil.copyfile(origem, tmp)
+            os.replace(tmp, destino)
+        return sha
+
+    # -------- API --------
+    def busca(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Resultado do manifesto se todos os artefatos ainda existem no disco."""
+        with self._lock:
+            entrada = self._le_manifesto()["resultados"].get(chave)
+        if not entrada:
+            return None
+        if not all(self._objeto(a["sha256"]).exists() for a in entrada["artefatos"]):
+            return None
+        return entrada
+
+    def publica(self, chave: str, destinos: Dict[str, Path]) -> bool:
+        """
+        Copia os artefatos da entrada para `destinos` ({nome: caminho final}).
+        Retorna False (nada publicado) se faltar entrada ou artefato.
+        """
+        entrada = self.busca(chave)
+        if entrada is None:
+            return False
+        artefatos = {a["nome"]: a for a in entrada["artefatos"]}
+        if any(nome not in destinos for nome in artefatos):
+            return False
+
+        for nome, a in artefatos.items():
+            destino = Path(destinos[nome])
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            tmp = destino.with_name(destino.name + ".tmp")
+            shutil.copyfile(self._objeto(a["sha256"]), tmp)
+            os.replace(tmp, destino)
+
+        with self._lock:
+            m = self._le_manifesto()
+            e = m["resultados"].get(chave)
+            if e is not None:
+                e["usos"] = e.get("usos", 0) + 1
+                e["ultimo_uso"] = time.time()
+                self._grava_manifesto(m)
+        return True
+
+    def grava(
+        self,
+        chave: str,
+        etapa: str,
+        entradas: Sequence[Path],
+        artefatos: Dict[str, Path],
+        duracao_s: float,
+        versoes: Dict[str, Any],
+        desde: float = 0.0,
+    ) -> None:
+        """
+        Guarda os artefatos de uma execução bem-sucedida sob `chave`.
+        Só entram arquivos gravados a partir de `desde` (sobras de execuções
+        anteriores com outras opções ficam de fora).
+        """
+        novos = [Path(p) for p in artefatos.values() if Path(p).exists() and Path(p).stat().st_mtime >= desde]
+        if sum(p.stat().st_size for p in novos) > self.limite_bytes:
+            # maior que o cache inteiro: nem copia nem calcula hash
+            return
+
+        registros: List[Dict[str, Any]] = []
+        for nome, path in artefatos.items():
+            path = Path(path)
+            if path not in novos:
+                continue
+            registros.append({"nome": nome, "sha256": self._guarda_objeto(path), "tamanho": path.stat().st_size})
+        if not registros:
+            return
+
+        hashes_entrada = [self.hash_entrada(Path(p)) for p in entradas]
+
+        with self._lock:
+            m = self._le_manifesto()
+            m["resultados"][chave] = {
+                "etapa": etapa,
+                "entradas": hashes_entrada,
+                "versoes": versoes,
+                "artefatos": registros,
+                "duracao_s": round(duracao_s, 3),
+                "criado_em": time.time(),
+                "usos": 0,
+            }
+            self._grava_manifesto(m)
+        self.limpa()
+
+    def limpa(self) -> Dict[str, int]:
+        """
+        Despejo LRU: sai do manifesto o resultado sem uso há mais de
+        idade_maxima_dias e, do menos recente para o mais recente, o que fizer
+        os objetos passarem de limite_mb; depois são apagados os objetos que
+        nenhum resultado restante usa. Devolve {"resultados": n, "objetos": n}.
+        """
+        agora = time.time()
+        with self._lock:
+            m = self._le_manifesto()
+            resultados = m["resultados"]
+            antes = len(resultados)
+
+            for chave, e in list(resultados.items()):
+                if agora - _ultimo_uso(e) > self.idade_maxima_s:
+                    del resultados[chave]
+
+            for chave in sorted(resultados, key=lambda c: _ultimo_uso(resultados[c])):
+                if _tamanho_objetos(resultados) <= self.limite_bytes:
+                    break
+                del resultados[chave]
+
+            # hash de entrada cujo arquivo já não existe não serve mais
+            m["hashes"] = {p: h for p, h in m["hashes"].items() if Path(p).exists()}
+            self._grava_manifesto(m)
+            vivos = {a["sha256"] for e in resultados.values() for a in e["artefatos"]}
+            despejados = antes - len(resultados)
+
+        apagados = 0
+        for objeto in self.objetos.glob("*/*"):
+            nome = objeto.name[:-len(".tmp")] if objeto.name.endswith(".tmp") else objeto.name
+            if nome in vivos and not objeto.name.endswith(".tmp"):
+                continue
+            try:
+                if agora - objeto.stat().st_mtime < _FOLGA_LIMPEZA_S:
+                    continue
+                objeto.unlink()
+                apagados += 1
+            except OSError:
+                pass
+        return {"resultados": despejados, "objetos": apagados}
+
+
+def _ultimo_uso(entrada: Dict[str, Any]) -> float:
+    return entrada.get("ultimo_uso") or entrada.get("criado_em", 0.0)
+
+
+def _tamanho_objetos(resultados: Dict[str, Dict[str, Any]]) -> int:
+    """Bytes dos objetos usados pelos resultados (objeto compartilhado conta uma vez)."""
+    tamanhos = {a["sha256"]: a.get("tamanho", 0) for e in resultados.values() for a in e["artefatos"]}
+    return sum(tamanhos.values())
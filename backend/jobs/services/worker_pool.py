@@ -0,0 +1,365 @@
+# backend/jobs/services/worker_pool.py
+"""
+Pool de processos de longa duração para as etapas de relatório
+(completa_xl / reduzida / split_tipo_gasto).
+
+Cada etapa por subprocess (build_python_cmd + run_capture) paga a
+importação de pandas, openpyxl, pyarrow e win32com a cada arquivo. Aqui os
+processos sobem uma vez, no boot do backend, com esses imports já feitos;
+o job só manda "roda a etapa X" e recebe de volta stdout e o resultado
+em memória.
+
+- a etapa roda a função main()/executa() do script (mesmo contrato do
+  subprocess: lê o requests.json do AppData e imprime status_success/error)
+- AUTOCL_POOL_ETAPAS=0 desliga o pool (volta ao subprocess por arquivo)
+- AUTOCL_POOL_ETAPAS_WORKERS: nº de processos (padrão: 1; as etapas de um
+  job rodam em sequência, mais processos só ajudam com jobs simultâneos)
+- módulo da etapa que não importa no processo (EtapaIndisponivel) sobe como
+  exceção: o JobRunner cai no subprocess
+- código de reports/ ou sap_manager/ alterado desde que o pool subiu: os
+  processos são recriados antes da próxima etapa (nada de módulo velho)
+- executa(..., on_line=cb): cada linha de stdout chega ao backend enquanto a
+  etapa roda (fila do pool), como no spawn_stream do subprocess
+"""
+from __future__ import annotations
+
+import importlib
+import io
+import itertools
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+# nome do script (build_python_cmd usa o mesmo stem) -> módulo importável
+ETAPAS: Dict[str, str] = {
+    "completa_xl": "backend.reports.completa_xl",
+    "reduzida": "backend.reports.reduzida",
+    "split_tipo_gasto": "backend.reports.split_tipo_gasto",
+}
+
+# importados no início de cada processo (o que custa segundos por subprocess)
+AQUECIMENTO = ("numpy", "pandas", "openpyxl", "pyarrow", "win32com.client")
+
+
+class EtapaIndisponivel(RuntimeError):
+    """O módulo da etapa não importa no processo do pool."""
+
+
+@dataclass
+class ResultadoEtapa:
+    stdout: str
+    stderr: str
+    returncode: int
+    resultado: Any = None  # o que executa() devolve além do código de saída
+
+
+# =========================================================
+# Lado do processo de trabalho
+# =========================================================
+
+_FILA = None  # linhas de stdout -> backend (herdada do PoolEtapas no início do processo)
+
+
+# marca do processo de trabalho: o script da etapa não abre processos próprios
+# (netos importariam tudo a frio e sobreviveriam ao interrompe())
+ENV_PROCESSO_POOL = "AUTOCL_PROCESSO_POOL"
+
+
+def _inicializa(repo_root: str, fila=None) -> None:
+    global _FILA
+    _FILA = fila
+    os.environ[ENV_PROCESSO_POOL] = "1"
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    for nome in AQUECIMENTO + tuple(ETAPAS.values()):
+        try:
+            importlib.import_module(nome)
+        except Exception:
+            # dependência opcional (pyarrow) ou fora do Windows (win32com):
+            # a etapa que precisar dela falha no próprio run, como no subprocess
+            pass
+
+
+def _aquecido() -> int:
+    return os.getpid()
+
+
+class _SaidaPorLinha(io.StringIO):
+    """stdout da etapa: guarda tudo e manda cada linha completa para a fila do backend."""
+
+    def __init__(self, token: Optional[int]) -> None:
+        super().__init__()
+        self._token = token
+        self._pendente = ""
+
+    def write(self, texto: str) -> int:
+        n = super().write(texto)
+        if self._token is not None and _FILA is not None:
+            self._pendente += texto
+            *linhas, self._pendente = self._pendente.split("\n")
+            for linha in linhas:
+                self._envia(linha)
+        return n
+
+    def fim(self) -> None:
+        if self._token is None or _FILA is None:
+            return
+        if self._pendente:
+            self._envia(self._pendente)
+            self._pendente = ""
+        self._envia(None)  # fim da etapa: o backend para de esperar linhas
+
+    def _envia(self, linha: Optional[str]) -> None:
+        try:
+            _FILA.put((self._token, linha))
+        except Exception:
+            pass
+
+
+def _executa_etapa(nome: str, token: Optional[int] = None) -> ResultadoEtapa:
+    saida, erros = _SaidaPorLinha(token), io.StringIO()
+    resultado = None
+    with redirect_stdout(saida), redirect_stderr(erros):
+        try:
+            modulo = importlib.import_module(ETAPAS[nome])
+        except Exception as e:
+            # não é falha da etapa: o módulo nem carregou (dependência, erro no import)
+            raise EtapaIndisponivel(f"{ETAPAS[nome]}: {e!r}") from None
+        try:
+            if hasattr(modulo, "executa"):
+                retorno, resultado = modulo.executa()
+            else:
+                retorno = modulo.main()
+            returncode = int(retorno or 0)
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+    saida.fim()
+    return ResultadoEtapa(saida.getvalue(), erros.getvalue(), returncode, resultado)
+
+
+# =========================================================
+# Lado do backend
+# =========================================================
+
+def assinatura_codigo() -> Tuple[Tuple[str, int], ...]:
+    """(arquivo, mtime) dos módulos que os processos do pool carregam."""
+    backend_root = Path(__file__).resolve().parents[2]
+    arquivos = sorted(
+        [*(backend_root / "reports").glob("*.py"), *(backend_root / "sap_manager").glob("*.py")]
+    )
+    assinatura = []
+    for path in arquivos:
+        try:
+            assinatura.append((str(path), path.stat().st_mtime_ns))
+        except OSError:
+            pass
+    return tuple(assinatura)
+
+
+class _ProcessoEtapa:
+    """
+    Visão "Popen" (poll/terminate) de uma etapa em andamento, para o
+    JobState.register_proc: cancelar o job derruba os processos do pool,
+    que é recriado na próxima etapa.
+    """
+
+    def __init__(self, pool: "PoolEtapas", futuro: Future) -> None:
+        self._pool = pool
+        self._futuro = futuro
+
+    def poll(self) -> Optional[int]:
+        return 0 if self._futuro.done() else None
+
+    def terminate(self) -> None:
+        self._pool.interrompe()
+
+
+class PoolEtapas:
+    def __init__(self, workers: int = 1) -> None:
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._assinatura: Tuple[Tuple[str, int], ...] = ()
+        self._fila = None
+        self._lock = threading.Lock()
+        self._tokens = itertools.count(1)
+        # token da execução -> (callback de linha, evento "etapa terminou de escrever")
+        self._ouvintes: Dict[int, Tuple[Callable[[str], None], threading.Event]] = {}
+
+    def _garante(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                repo_root = str(Path(__file__).resolve().parents[3])
+                self._assinatura = assinatura_codigo()
+                contexto = multiprocessing.get_context()
+                self._fila = contexto.Queue()
+                threading.Thread(target=self._le_fila, args=(self._fila,), daemon=True, name="pool-etapas-stdout").start()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=contexto,
+                    initializer=_inicializa,
+                    initargs=(repo_root, self._fila),
+                )
+            return self._executor
+
+    def _le_fila(self, fila) -> None:
+        while True:
+            try:
+                item = fila.get()
+            except Exception:
+                return
+            if item is None:  # _descarta: executor antigo, fila antiga
+                return
+            token, linha = item
+            ouvinte = self._ouvintes.get(token)
+            if ouvinte is None:
+                continue
+            callback, fim = ouvinte
+            if linha is None:
+                fim.set()
+                continue
+            try:
+                callback(linha)
+            except Exception:
+                pass
+
+    def inicia(self) -> None:
+        """Sobe os processos agora (o executor só cria processos no 1º submit)."""
+        executor = self._garante()
+        for _ in range(self.workers):
+            executor.submit(_aquecido)
+
+    def submete(self, nome: str, token: Optional[int] = None) -> Future:
+        if nome not in ETAPAS:
+            raise KeyError(f"Etapa sem módulo importável: {nome}")
+        if self._executor is not None and assinatura_codigo() != self._assinatura:
+            log.info("Código das etapas alterado: recriando o pool de etapas.")
+            self._descarta()
+        try:
+            return self._garante().submit(_executa_etapa, nome, token)
+        except BrokenProcessPool:
+            self._descarta()
+            return self._garante().submit(_executa_etapa, nome, token)
+
+    def executa(
+        self,
+        nome: str,
+        register_proc=None,
+        on_line: Optional[Callable[[str], None]] = None,
+    ) -> ResultadoEtapa:
+        token, fim = None, None
+        if on_line is not None:
+            token, fim = next(self._tokens), threading.Event()
+            self._ouvintes[token] = (on_line, fim)
+        try:
+            futuro = self.submete(nome, token)
+            if register_proc:
+                try:
+                    register_proc(_ProcessoEtapa(self, futuro))
+                except Exception:
+                    pass
+            try:
+                resultado = futuro.result()
+            except BrokenProcessPool:
+                # processo morreu (cancelamento, falta de memória): o próximo uso recria
+                self._descarta()
+                raise
+            if fim is not None:
+                # as últimas linhas podem chegar depois do resultado
+                fim.wait(timeout=5)
+            return resultado
+        finally:
+            if token is not None:
+                self._ouvintes.pop(token, None)
+
+    def interrompe(self) -> None:
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            return
+        for processo in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                processo.terminate()
+            except Exception:
+                pass
+        self._descarta()
+
+    def _descarta(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            fila, self._fila = self._fila, None
+        if fila is not None:
+            try:
+                fila.put(None)
+            except Exception:
+                pass
+        if executor is not None:
+            try:
+                executor.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
+
+    def encerra(self) -> None:
+        self._descarta()
+
+
+_POOL: Optional[PoolEtapas] = None
+_POOL_LOCK = threading.Lock()
+
+
+def pool_habilitado() -> bool:
+    return os.environ.get("AUTOCL_POOL_ETAPAS", "1").strip() != "0"
+
+
+def pool_etapas() -> Optional[PoolEtapas]:
+    """Pool do processo (criado no boot ou no 1º uso); None se desligado."""
+    global _POOL
+    if not pool_habilitado():
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            try:
+                workers = int(os.environ.get("AUTOCL_POOL_ETAPAS_WORKERS", "1") or 1)
+            except ValueError:
+                workers = 1
+            _POOL = PoolEtapas(workers)
+        return _POOL
+
+
+def inicia_no_boot() -> None:
+    """
+    Chamado no ready() do app jobs: aquece o pool só no processo que atende
+    o servidor (run_backend.py ou runserver sem o processo pai do autoreload),
+    não em migrate/shell/check.
+    """
+    servidor = os.environ.get("AUTOCL_SERVIDOR") == "1" or (
+        "runserver" in sys.argv and ("--noreload" in sys.argv or os.environ.get("RUN_MAIN") == "true")
+    )
+    if not servidor:
+        return
+    pool = pool_etapas()
+    if pool is None:
+        return
+    try:
+        pool.inicia()
+        log.info("Pool de etapas iniciado (%s processo(s)).", pool.workers)
+    except Exception as e:
+        log.warning("Pool de etapas indisponível, etapas rodam por subprocess: %s", e)
+
+
+def nome_etapa(script: Union[str, Path]) -> str:
+    """reports/reduzida.py -> "reduzida" (mesma regra do build_python_cmd)."""
+    return Path(script).stem
@@ -1,3 +1,203 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from jobs.services import step_cache
+from jobs.services.job_runner import JobRunner
+from jobs.services.state import JobState
+from jobs.services.step_cache import CacheEtapas
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+class RunMemoizadoTests(SimpleTestCase):
+    """Cache de etapas visto pelo JobRunner: mesma entrada publica, qualquer mudança roda de novo."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.pasta = Path(self._tmp.name)
+        # snapshot de dados mestre (versao_snapshot) procurado no AppData temporário
+        patcher = mock.patch.dict(os.environ, {"LOCALAPPDATA": str(self.pasta / "appdata")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp.cleanup)
+
+        self.entrada = self.pasta / "sap" / "extrato.txt"
+        self.entrada.parent.mkdir()
+        self.entrada.write_text("Contrato;Valor\n4600000001;1.00\n", encoding="utf-8")
+        self.saida = self.pasta / "reduzida"
+
+        self.requests_path = self.pasta / "requests.json"
+        self._grava_requests(opcoes={})
+        self.cache = CacheEtapas(self.pasta / "etapas")
+        self.runner = self._runner(self.cache)
+        self.execucoes = 0
+
+    def _grava_requests(self, opcoes):
+        data = {
+            "paths": [{"path2": str(self.pasta / "completa"), "path3": str(self.saida)}],
+            "destino": [{"file_completa1": str(self.entrada)}],
+            "status": [{}],
+            "opcoes": opcoes,
+        }
+        self.requests_path.write_text(json.dumps(data), encoding="utf-8")
+
+    def _runner(self, cache):
+        reports = BACKEND / "reports"
+        return JobRunner(
+            state=JobState(),
+            requests_path=self.requests_path,
+            sap_script=BACKEND / "sap_manager" / "ysclnrcL_job.py",
+            completa_script=reports / "completa_xl.py",
+            reduzida_script=reports / "reduzida.py",
+            step_cache=cache,
+        )
+
+    def _executa(self, ok=True):
+        """Faz o papel do reduzida.py: grava a _Reduzida.txt a partir da entrada."""
+        def executar():
+            self.execucoes += 1
+            self.saida.mkdir(exist_ok=True)
+            conteudo = self.entrada.read_text(encoding="utf-8").upper()
+            (self.saida / "extrato_Reduzida.txt").write_text(conteudo, encoding="utf-8")
+            return ok, "status_success" if ok else "status_error"
+        return executar
+
+    def _roda(self, ok=True):
+        return self.runner._run_memoizado("reduzida", "reduzida.py", self._executa(ok))
+
+    @property
+    def reduzida(self):
+        return self.saida / "extrato_Reduzida.txt"
+
+    def test_miss_depois_publica(self):
+        self.assertEqual(self._roda(), (True, "status_success"))
+        self.assertEqual(self.execucoes, 1)
+        self.assertFalse(self.runner._memoizada)
+        esperado = self.reduzida.read_bytes()
+
+        self.reduzida.unlink()
+        self.assertEqual(self._roda(), (True, "status_success"))
+        self.assertEqual(self.execucoes, 1)
+        self.assertTrue(self.runner._memoizada)
+        self.assertEqual(self.reduzida.read_bytes(), esperado)
+
+        data = json.loads(self.requests_path.read_text(encoding="utf-8"))
+        self.assertEqual(data["status"][0]["reduzida.py"], "status_success")
+
+    def test_entrada_alterada_roda_de_novo(self):
+        self._roda()
+        self.entrada.write_text("Contrato;Valor\n4600000002;2.00\n", encoding="utf-8")
+        self._roda()
+        self.assertEqual(self.execucoes, 2)
+        self.assertIn("4600000002", self.reduzida.read_text(encoding="utf-8"))
+
+    def test_opcoes_alteradas_roda_de_novo(self):
+        self._roda()
+        self._grava_requests(opcoes={"saida_excel": True})
+        self._roda()
+        self.assertEqual(self.execucoes, 2)
+
+    def test_falha_nao_guarda(self):
+        self.assertEqual(self._roda(ok=False), (False, "status_error"))
+        self._roda()
+        self.assertEqual(self.execucoes, 2)
+
+    def test_codigo_sap_alterado_roda_de_novo(self):
+        self._roda()
+        real = step_cache.versao_codigo(BACKEND)
+        with tempfile.TemporaryDirectory() as tmp:
+            copia = Path(tmp)
+            for pasta in ("reports", "sap_manager"):
+                (copia / pasta).mkdir()
+                for path in (BACKEND / pasta).glob("*.py"):
+                    (copia / pasta / path.name).write_bytes(path.read_bytes())
+            self.assertEqual(step_cache.versao_codigo(copia), real)
+            with (copia / "sap_manager" / "ko03.py").open("a", encoding="utf-8") as f:
+                f.write("\n# alterado\n")
+            alterada = step_cache.versao_codigo(copia)
+        self.assertNotEqual(alterada, real)
+
+        with mock.patch("jobs.services.job_runner.versao_codigo", return_value=alterada):
+            self._roda()
+        self.assertEqual(self.execucoes, 2)
+
+    def test_sem_cache_sempre_roda(self):
+        self.runner = self._runner(None)
+        self._roda()
+        self._roda()
+        self.assertEqual(self.execucoes, 2)
+        self.assertFalse((self.pasta / "etapas" / "manifesto.json").exists())
+
+
+class LimpezaCacheEtapasTests(SimpleTestCase):
+    """Despejo LRU do CacheEtapas por tamanho e por idade."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.pasta = Path(self._tmp.name)
+        # objetos recém-gravados também podem sair (a folga protege grava() em andamento)
+        patcher = mock.patch.object(step_cache, "_FOLGA_LIMPEZA_S", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _grava(self, cache, nome, tamanho):
+        entrada = self.pasta / f"{nome}.txt"
+        entrada.write_text(nome, encoding="utf-8")
+        artefato = self.pasta / f"{nome}_Reduzida.txt"
+        artefato.write_bytes(nome.encode("utf-8") * (tamanho // len(nome)))
+        chave = cache.chave("reduzida", [entrada], {})
+        cache.grava(chave, "reduzida", [entrada], {"txt:0": artefato}, 1.0, {})
+        return chave
+
+    def _objetos(self, cache):
+        return list(cache.objetos.glob("*/*"))
+
+    def test_despeja_o_menos_usado_acima_do_limite(self):
+        cache = CacheEtapas(self.pasta / "etapas", limite_mb=2.5)
+        a = self._grava(cache, "a", 1024 * 1024)
+        b = self._grava(cache, "b", 1024 * 1024)
+        # "a" reaproveitado depois de "b": "b" é o menos recente
+        self.assertTrue(cache.publica(a, {"txt:0": self.pasta / "publicado.txt"}))
+        c = self._grava(cache, "c", 1024 * 1024)
+
+        self.assertIsNotNone(cache.busca(a))
+        self.assertIsNone(cache.busca(b))
+        self.assertIsNotNone(cache.busca(c))
+        self.assertEqual(len(self._objetos(cache)), 2)
+
+    def test_resultado_maior_que_o_limite_nao_entra(self):
+        cache = CacheEtapas(self.pasta / "etapas", limite_mb=1)
+        chave = self._grava(cache, "grande", 2 * 1024 * 1024)
+        self.assertIsNone(cache.busca(chave))
+        self.assertEqual(self._objetos(cache), [])
+
+    def test_despeja_pela_idade(self):
+        cache = CacheEtapas(self.pasta / "etapas", idade_maxima_dias=1)
+        velho = self._grava(cache, "velho", 1024)
+        novo = self._grava(cache, "novo", 1024)
+
+        relogio = mock.Mock()
+        relogio.time.return_value = time.time() + 2 * 86400
+        with mock.patch.object(step_cache, "time", relogio):
+            with cache._lock:
+                m = cache._le_manifesto()
+                m["resultados"][novo]["ultimo_uso"] = relogio.time()
+                cache._grava_manifesto(m)
+            self.assertEqual(cache.limpa(), {"resultados": 1, "objetos": 1})
+
+        self.assertIsNone(cache.busca(velho))
+        self.assertIsNotNone(cache.busca(novo))
+
+    def test_hash_de_entrada_apagada_sai_do_manifesto(self):
+        cache = CacheEtapas(self.pasta / "etapas")
+        self._grava(cache, "a", 1024)
+        (self.pasta / "a.txt").unlink()
+        cache.limpa()
+        self.assertEqual(cache._le_manifesto()["hashes"], {})
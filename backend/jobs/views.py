@@ -15,6 +15,8 @@ from django.views.decorators.csrf import csrf_exempt
 from jobs.services.job_runner import JobRunner
 from jobs.services.state import JobState
 from jobs.services.file_io import save_json_atomic
+from jobs.services.step_cache import IDADE_MAXIMA_PADRAO_DIAS, LIMITE_PADRAO_MB, CacheEtapas
+from jobs.services.worker_pool import pool_etapas
 from jobs.job_store import save_job_state
 
 import logging
@@ -99,6 +101,14 @@ class SSEJobState(JobState):
         if line:
             _emit(self._job, "log", line)
 
+    def set_resumo(self, resumo: List[Dict[str, Any]]) -> None:
+        super().set_resumo(resumo)
+        _emit(self._job, "resumo", resumo)
+
+    def add_metrica(self, metrica: Dict[str, Any]) -> None:
+        super().add_metrica(metrica)
+        _emit(self._job, "metric", metrica)
+
     def set_done(self, success: bool, message: str) -> None:
         super().set_done(success, message)
         final_status = "success" if success else "error"
@@ -139,6 +149,12 @@ def _normalize_requests(payload: dict) -> list:
     return r if isinstance(r, list) else []
 
 
+def _normalize_opcoes(payload: dict) -> dict:
+    # opções finas dos scripts (ex: reduzida_streaming); ausente = padrão de cada script
+    o = payload.get("opcoes") or {}
+    return o if isinstance(o, dict) else {}
+
+
 # =========================
 # Worker -> JobRunner
 # =========================
@@ -156,6 +172,7 @@ def _run_job_worker(job: JobRuntime, payload: dict) -> None:
         sap_script = backend_root / "sap_manager" / "ysclnrcl_job.py"
         completa_script = backend_root / "reports" / "completa_xl.py"
         reduzida_script = backend_root / "reports" / "reduzida.py"
+        split_script = backend_root / "reports" / "split_tipo_gasto.py"
 
         data_dir = backend_root / "data"
         data_dir.mkdir(parents=True, exist_ok=True)
@@ -164,6 +181,7 @@ def _run_job_worker(job: JobRuntime, payload: dict) -> None:
         paths = _normalize_paths(payload)
         switches = _normalize_switches(payload, job.job_type)
         requests = _normalize_requests(payload)
+        opcoes = _normalize_opcoes(payload)
 
         save_json_atomic(
             requests_path,
@@ -172,6 +190,8 @@ def _run_job_worker(job: JobRuntime, payload: dict) -> None:
                 "requests": requests,
                 "status": [{}],
                 "destino": [],
+                "opcoes": opcoes,
+                "switches": switches,
             },
         )
 
@@ -197,6 +217,15 @@ def _run_job_worker(job: JobRuntime, payload: dict) -> None:
             completa_script=completa_script,
             reduzida_script=reduzida_script,
             creationflags=0,
+            # memoizacao_etapas=false força COMPLETA/REDUZIDA a rodarem sempre (nenhum hash/cópia)
+            # memoizacao_etapas_limite_mb / _dias: tamanho máximo e idade (sem uso) do cache
+            step_cache=CacheEtapas(
+                limite_mb=float(opcoes.get("memoizacao_etapas_limite_mb", LIMITE_PADRAO_MB)),
+                idade_maxima_dias=float(opcoes.get("memoizacao_etapas_dias", IDADE_MAXIMA_PADRAO_DIAS)),
+            ) if opcoes.get("memoizacao_etapas", True) else None,
+            split_script=split_script,
+            # pool_etapas=false roda completa/reduzida/split num subprocess por arquivo
+            pool=pool_etapas() if opcoes.get("pool_etapas", True) else None,
         )
 
         runner.run_sequence(
@@ -0,0 +1,207 @@
+# backend/reports/colunar.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:  # pyarrow é opcional: sem ele, só o .txt é gravado/lido
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pa_ipc = None
+    pq = None
+
+FORMATOS = ("parquet", "arrow")
+
+_EXTENSOES = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def disponivel() -> bool:
+    return pa is not None
+
+
+def caminho_colunar(caminho_txt: Union[str, Path], formato: str) -> Path:
+    """x_Reduzida.txt -> x_Reduzida.parquet / x_Reduzida.arrow (mesma pasta)."""
+    return Path(caminho_txt).with_suffix(_EXTENSOES[formato])
+
+
+def nomes_unicos(colunas: Iterable[str]) -> List[str]:
+    """
+    Parquet/Arrow não aceitam nome de coluna repetido: a 2ª "Denominação"
+    vira "Denominação.1", igual ao que o read_csv faz com o .txt.
+    """
+    vistos: dict = {}
+    nomes = []
+    for c in colunas:
+        n = vistos.get(c, 0)
+        nomes.append(c if n == 0 else f"{c}.{n}")
+        vistos[c] = n + 1
+    return nomes
+
+
+def _tipo_arrow(serie: pd.Series):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return pa.dictionary(pa.int32(), pa.string())
+    if pd.api.types.is_bool_dtype(serie):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(serie):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(serie):
+        return pa.float64()
+    return pa.string()
+
+
+class EscritorColunar:
+    """
+    Grava um DataFrame (ou uma sequência de blocos com as mesmas colunas) em
+    Parquet e/ou Arrow IPC ao lado do .txt.
+
+    - o schema é fixado no primeiro bloco (texto, float, category)
+    - Parquet mantém as colunas category como dicionário
+    - Arrow IPC (arquivo) só aceita um dicionário por coluna: lá as category
+      vão como texto; quem lê pede as categorias de volta (ver le_colunar)
+    - grava em .tmp e só renomeia no fecha(): arquivo parcial nunca é lido
+    """
+
+    def __init__(self, caminho_txt: Union[str, Path], formatos: Sequence[str] = FORMATOS) -> None:
+        if not disponivel():
+            raise RuntimeError("pyarrow não está instalado: saída colunar indisponível.")
+        self.destinos = {f: caminho_colunar(caminho_txt, f) for f in formatos}
+        self._schema = None
+        self._schema_ipc = None
+        self._parquet = None
+        self._ipc = None
+
+    def _tmp(self, formato: str) -> Path:
+        destino = self.destinos[formato]
+        return destino.with_name(destino.name + ".tmp")
+
+    def _abre(self, bloco: pd.DataFrame) -> None:
+        self._schema = pa.schema([(c, _tipo_arrow(bloco.iloc[:, i])) for i, c in enumerate(bloco.columns)])
+        self._schema_ipc = pa.schema(
+            [pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f for f in self._schema]
+        )
+        if "parquet" in self.destinos:
+            self._parquet = pq.ParquetWriter(str(self._tmp("parquet")), self._schema, compression="snappy")
+        if "arrow" in self.destinos:
+            self._ipc = pa_ipc.new_file(str(self._tmp("arrow")), self._schema_ipc)
+
+    def escreve(self, bloco: pd.DataFrame) -> None:
+        bloco = bloco.set_axis(nomes_unicos(bloco.columns), axis=1)
+        if self._schema is None:
+            self._abre(bloco)
+        tabela = pa.Table.from_pandas(bloco, schema=self._schema, preserve_index=False)
+        if self._parquet is not None:
+            self._parquet.write_table(tabela)
+        if self._ipc is not None:
+            self._ipc.write_table(tabela.cast(self._schema_ipc))
+
+    def fecha(self) -> None:
+        for formato, escritor in (("parquet", self._parquet), ("arrow", self._ipc)):
+            if escritor is not None:
+                escritor.close()
+                self._tmp(formato).replace(self.destinos[formato])
+        self._parquet = self._ipc = None
+
+    def descarta(self) -> None:
+        for formato, escritor in (("parquet", self._parquet), ("arrow", self._ipc)):
+            if escritor is not None:
+                try:
+                    escritor.close()
+                except Exception:
+                    pass
+                self._tmp(formato).unlink(missing_ok=True)
+        self._parquet = self._ipc = None
+
+    def __enter__(self) -> "EscritorColunar":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.fecha()
+        else:
+            self.descarta()
+
+
+def salva_colunar(
+    df: pd.DataFrame,
+    caminho_txt: Union[str, Path],
+    formatos: Sequence[str] = FORMATOS,
+) -> None:
+    """Grava df inteiro em Parquet/Arrow ao lado do .txt."""
+    with EscritorColunar(caminho_txt, formatos) as escritor:
+        escritor.escreve(df)
+
+
+def colunar_atual(caminho_txt: Union[str, Path]) -> Optional[Path]:
+    """
+    Arquivo colunar irmão do .txt que pode substituí-lo na leitura:
+    Arrow (mapeado em memória) antes de Parquet, e só se não for mais
+    antigo que o .txt (txt regerado sem colunar -> vale o txt).
+    """
+    if not disponivel():
+        return None
+    txt = Path(caminho_txt)
+    mtime_txt = txt.stat().st_mtime if txt.exists() else 0
+    for formato in ("arrow", "parquet"):
+        p = caminho_colunar(txt, formato)
+        if p.exists() and p.stat().st_mtime >= mtime_txt:
+            return p
+    return None
+
+
+def colunas_colunar(caminho: Path) -> List[str]:
+    if caminho.suffix == ".arrow":
+        with pa.memory_map(str(caminho)) as fonte:
+            return list(pa_ipc.open_file(fonte).schema.names)
+    return list(pq.read_schema(str(caminho)).names)
+
+
+def le_colunar(
+    caminho_txt: Union[str, Path],
+    colunas: Optional[Sequence[str]] = None,
+    categorias: Sequence[str] = (),
+    filtros: Optional[list] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Lê o irmão colunar do .txt (None se não houver / estiver desatualizado /
+    faltar coluna pedida).
+
+    - colunas: leitura seletiva (só essas colunas saem do disco)
+    - categorias: colunas devolvidas como category
+    - filtros: formato do pyarrow, ex. [("Tipo de Gasto", "==", "Estoque")]
+    """
+    caminho = colunar_atual(caminho_txt)
+    if caminho is None:
+        return None
+
+    existentes = colunas_colunar(caminho)
+    if colunas is not None:
+        if any(c not in existentes for c in colunas):
+            return None
+        colunas = list(dict.fromkeys(colunas))
+    categorias = [c for c in categorias if c in (colunas or existentes)]
+
+    if caminho.suffix == ".arrow":
+        # memory map: só as colunas selecionadas são de fato lidas do disco
+        with pa.memory_map(str(caminho)) as fonte:
+            tabela = pa_ipc.open_file(fonte).read_all()
+            if colunas is not None:
+                tabela = tabela.select(colunas)
+            if filtros:
+                tabela = tabela.filter(pq.filters_to_expression(filtros))
+            df = tabela.to_pandas(categories=categorias or None)
+    else:
+        tabela = pq.read_table(str(caminho), columns=colunas, filters=filtros)
+        df = tabela.to_pandas(categories=categorias or None)
+
+    # vazio = NaN (como no read_csv), não None: o código trata "nan" como vazio
+    for col in df.select_dtypes(object).columns:
+        serie = df[col]
+        df[col] = serie.where(serie.notna(), np.nan)
+    return df
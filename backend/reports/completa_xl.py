@@ -1,64 +1,137 @@
-import pandas as pd
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import json
 import os
 import sys 
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.reports.colunar import disponivel as colunar_disponivel
+from backend.reports.excel import csv_para_xlsx
+from backend.reports.metricas import Metricas
+
 # --- Caminho base dinâmico ---
 if getattr(sys, "frozen", False):
     base_dir = Path(sys.executable).parent  # pasta onde o .exe está
 else:
     base_dir = Path(__file__).resolve().parent.parent.parent
 
-# Caminho do requests.json
-requests_path = base_dir / "frontend" / "requests.json"
-
-if not requests_path.exists():
-    raise FileNotFoundError(f"Arquivo requests.json não encontrado em: {requests_path}")
-
-# Lê o arquivo JSON
-with open(requests_path, "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# Extrai o path2 do bloco "paths"
-path2_value = ""
-if "paths" in data and len(data["paths"]) > 0:
-    path2_value = data["paths"][0].get("path2", "")
-
-# Caminho de destino
-pasta_excel = Path(path2_value)
-pasta_excel.mkdir(parents=True, exist_ok=True)
-
-# 🔹 Coleta todos os arquivos file_completaN do bloco "destino"
-files_completa = []
-destino_list = data.get("destino", [])
-for destino_dict in destino_list:
-    # Ordena as chaves file_completa1, 2, 3, ... para processar na sequência correta
-    for key in sorted(destino_dict.keys(), key=lambda x: int(x.replace("file_completa", "")) if x != "file_completa" else 0):
-        file_path = destino_dict[key]
-        if file_path and os.path.exists(file_path):
-            files_completa.append(file_path)
+
+def converte_arquivo(path_txtOrigin, pasta_excel, saida_colunar):
+    """
+    Converte um file_completaN (xlsx + cópia colunar opcional).
+    Roda no processo de trabalho: devolve (ok, mensagens) em vez de imprimir,
+    para a saída de arquivos diferentes não se misturar (as linhas
+    METRIC_JSON: de cada etapa vão junto nas mensagens).
+    """
+    arquivo_txt = Path(path_txtOrigin)
+    nome_excel = arquivo_txt.stem + ".xlsx"
+    arquivo_excel = Path(pasta_excel) / nome_excel
+    mensagens = []
+    metricas = Metricas("completa_xl")
+
+    try:
+        # CSV -> Excel em streaming (memória constante; abas extras acima de 1.048.576 linhas);
+        # a cópia colunar sai dos mesmos blocos, tudo como texto (igual ao schema.le_extrato)
+        with metricas.etapa("escrita_excel", arquivo_txt.name) as m:
+            escritor = csv_para_xlsx(arquivo_txt, arquivo_excel, copia_colunar=saida_colunar)
+            m["linhas"] = escritor.linhas
+        abas = f", {escritor.abas} abas" if escritor.abas > 1 else ""
+        mensagens.append(f"[OK] Convertido: {arquivo_txt.name} - {arquivo_excel.name} ({escritor.linhas} linhas{abas})")
+        if saida_colunar:
+            mensagens.append(f"[OK] Cópia colunar: {arquivo_txt.stem}.parquet / .arrow")
+
+        return True, mensagens + metricas.fecha(imprime=False)
+
+    except Exception as e:
+        mensagens.append(f"[ERRO] Falha ao converter {arquivo_txt}: {e}")
+        return False, mensagens + metricas.fecha(imprime=False)
+
+
+def numero_workers(opcoes, n_arquivos):
+    """
+    opcoes.completa_xl_workers: processos em paralelo (um arquivo por processo).
+    Ausente/0 = um por arquivo, limitado aos núcleos da máquina; 1 = sequencial.
+    Dentro do pool de etapas (AUTOCL_PROCESSO_POOL=1) é sempre sequencial:
+    processos netos importariam pandas/openpyxl a frio e o cancelamento do
+    job só derruba os processos do pool.
+    """
+    if os.environ.get("AUTOCL_PROCESSO_POOL") == "1":
+        return 1
+    try:
+        pedido = int(opcoes.get("completa_xl_workers") or 0)
+    except (TypeError, ValueError):
+        pedido = 0
+    if pedido <= 0:
+        pedido = os.cpu_count() or 1
+    return max(1, min(pedido, n_arquivos))
+
+
+def main():
+    # Caminho do requests.json
+    requests_path = base_dir / "frontend" / "requests.json"
+
+    if not requests_path.exists():
+        raise FileNotFoundError(f"Arquivo requests.json não encontrado em: {requests_path}")
+
+    # Lê o arquivo JSON
+    with open(requests_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Extrai o path2 do bloco "paths"
+    path2_value = ""
+    if "paths" in data and len(data["paths"]) > 0:
+        path2_value = data["paths"][0].get("path2", "")
+
+    # saida_colunar: grava também <arquivo>.parquet / .arrow ao lado do .txt,
+    # que a Reduzida passa a ler no lugar do texto
+    opcoes = data.get("opcoes") if isinstance(data.get("opcoes"), dict) else {}
+    saida_colunar = bool(opcoes.get("saida_colunar", False)) and colunar_disponivel()
+
+    # Caminho de destino
+    pasta_excel = Path(path2_value)
+    pasta_excel.mkdir(parents=True, exist_ok=True)
+
+    # 🔹 Coleta todos os arquivos file_completaN do bloco "destino"
+    files_completa = []
+    destino_list = data.get("destino", [])
+    for destino_dict in destino_list:
+        # Ordena as chaves file_completa1, 2, 3, ... para processar na sequência correta
+        for key in sorted(destino_dict.keys(), key=lambda x: int(x.replace("file_completa", "")) if x != "file_completa" else 0):
+            file_path = destino_dict[key]
+            if file_path and os.path.exists(file_path):
+                files_completa.append(file_path)
+            else:
+                print(f"Aviso: arquivo não encontrado - {file_path}")
+
+    if not files_completa:
+        print("Nenhum arquivo 'file_completa' válido encontrado no JSON.")
+        status_done = "status_error"
+    else:
+        workers = numero_workers(opcoes, len(files_completa))
+        if workers == 1:
+            # Processa cada arquivo em sequência, no próprio processo
+            for path_txtOrigin in files_completa:
+                _, mensagens = converte_arquivo(path_txtOrigin, pasta_excel, saida_colunar)
+                print("\n".join(mensagens), flush=True)
         else:
-            print(f"Aviso: arquivo não encontrado - {file_path}")
+            # Arquivos independentes: um processo por arquivo; falha em um não
+            # interrompe os outros (cada um reporta o próprio [OK]/[ERRO])
+            print(f"Convertendo {len(files_completa)} arquivos em {workers} processos...", flush=True)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futuros = {
+                    pool.submit(converte_arquivo, p, pasta_excel, saida_colunar): p
+                    for p in files_completa
+                }
+                for futuro in as_completed(futuros):
+                    try:
+                        _, mensagens = futuro.result()
+                    except Exception as e:  # processo de trabalho morreu (ex: memória)
+                        mensagens = [f"[ERRO] Falha ao converter {futuros[futuro]}: {e}"]
+                    print("\n".join(mensagens), flush=True)
 
-if not files_completa:
-    print("Nenhum arquivo 'file_completa' válido encontrado no JSON.")
-    status_done = "status_error"
-else:
-    # Processa cada arquivo em sequência
-    for path_txtOrigin in files_completa:
-        arquivo_txt = Path(path_txtOrigin)
-        nome_excel = arquivo_txt.stem + ".xlsx"
-        arquivo_excel = pasta_excel / nome_excel
-
-        try:
-            # Lê o CSV e salva em Excel
-            df = pd.read_csv(arquivo_txt, sep=";", encoding="utf-8")
-            df.to_excel(arquivo_excel, index=False)
-            print(f"[OK] Convertido: {arquivo_txt.name} - {arquivo_excel.name}")
-
-        except Exception as e:
-            print(f"[ERRO] Falha ao converter {arquivo_txt}: {e}")
-
-    status_done = "status_success"
-    print(status_done)
\ No newline at end of file
+        status_done = "status_success"
+        print(status_done)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# backend/reports/enriquecimento.py
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend.sap_manager.ysrelcont import executar_ysrelcont
+from backend.sap_manager.ko03 import executar_ko03
+from backend.sap_manager.ks13 import executar_ks13
+from backend.sap_manager.cache import CacheConsultas
+from backend.sap_manager.paralelo import ExecutorSessoes, ProvedorSessoes, SessoesSap
+from backend.sap_manager.selecao_multipla import LIMITE_LOTE
+from backend.sap_manager.espera import aguarda_tela, drena_esperas, resumo_esperas, zera_esperas
+from backend.sap_manager.snapshot import (
+    FONTE_CENTROS,
+    FONTE_CONTRATOS,
+    IDADE_MAXIMA_PADRAO_HORAS,
+    SnapshotDadosMestres,
+)
+
+from backend.reports.colunar import le_colunar
+from backend.reports.metricas import Metricas, etapa
+from backend.reports.reduzida_etapas import ResultadosSap, chaves_sap, filtra_expurgados, une_chaves
+from backend.reports.schema import YSCLNRCL, com_fallback_latin1, le_extrato_em_blocos
+
+COLUNAS_CHAVE = ("Contrato", "Objeto parceiro", "Doc custo Expurgado")
+
+
+def coleta_chaves_arquivo(
+    arquivo: Path,
+    colunas_existentes: Sequence[str],
+    encoding: str,
+    linhas_por_bloco: int = 200_000,
+) -> Tuple[List[str], List[str]]:
+    """
+    Passada leve (só Contrato / Objeto parceiro / Doc custo Expurgado) que
+    devolve os contratos e objetos distintos das linhas NÃO expurgadas.
+    """
+    colunas = [c for c in COLUNAS_CHAVE if c in colunas_existentes]
+
+    # cópia colunar do extrato: lê só as 3 colunas, sem parse do texto
+    df = le_colunar(arquivo, colunas, categorias=colunas)
+    if df is not None:
+        df, _removidas = filtra_expurgados(df)
+        return chaves_sap(df)
+
+    def passada(enc: str) -> Tuple[List[str], List[str]]:
+        contratos: Dict[str, None] = {}
+        objetos: Dict[str, None] = {}
+        for bloco in le_extrato_em_blocos(arquivo, YSCLNRCL, colunas, enc, linhas_por_bloco):
+            bloco, _removidas = filtra_expurgados(bloco)
+            c, o = chaves_sap(bloco)
+            une_chaves(contratos, c)
+            une_chaves(objetos, o)
+        return list(contratos), list(objetos)
+
+    return com_fallback_latin1(passada, encoding)
+
+
+def coleta_chaves(
+    arquivos: Sequence[Tuple[Path, Sequence[str], str]],
+    linhas_por_bloco: int = 200_000,
+) -> Tuple[List[str], List[str]]:
+    """União das chaves SAP de TODOS os arquivos do job: [(arquivo, colunas, encoding), ...]."""
+    contratos: Dict[str, None] = {}
+    objetos: Dict[str, None] = {}
+    for arquivo, colunas_existentes, encoding in arquivos:
+        c, o = coleta_chaves_arquivo(arquivo, colunas_existentes, encoding, linhas_por_bloco)
+        une_chaves(contratos, c)
+        une_chaves(objetos, o)
+    return list(contratos), list(objetos)
+
+
+class SessaoSobDemanda:
+    """
+    Proxy da sessão SAP que só abre o SAP GUI no primeiro uso.
+    Com o cache resolvendo todas as chaves, o SAP nem é iniciado.
+    """
+
+    def __init__(self) -> None:
+        self._session = None
+
+    def __getattr__(self, nome):
+        if self._session is None:
+            from backend.sap_manager.sap_connect import get_sap_free_session, start_connection, start_sap_manager
+
+            # --- Inicialização SAP ---
+            print("Iniciando SAP GUI...")
+            start_sap_manager()
+            start_connection()
+            self._session = get_sap_free_session()
+            aguarda_tela(self._session, "sessao_pronta", qualquer=("wnd[0]",))
+        return getattr(self._session, nome)
+
+
+def _usa_snapshot(snapshot: Optional[SnapshotDadosMestres], fonte: str, idade_maxima_horas: float) -> bool:
+    if snapshot is None or not snapshot.disponivel(fonte, idade_maxima_horas):
+        return False
+    print(f"{fonte}: usando snapshot local (versão {snapshot.versao_atual(fonte)}).")
+    return True
+
+
+def _pelo_snapshot(
+    snapshot: Optional[SnapshotDadosMestres], fonte: str, chaves: List[str]
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    (resolvidas pelo snapshot, chaves que seguem para cache/SAP). Contrato ou
+    centro criado depois do sync, ou cortado pelo limite do help de pesquisa
+    na extração, falta no snapshot mas pode existir no SAP.
+    Sem snapshot em dia (None): ({}, todas as chaves).
+    """
+    chaves = list(dict.fromkeys(chaves))
+    if snapshot is None:
+        return {}, chaves
+    achadas = snapshot.consulta(fonte, chaves)
+    restantes = [c for c in chaves if c not in achadas]
+    if restantes:
+        print(f"{fonte}: {len(restantes)} chave(s) fora do snapshot; consultando cache/SAP.")
+    return achadas, restantes
+
+
+def _separa_objetos(objetos_unicos: List[str]) -> Tuple[List[str], List[str]]:
+    objetos_e = [o for o in objetos_unicos if o.startswith("E")]
+    objetos_or = [o for o in objetos_unicos if o.startswith("OR")]
+    return objetos_e, objetos_or
+
+
+def _avisa_contratos(gerentes_por_contrato) -> Dict[str, str]:
+    if not isinstance(gerentes_por_contrato, dict):
+        gerentes_por_contrato = {}
+    print(f"Consulta SAP concluída. {len(gerentes_por_contrato)} contratos encontrados.")
+    if not gerentes_por_contrato:
+        print("YSRELCONT não retornou dados — Gestor do Contrato ficará em branco.")
+    return gerentes_por_contrato
+
+
+def consulta_sap(
+    contratos_unicos: List[str],
+    objetos_unicos: List[str],
+    cache: Optional[CacheConsultas] = None,
+    snapshot: Optional[SnapshotDadosMestres] = None,
+    snapshot_idade_maxima_horas: float = IDADE_MAXIMA_PADRAO_HORAS,
+    metricas: Optional[Metricas] = None,
+    ko03_lote: bool = True,
+    ks13_lote: bool = True,
+    sessoes: int = 1,
+    provedor_sessoes: Optional[ProvedorSessoes] = None,
+) -> ResultadosSap:
+    """
+    Uma sessão SAP e UMA execução de cada transação (YSRELCONT, KO03, KS13)
+    para o conjunto de chaves do job inteiro. Com cache, cada transação só
+    recebe as chaves ausentes/vencidas.
+
+    Com snapshot de dados mestre em dia (sync noturno), YSRELCONT e KS13
+    viram join local; só as chaves ausentes do snapshot (novas desde o sync)
+    seguem para o cache/SAP.
+
+    Com `metricas`, cada transação vira uma etapa "sap_<TRANSAÇÃO>" (linhas =
+    chaves consultadas, inclusive as resolvidas por cache/snapshot).
+
+    `ko03_lote`: ordens resolvidas numa leitura da AUFK (SE16N) em vez da
+    KO03 ordem a ordem (que continua como fallback). `ks13_lote`: idem para
+    os centros, pela CSKS, com o help de pesquisa da KS13 como fallback.
+
+    `sessoes` > 1: transações em sessões SAP paralelas (sap_manager/paralelo.py),
+    ver _consulta_sap_paralela. `provedor_sessoes` troca o SAP GUI por outro
+    provedor (SessoesSimuladas no benchmark).
+
+    As esperas pelo SAP (sap_manager/espera.py) saem como etapas
+    "espera_<rótulo>" (tempo total; esperas / maximo_s / esgotadas).
+    """
+    zera_esperas()
+
+    if sessoes > 1 or provedor_sessoes is not None:
+        resultados = _consulta_sap_paralela(
+            contratos_unicos, objetos_unicos, cache, snapshot, snapshot_idade_maxima_horas,
+            metricas, ko03_lote, ks13_lote, sessoes, provedor_sessoes or SessoesSap(),
+        )
+    else:
+        resultados = _consulta_sap_sequencial(
+            contratos_unicos, objetos_unicos, cache, snapshot, snapshot_idade_maxima_horas,
+            metricas, ko03_lote, ks13_lote,
+        )
+    # --- Fim do uso do SAP ---
+
+    registro_esperas = drena_esperas()
+    if registro_esperas:
+        print(resumo_esperas(registro_esperas))
+        if metricas is not None:
+            for rotulo, r in registro_esperas.items():
+                metricas.registra(
+                    f"espera_{rotulo}", r["total_s"],
+                    esperas=r["esperas"], maximo_s=r["maximo_s"], esgotadas=r["esgotadas"],
+                )
+
+    if cache is not None:
+        print(cache.resumo())
+
+    return resultados
+
+
+def _consulta_sap_sequencial(
+    contratos_unicos: List[str],
+    objetos_unicos: List[str],
+    cache: Optional[CacheConsultas],
+    snapshot: Optional[SnapshotDadosMestres],
+    snapshot_idade_maxima_horas: float,
+    metricas: Optional[Metricas],
+    ko03_lote: bool,
+    ks13_lote: bool,
+) -> ResultadosSap:
+    session = SessaoSobDemanda()
+
+    snapshot_contratos = snapshot if _usa_snapshot(snapshot, FONTE_CONTRATOS, snapshot_idade_maxima_horas) else None
+    snapshot_centros = snapshot if _usa_snapshot(snapshot, FONTE_CENTROS, snapshot_idade_maxima_horas) else None
+
+    # --- Executa transação SAP - Contratos/Gerentes ---
+    with etapa(metricas, "sap_YSRELCONT", linhas=len(contratos_unicos)):
+        gerentes_por_contrato, restantes = _pelo_snapshot(snapshot_contratos, FONTE_CONTRATOS, contratos_unicos)
+        if restantes:
+            print("Executando consulta YSRELCONT...")
+            novos = executar_ysrelcont(session, restantes, cache=cache)
+            gerentes_por_contrato.update(novos or {})
+    gerentes_por_contrato = _avisa_contratos(gerentes_por_contrato)
+
+    # --- Separa por tipo ---
+    objetos_e, objetos_or = _separa_objetos(objetos_unicos)
+
+    # --- Execução KO03 + KS13 ---
+    print("Executando KO03 (ordens OR - centros E)...")
+    with etapa(metricas, "sap_KO03", linhas=len(objetos_or)):
+        or_para_e = executar_ko03(session, objetos_or, cache=cache, lote=ko03_lote)
+    print(f"{len(or_para_e)} ordens convertidas para centros de custo.")
+
+    # Monta lista definitiva de objetos E
+    objetos_definitivos = list(dict.fromkeys(objetos_e + list(or_para_e.values())))
+
+    with etapa(metricas, "sap_KS13", linhas=len(objetos_definitivos)):
+        gerencias_por_objeto, restantes = _pelo_snapshot(snapshot_centros, FONTE_CENTROS, objetos_definitivos)
+        if restantes:
+            print("Executando KS13 (centros E - gerências responsáveis)...")
+            gerencias_por_objeto.update(executar_ks13(session, restantes, cache=cache, lote=ks13_lote))
+    print(f"{len(gerencias_por_objeto)} gerências encontradas.")
+
+    return ResultadosSap(
+        gerentes_por_contrato=gerentes_por_contrato,
+        or_para_e=or_para_e,
+        gerencias_por_objeto=gerencias_por_objeto,
+    )
+
+
+# KO03 ordem a ordem: o custo é por chave, então dividir compensa bem abaixo
+# do lote da seleção múltipla (mínimo de ordens por sessão)
+_MINIMO_POR_SESSAO_POR_ORDEM = 50
+
+
+class _ConsultaParalela:
+    """
+    Uma transação no ExecutorSessoes com o cache resolvido na thread principal
+    (a conexão SQLite do cache não é compartilhada entre threads): busca antes,
+    só as chaves faltando vão para as sessões, grava no resultado().
+    """
+
+    def __init__(self, executor: ExecutorSessoes, cache: Optional[CacheConsultas], transacao: str, chaves: List[str], funcao, **kwargs) -> None:
+        self.cache = cache
+        self.transacao = transacao
+        self.chaves = chaves
+        if cache is not None:
+            self.encontrados, self.faltando = cache.busca(transacao, chaves)
+        else:
+            self.encontrados, self.faltando = {}, list(dict.fromkeys(chaves))
+        self.futuro = executor.fragmenta(transacao, funcao, self.faltando, **kwargs) if self.faltando else None
+
+    def resultado(self) -> Optional[Dict[str, str]]:
+        if self.futuro is None:
+            return self.encontrados
+        novos = self.futuro.result()
+        if not isinstance(novos, dict):
+            # mesmo contrato da consulta sequencial: sem cache, a falha volta como está
+            return self.encontrados if self.cache is not None else novos
+        if self.cache is not None:
+            # chaves não confirmadas (RespostaParcial) não viram negativo
+            self.cache.grava(self.transacao, novos, self.faltando)
+        return {**self.encontrados, **novos}
+
+
+def _consulta_sap_paralela(
+    contratos_unicos: List[str],
+    objetos_unicos: List[str],
+    cache: Optional[CacheConsultas],
+    snapshot: Optional[SnapshotDadosMestres],
+    snapshot_idade_maxima_horas: float,
+    metricas: Optional[Metricas],
+    ko03_lote: bool,
+    ks13_lote: bool,
+    sessoes: int,
+    provedor: ProvedorSessoes,
+) -> ResultadosSap:
+    """
+    YSRELCONT, KO03 e a KS13 dos centros E do extrato rodam ao mesmo tempo
+    (listas grandes também divididas entre as sessões); a KS13 dos centros
+    devolvidos pela KO03 só é submetida depois dela.
+    """
+    objetos_e, objetos_or = _separa_objetos(objetos_unicos)
+    inicio = time.perf_counter()
+
+    with ExecutorSessoes(provedor, sessoes) as executor:
+        print(f"Consultas SAP em até {executor.sessoes} sessões paralelas...")
+        snapshot_contratos = snapshot if _usa_snapshot(snapshot, FONTE_CONTRATOS, snapshot_idade_maxima_horas) else None
+        snapshot_centros = snapshot if _usa_snapshot(snapshot, FONTE_CENTROS, snapshot_idade_maxima_horas) else None
+
+        gerentes_por_contrato, restantes = _pelo_snapshot(snapshot_contratos, FONTE_CONTRATOS, contratos_unicos)
+        if restantes:
+            print("Executando consulta YSRELCONT...")
+        consulta_ys = _ConsultaParalela(executor, cache, "YSRELCONT", restantes, executar_ysrelcont)
+        print("Executando KO03 (ordens OR - centros E)...")
+        consulta_ko = _ConsultaParalela(
+            executor, cache, "KO03", objetos_or, executar_ko03, lote=ko03_lote,
+            minimo_por_parte=LIMITE_LOTE if ko03_lote else _MINIMO_POR_SESSAO_POR_ORDEM,
+        )
+        gerencias_por_objeto, restantes = _pelo_snapshot(snapshot_centros, FONTE_CENTROS, objetos_e)
+        if restantes:
+            print("Executando KS13 (centros E - gerências responsáveis)...")
+        consulta_ks_extrato = _ConsultaParalela(executor, cache, "KS13", restantes, executar_ks13, lote=ks13_lote)
+
+        # KO03 -> KS13: os centros das ordens só são conhecidos agora
+        or_para_e = consulta_ko.resultado() or {}
+        print(f"{len(or_para_e)} ordens convertidas para centros de custo.")
+        objetos_definitivos = list(dict.fromkeys(objetos_e + list(or_para_e.values())))
+
+        do_extrato = set(objetos_e)
+        das_ordens, restantes = _pelo_snapshot(
+            snapshot_centros, FONTE_CENTROS, [o for o in objetos_definitivos if o not in do_extrato]
+        )
+        consulta_ks_ordens = _ConsultaParalela(executor, cache, "KS13", restantes, executar_ks13, lote=ks13_lote)
+        gerencias_por_objeto.update(das_ordens)
+        gerencias_por_objeto.update(consulta_ks_extrato.resultado() or {})
+        gerencias_por_objeto.update(consulta_ks_ordens.resultado() or {})
+
+        gerentes_por_contrato.update(consulta_ys.resultado() or {})
+
+    gerentes_por_contrato = _avisa_contratos(gerentes_por_contrato)
+    print(f"{len(gerencias_por_objeto)} gerências encontradas.")
+
+    if metricas is not None:
+        # soma das tarefas por transação (em paralelo passa do tempo de parede)
+        linhas = {"YSRELCONT": len(contratos_unicos), "KO03": len(objetos_or), "KS13": len(objetos_definitivos)}
+        segundos: Dict[str, float] = {}
+        for t in executor.tempos:
+            segundos[t.nome] = segundos.get(t.nome, 0.0) + t.segundos
+        for nome, n in linhas.items():
+            metricas.registra(f"sap_{nome}", segundos.get(nome, 0.0), linhas=n)
+        metricas.registra("sap_paralelo", time.perf_counter() - inicio, sessoes=executor.sessoes_abertas)
+
+    return ResultadosSap(
+        gerentes_por_contrato=gerentes_por_contrato,
+        or_para_e=or_para_e,
+        gerencias_por_objeto=gerencias_por_objeto,
+    )
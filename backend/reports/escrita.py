@@ -0,0 +1,59 @@
+# backend/reports/escrita.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from backend.reports.numeros import formata_brasileiro_serie
+
+# Colunas de valor que saem no padrão brasileiro ("1.234,56") nos arquivos finais
+COLUNAS_MOEDA = [
+    "Valor/Moeda obj",
+    "Valor total em reais",
+    "Val suj cont loc R$",
+    "Valor cont local R$",
+    "Valor/moeda ACC",
+    "Estrangeiro $",
+]
+
+LINHAS_POR_BLOCO = 200_000
+
+
+def salva_csv(
+    df: pd.DataFrame,
+    caminho: Union[str, Path],
+    *,
+    formato_brasileiro: bool = True,
+    colunas_moeda: Optional[Iterable[str]] = None,
+    modo: str = "w",
+    cabecalho: bool = True,
+) -> None:
+    """
+    Grava o DataFrame em ';' / UTF-8 (mesmo layout dos *_Reduzida.txt).
+
+    O DataFrame continua numérico: a formatação brasileira é aplicada só na
+    escrita, em blocos, sem criar uma cópia formatada do arquivo inteiro.
+    modo="a" + cabecalho=False permite acrescentar blocos a um arquivo existente.
+    """
+    colunas = [c for c in (colunas_moeda or COLUNAS_MOEDA) if c in df.columns]
+
+    if not formato_brasileiro or not colunas:
+        df.to_csv(caminho, sep=";", index=False, encoding="utf-8", mode=modo, header=cabecalho)
+        return
+
+    for inicio in range(0, max(len(df), 1), LINHAS_POR_BLOCO):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].copy()
+        for col in colunas:
+            if pd.api.types.is_numeric_dtype(bloco[col]):
+                bloco[col] = formata_brasileiro_serie(bloco[col])
+
+        bloco.to_csv(
+            caminho,
+            sep=";",
+            index=False,
+            encoding="utf-8",
+            mode=modo if inicio == 0 else "a",
+            header=cabecalho and inicio == 0,
+        )
@@ -0,0 +1,229 @@
+# backend/reports/excel.py
+from __future__ import annotations
+
+import os
+from copy import copy
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+from backend.reports.colunar import EscritorColunar
+from backend.reports.escrita import COLUNAS_MOEDA
+from backend.reports.numeros import sap_serie_para_float
+from backend.reports.schema import YSCLNRCL, com_fallback_latin1
+
+# Limite do Excel por aba (inclui o cabeçalho)
+MAX_LINHAS_ABA = 1_048_576
+
+FORMATO_MOEDA = "#,##0.00"
+
+LINHAS_POR_BLOCO = 50_000
+
+
+class EscritorXlsx:
+    """
+    XLSX em modo write-only (memória constante): as linhas vão direto para o
+    arquivo, sem montar a planilha inteira no openpyxl.
+
+    - cabeçalho repetido em cada aba; passou de MAX_LINHAS_ABA, abre
+      "Sheet2", "Sheet3", ...
+    - colunas_moeda: células numéricas com formato '#,##0.00' (o formato
+      também vai na coluna inteira, para linhas digitadas depois)
+    - congela_cabecalho / autofiltro: linha 1 fixa e filtro em cada aba
+    - valores vazios (NaN / "") viram célula vazia
+
+    Formatos são definidos uma vez, antes da 1ª linha da aba: o arquivo
+    nunca é reaberto para formatar célula a célula.
+    """
+
+    def __init__(
+        self,
+        caminho: Union[str, Path],
+        colunas: Sequence[str],
+        colunas_moeda: Iterable[str] = (),
+        max_linhas_aba: int = MAX_LINHAS_ABA,
+        congela_cabecalho: bool = False,
+        autofiltro: bool = False,
+    ) -> None:
+        self.caminho = Path(caminho)
+        self.colunas = list(colunas)
+        moeda = set(colunas_moeda)
+        self.idx_moeda = [i for i, c in enumerate(self.colunas) if c in moeda]
+        self.max_linhas_aba = max_linhas_aba
+        self.congela_cabecalho = congela_cabecalho
+        self.autofiltro = autofiltro
+
+        self._wb = Workbook(write_only=True)
+        self._ws = None
+        self._estilo_moeda = None
+        self._linhas_aba = 0
+        self.abas = 0
+        self.linhas = 0
+
+    def _nova_aba(self) -> None:
+        self._fecha_aba()
+        self.abas += 1
+        ws = self._wb.create_sheet(f"Sheet{self.abas}")
+        # write-only: vistas e colunas vão no topo do XML -> antes do 1º append
+        if self.congela_cabecalho:
+            ws.freeze_panes = "A2"
+        for i in self.idx_moeda:
+            ws.column_dimensions[get_column_letter(i + 1)].number_format = FORMATO_MOEDA
+
+        # estilo da célula de valor montado uma vez por aba e só copiado depois
+        modelo = WriteOnlyCell(ws)
+        modelo.number_format = FORMATO_MOEDA
+        self._estilo_moeda = modelo._style
+
+        ws.append(self.colunas)
+        self._ws = ws
+        self._linhas_aba = 1
+
+    def _fecha_aba(self) -> None:
+        # o autofiltro fica no fim do XML da aba: dá para definir com o total de linhas
+        if self._ws is not None and self.autofiltro and self.colunas:
+            self._ws.auto_filter.ref = f"A1:{get_column_letter(len(self.colunas))}{self._linhas_aba}"
+
+    def _celula_moeda(self, valor):
+        cel = WriteOnlyCell(self._ws, value=valor)
+        cel._style = copy(self._estilo_moeda)
+        return cel
+
+    def escreve(self, bloco: pd.DataFrame) -> None:
+        """Acrescenta as linhas do bloco (mesma ordem de colunas do cabeçalho)."""
+        if self._ws is None:
+            self._nova_aba()
+
+        valores = bloco.to_numpy(dtype=object)
+        # vazio -> None (célula vazia), sem checar célula a célula no Python
+        valores[pd.isna(valores) | (valores == "")] = None
+
+        for linha in valores:
+            if self._linhas_aba >= self.max_linhas_aba:
+                self._nova_aba()
+            linha = list(linha)
+            for i in self.idx_moeda:
+                if linha[i] is not None:
+                    linha[i] = self._celula_moeda(linha[i])
+            self._ws.append(linha)
+            self._linhas_aba += 1
+        self.linhas += len(valores)
+
+    def escreve_df(self, df: pd.DataFrame, linhas_por_bloco: int = LINHAS_POR_BLOCO) -> None:
+        """DataFrame inteiro, em fatias (evita uma cópia object do frame todo)."""
+        for inicio in range(0, len(df), linhas_por_bloco):
+            self.escreve(df.iloc[inicio:inicio + linhas_por_bloco])
+
+    def fecha(self) -> None:
+        if self._ws is None:  # arquivo sem linhas: ao menos o cabeçalho
+            self._nova_aba()
+        self._fecha_aba()
+        self._wb.save(self.caminho)
+
+    def descarta(self) -> None:
+        """Passada abortada: fecha as abas e apaga os temporários delas (nada vai para `caminho`)."""
+        for ws in self._wb.worksheets:
+            if ws._writer is None or ws.closed:
+                continue
+            ws.close()
+            try:
+                os.remove(ws._writer.out)
+            except OSError:
+                pass
+
+
+def csv_para_xlsx(
+    caminho_txt: Union[str, Path],
+    caminho_xlsx: Union[str, Path],
+    colunas_moeda: Optional[Iterable[str]] = None,
+    encoding: str = "utf-8",
+    linhas_por_bloco: int = LINHAS_POR_BLOCO,
+    copia_colunar: bool = False,
+) -> EscritorXlsx:
+    """
+    Converte um extrato ';' em XLSX lendo em blocos e gravando em streaming.
+
+    Tudo é mantido como texto (sem inferência: "Contrato" não vira número),
+    exceto as colunas de valor, convertidas do formato SAP ("1,234.56-") para
+    número com formato '#,##0.00'.
+
+    copia_colunar: grava também <txt>.parquet / .arrow com os mesmos blocos
+    (texto como no .txt, vazio = NaN), sem uma segunda leitura do arquivo.
+    """
+    moeda = list(colunas_moeda) if colunas_moeda is not None else list(YSCLNRCL.numericas)
+
+    def passada(enc: str) -> EscritorXlsx:
+        cabecalho = pd.read_csv(caminho_txt, sep=";", header=None, nrows=1, dtype=str, encoding=enc)
+        colunas: List[str] = cabecalho.iloc[0].tolist()  # nomes originais (sem "Denominação.1")
+        escritor = EscritorXlsx(caminho_xlsx, colunas, colunas_moeda=moeda)
+        # recomeço em latin1 recria a cópia colunar do zero (.tmp até o fecha())
+        colunar = EscritorColunar(caminho_txt) if copia_colunar else None
+
+        leitor = pd.read_csv(
+            caminho_txt,
+            sep=";",
+            encoding=enc,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=linhas_por_bloco,
+        )
+        try:
+            with leitor:
+                for bloco in leitor:
+                    if colunar is not None:
+                        # antes de renomear/converter: mesmas colunas e textos da leitura do .txt
+                        colunar.escreve(bloco.mask(bloco == ""))
+                    bloco.columns = colunas
+                    for i in escritor.idx_moeda:
+                        serie = bloco.iloc[:, i]
+                        numeros = sap_serie_para_float(serie)
+                        # célula vazia continua vazia (não vira 0,00)
+                        bloco.iloc[:, i] = np.where(serie.str.strip() == "", None, numeros)
+                    escritor.escreve(bloco)
+        except BaseException:
+            escritor.descarta()
+            if colunar is not None:
+                colunar.descarta()
+            raise
+
+        escritor.fecha()
+        if colunar is not None:
+            colunar.fecha()
+        return escritor
+
+    return com_fallback_latin1(passada, encoding)
+
+
+def escritor_tipado(
+    caminho: Union[str, Path],
+    colunas: Sequence[str],
+    colunas_moeda: Optional[Iterable[str]] = None,
+) -> EscritorXlsx:
+    """
+    Escritor para frames já tipados (valores em float, ex. a Reduzida):
+    formato '#,##0.00' nas colunas de valor, cabeçalho congelado e autofiltro.
+    """
+    return EscritorXlsx(
+        caminho,
+        colunas,
+        colunas_moeda=COLUNAS_MOEDA if colunas_moeda is None else colunas_moeda,
+        congela_cabecalho=True,
+        autofiltro=True,
+    )
+
+
+def salva_xlsx(
+    df: pd.DataFrame,
+    caminho: Union[str, Path],
+    colunas_moeda: Optional[Iterable[str]] = None,
+) -> EscritorXlsx:
+    """Grava o DataFrame tipado direto em XLSX (sem CSV intermediário)."""
+    escritor = escritor_tipado(caminho, df.columns, colunas_moeda)
+    escritor.escreve_df(df)
+    escritor.fecha()
+    return escritor
@@ -0,0 +1,192 @@
+# backend/reports/metricas.py
+"""
+Instrumentação por etapa dos scripts de relatório (reduzida / completa_xl).
+
+Cada etapa mede tempo de parede, linhas, linhas/s e pico de memória (RSS)
+durante a própria etapa. O script imprime uma linha por etapa:
+
+    METRIC_JSON:{"script": "reduzida", "arquivo": "x.txt", "etapa": "leitura", ...}
+
+e o JobRunner repassa cada uma como evento SSE "metric" (mesmo contrato do
+DESTINOS_DICT_JSON: do job SAP).
+
+No modo em blocos a mesma etapa é medida a cada bloco e somada; a linha sai
+em publica(), uma vez por arquivo.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PREFIXO = "METRIC_JSON:"
+
+_AMOSTRAGEM_S = 0.05
+
+try:  # pico do processo (fallback quando não dá para ler o RSS atual)
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+def _rss_windows() -> Optional[int]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    contadores = PROCESS_MEMORY_COUNTERS()
+    contadores.cb = ctypes.sizeof(contadores)
+    processo = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+        return None
+    return contadores.WorkingSetSize
+
+
+def rss_atual_mb() -> Optional[float]:
+    """Memória residente do processo agora (None se a plataforma não expõe)."""
+    try:
+        if sys.platform == "win32":
+            rss = _rss_windows()
+        else:
+            with open("/proc/self/statm", "r") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+    return None if rss is None else rss / (1024 * 1024)
+
+
+def pico_rss_mb() -> Optional[float]:
+    """Pico de RSS do processo desde o início (ru_maxrss)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux em KiB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class _Amostrador(threading.Thread):
+    """Lê o RSS a cada 50 ms e guarda o maior valor desde o último zera()."""
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True, name="metricas-rss")
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._pico: Optional[float] = None
+
+    def zera(self) -> None:
+        with self._lock:
+            self._pico = rss_atual_mb()
+
+    def pico(self) -> Optional[float]:
+        atual = rss_atual_mb()
+        with self._lock:
+            if atual is not None and (self._pico is None or atual > self._pico):
+                self._pico = atual
+            return self._pico
+
+    def run(self) -> None:
+        while not self._parar.wait(_AMOSTRAGEM_S):
+            self.pico()
+
+    def para(self) -> None:
+        self._parar.set()
+
+
+class Metricas:
+    """
+    Coletor de um script:
+
+        metricas = Metricas("reduzida")
+        with metricas.etapa("leitura", arquivo=nome) as m:
+            df = le_extrato(...)
+            m["linhas"] = len(df)
+        metricas.publica(nome)
+    """
+
+    def __init__(self, script: str) -> None:
+        self.script = script
+        self._etapas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._amostrador: Optional[_Amostrador] = None
+        if rss_atual_mb() is not None:
+            self._amostrador = _Amostrador()
+            self._amostrador.start()
+
+    @contextmanager
+    def etapa(self, nome: str, arquivo: str = "", linhas: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        medida: Dict[str, Any] = {"linhas": linhas}
+        if self._amostrador is not None:
+            self._amostrador.zera()
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        finally:
+            segundos = time.perf_counter() - inicio
+            pico = self._amostrador.pico() if self._amostrador is not None else pico_rss_mb()
+            self._acumula(nome, arquivo, segundos, medida.get("linhas"), pico)
+
+    def _acumula(self, nome: str, arquivo: str, segundos: float, linhas: Optional[int], pico: Optional[float]) -> None:
+        registro = self._etapas.setdefault(
+            (arquivo, nome),
+            {"script": self.script, "arquivo": arquivo, "etapa": nome, "segundos": 0.0, "linhas": None, "linhas_por_s": None, "pico_rss_mb": None},
+        )
+        registro["segundos"] += segundos
+        if linhas is not None:
+            registro["linhas"] = (registro["linhas"] or 0) + int(linhas)
+        if pico is not None and (registro["pico_rss_mb"] is None or pico > registro["pico_rss_mb"]):
+            registro["pico_rss_mb"] = pico
+
+    def registra(self, nome: str, segundos: float, arquivo: str = "", linhas: Optional[int] = None, **extra: Any) -> None:
+        """Etapa medida fora de etapa() (ex.: esperas pelo SAP); extra vai junto na linha."""
+        self._acumula(nome, arquivo, segundos, linhas, None)
+        self._etapas[(arquivo, nome)].update(extra)
+
+    def publica(self, arquivo: Optional[str] = None, imprime: bool = True) -> List[str]:
+        """
+        Imprime (e descarta) as etapas acumuladas de `arquivo` (None = todas).
+        Devolve as linhas; imprime=False só devolve (processo de trabalho).
+        """
+        linhas_saida = []
+        for chave in [k for k in self._etapas if arquivo is None or k[0] == arquivo]:
+            registro = self._etapas.pop(chave)
+            segundos = registro["segundos"]
+            linhas = registro["linhas"]
+            registro["segundos"] = round(segundos, 3)
+            registro["linhas_por_s"] = round(linhas / segundos) if linhas and segundos > 0 else None
+            if registro["pico_rss_mb"] is not None:
+                registro["pico_rss_mb"] = round(registro["pico_rss_mb"], 1)
+            linha = PREFIXO + json.dumps(registro, ensure_ascii=False)
+            if imprime:
+                print(linha, flush=True)
+            linhas_saida.append(linha)
+        return linhas_saida
+
+    def fecha(self, imprime: bool = True) -> List[str]:
+        """Para o amostrador de RSS e publica o que sobrou."""
+        if self._amostrador is not None:
+            self._amostrador.para()
+        return self.publica(imprime=imprime)
+
+
+def etapa(metricas: Optional[Metricas], nome: str, arquivo: str = "", linhas: Optional[int] = None):
+    """metricas.etapa(...) ou um contexto vazio quando não há coletor."""
+    if metricas is None:
+        return nullcontext({"linhas": linhas})
+    return metricas.etapa(nome, arquivo, linhas)
+
@@ -0,0 +1,84 @@
+# backend/reports/numeros.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def sap_str_para_float(valor) -> float:
+    """
+    Converte UM valor no formato SAP (ex: "1,000.00-") para float.
+    Vazio / NaN / inválido -> 0.0
+    """
+    if pd.isna(valor):
+        return 0.0
+
+    s = str(valor).strip()
+    if not s:
+        return 0.0
+
+    # SAP: negativo vem no final (ex: 1,000.00-)
+    negativo = s.endswith("-")
+    s = s.replace("-", "")
+
+    # Remove separador de milhar
+    s = s.replace(",", "")
+
+    try:
+        num = float(s)
+        return -num if negativo else num
+    except ValueError:
+        return 0.0
+
+
+def sap_serie_para_float(serie: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de sap_str_para_float (coluna inteira de uma vez).
+
+    Mesmo resultado célula a célula:
+    - "1,000.00-" -> -1000.0 (negativo no final)
+    - vazio / NaN / inválido -> 0.0
+    """
+    vazios = serie.isna()
+    s = serie.astype(str).str.strip()
+    vazios = (vazios | (s == "")).to_numpy()
+
+    negativo = s.str.endswith("-").to_numpy()
+    s = s.str.replace("-", "", regex=False).str.replace(",", "", regex=False)
+
+    valores = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", copy=True)
+
+    # O que o to_numeric não reconheceu (ex: "1_000") passa pelo float() original,
+    # só nessas células (normalmente nenhuma).
+    textos = s.to_numpy()
+    invalidos = np.zeros(len(valores), dtype=bool)
+    for i in np.flatnonzero(np.isnan(valores) & ~vazios):
+        try:
+            valores[i] = float(textos[i])
+        except ValueError:
+            invalidos[i] = True
+
+    valores = np.where(negativo, -valores, valores)
+    valores[vazios | invalidos] = 0.0
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+
+def formata_brasileiro(x):
+    """1234.5 -> "1.234,50" (NaN fica como está)."""
+    if pd.notnull(x):
+        return f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return x
+
+
+_TROCA_SEPARADORES = str.maketrans({",": ".", ".": ","})
+
+
+def formata_brasileiro_serie(serie: pd.Series) -> pd.Series:
+    """
+    Versão de coluna do formata_brasileiro.
+    Usada só na hora de exportar: internamente as colunas continuam float.
+    """
+    texto = serie.map("{:,.2f}".format, na_action="ignore")
+    if texto.notna().any():
+        texto = texto.str.translate(_TROCA_SEPARADORES)
+    return texto
@@ -0,0 +1,201 @@
+# backend/reports/reduzida_etapas.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.reports.metricas import Metricas, etapa
+from backend.reports.numeros import sap_serie_para_float
+from backend.reports.regras import RegrasClassificacao
+from backend.reports.schema import YSCLNRCL, por_valor_distinto
+
+TIPOS_GASTO = ["Direto", "Indireto", "Estoque", "Outros"]
+
+NOVAS_COLUNAS = ["Tipo de Gasto", "Bem/Serviço", "Gestor do Contrato", "Gerência responsável pelo objeto parceiro", "Disciplina"]
+
+
+@dataclass
+class ResultadosSap:
+    """Respostas das consultas SAP usadas para enriquecer a Reduzida."""
+    gerentes_por_contrato: Dict[str, str] = field(default_factory=dict)  # YSRELCONT
+    or_para_e: Dict[str, str] = field(default_factory=dict)              # KO03
+    gerencias_por_objeto: Dict[str, str] = field(default_factory=dict)   # KS13
+
+
+# =========================================================
+# Etapas da Reduzida que valem para um DataFrame inteiro OU
+# para um bloco (chunk) dele — não dependem das outras linhas.
+# =========================================================
+
+def filtra_expurgados(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Remove linhas com 'X' em 'Doc custo Expurgado'. Retorna (df, removidas)."""
+    if "Doc custo Expurgado" not in df.columns:
+        return df, 0
+    linhas_antes = len(df)
+    expurgado = por_valor_distinto(
+        df["Doc custo Expurgado"],
+        lambda s: s.astype(str).str.strip().str.upper() == "X",
+    )
+    df = df[~expurgado.to_numpy(dtype=bool)]
+    return df, linhas_antes - len(df)
+
+
+def converte_valores(df: pd.DataFrame) -> pd.DataFrame:
+    """SAP -> float nas colunas de valor e cria "Estrangeiro $"."""
+    for col in YSCLNRCL.numericas:
+        if col in df.columns:
+            df[col] = sap_serie_para_float(df[col])
+
+    # --- Criar coluna "Estrangeiro $" logo após "Valor cont local R$" ---
+    if "Val suj cont loc R$" in df.columns and "Valor cont local R$" in df.columns:
+        idx_acc = df.columns.get_loc("Valor cont local R$") + 1
+        df.insert(idx_acc, "Estrangeiro $", df["Val suj cont loc R$"] - df["Valor cont local R$"])
+    return df
+
+
+def adiciona_colunas_novas(df: pd.DataFrame) -> pd.DataFrame:
+    for col in NOVAS_COLUNAS:
+        df[col] = ""
+    return df
+
+
+def preenche_tipo_gasto(df: pd.DataFrame) -> pd.DataFrame:
+    """Prioridade: Direto > Indireto > Estoque > Outros."""
+    # Garante que as colunas necessárias existam
+    for col in ["Protocolo", "Objeto parceiro", "Doc.material"]:
+        if col not in df.columns:
+            df[col] = None
+
+    # Converte tipos
+    protocolo_num = pd.to_numeric(df["Protocolo"], errors="coerce").fillna(0)
+    doc_material_num = pd.to_numeric(df["Doc.material"], errors="coerce").fillna(0)
+
+    # Limpa e normaliza Objeto parceiro ("nan" como texto também vira vazio)
+    tem_objeto = por_valor_distinto(
+        df["Objeto parceiro"],
+        lambda s: s.astype(str).str.strip().fillna("").replace("nan", "") != "",
+    ).to_numpy(dtype=bool)
+
+    direto = (protocolo_num > 0).to_numpy()
+    indireto = ~direto & tem_objeto
+    estoque = (
+        ~direto & ~indireto
+        & ((doc_material_num > 4899999999) & (doc_material_num < 5000000000)).to_numpy()
+    )
+
+    # O que não cair em nenhuma regra fica como 'Outros'
+    tipo = np.select([direto, indireto, estoque], TIPOS_GASTO[:3], default="Outros")
+    df["Tipo de Gasto"] = pd.Categorical(tipo, categories=TIPOS_GASTO)
+    return df
+
+
+def preenche_bem_servico(df: pd.DataFrame, regras: RegrasClassificacao) -> bool:
+    """Retorna False se 'Material' / 'Bem/Serviço' não existirem (nada aplicado)."""
+    if "Material" in df.columns and "Bem/Serviço" in df.columns:
+        regras.aplica(df, "Bem/Serviço")
+        return True
+    return False
+
+
+# =========================================================
+# Chaves para as consultas SAP
+# =========================================================
+
+def normaliza_contratos(serie: pd.Series) -> pd.Series:
+    return serie.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def _distintos(serie: pd.Series) -> pd.Series:
+    # unique() antes de normalizar: com category é só sobre os códigos
+    return pd.Series(np.asarray(serie.dropna().unique(), dtype=object))
+
+
+def contratos_validos(serie: pd.Series) -> List[str]:
+    """Contratos distintos, sem vazios e sem '*' (ordem de aparição)."""
+    contratos = normaliza_contratos(_distintos(serie))
+    return [c for c in contratos.unique() if c and c != "*"]
+
+
+def objetos_validos(serie: pd.Series) -> List[str]:
+    """Objetos parceiros distintos, sem vazios e sem '*' (ordem de aparição)."""
+    objetos = _distintos(serie).astype(str).str.strip()
+    return [c for c in objetos.unique() if c and c != "*"]
+
+
+def une_chaves(destino: Dict[str, None], novas: Iterable[str]) -> None:
+    """União preservando ordem (dict como conjunto ordenado)."""
+    for chave in novas:
+        destino.setdefault(chave, None)
+
+
+# =========================================================
+# Aplicação dos resultados SAP
+# =========================================================
+
+def aplica_gestor_contrato(df: pd.DataFrame, gerentes_por_contrato: Dict[str, str]) -> pd.DataFrame:
+    df["Gestor do Contrato"] = por_valor_distinto(
+        df["Contrato"],
+        lambda s: normaliza_contratos(s).map(gerentes_por_contrato).fillna(""),
+    )
+    return df
+
+
+def aplica_gerencia(
+    df: pd.DataFrame,
+    or_para_e: Dict[str, str],
+    gerencias_por_objeto: Dict[str, str],
+) -> pd.DataFrame:
+    """
+    Objeto E -> gerência direto (KS13); objeto OR -> centro E (KO03) -> gerência.
+    Joins por dicionário (map), sem função Python por linha.
+    """
+    def _gerencia(s: pd.Series) -> pd.Series:
+        obj = s.astype(str).str.strip()  # NaN vira "nan" e cai no vazio
+        centro = obj.where(
+            obj.str.startswith("E"),
+            obj.map(or_para_e).where(obj.str.startswith("OR")),
+        )
+        return centro.map(gerencias_por_objeto).fillna("")
+
+    df["Gerência responsável pelo objeto parceiro"] = por_valor_distinto(df["Objeto parceiro"], _gerencia)
+    return df
+
+
+def chaves_sap(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """(contratos, objetos) válidos de um DataFrame/bloco JÁ sem expurgados."""
+    contratos = contratos_validos(df["Contrato"]) if "Contrato" in df.columns else []
+    objetos = objetos_validos(df["Objeto parceiro"]) if "Objeto parceiro" in df.columns else []
+    return contratos, objetos
+
+
+def processa_bloco(
+    df: pd.DataFrame,
+    regras: RegrasClassificacao,
+    sap: ResultadosSap,
+    metricas: Optional[Metricas] = None,
+    arquivo: str = "",
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Todas as etapas da Reduzida em sequência, para um bloco já lido.
+    Os lookups SAP já foram resolvidos antes (ver reports/enriquecimento.py).
+    Com `metricas`, cada etapa é medida (e somada às dos blocos anteriores).
+    Retorna (df, linhas removidas pelo expurgo).
+    """
+    with etapa(metricas, "expurgo", arquivo, len(df)):
+        df, removidas = filtra_expurgados(df)
+    n = len(df)
+    with etapa(metricas, "valores", arquivo, n):
+        df = converte_valores(df)
+    with etapa(metricas, "classificacao", arquivo, n):
+        df = adiciona_colunas_novas(df)
+        df = preenche_tipo_gasto(df)
+        preenche_bem_servico(df, regras)
+    with etapa(metricas, "enriquecimento", arquivo, n):
+        df = aplica_gestor_contrato(df, sap.gerentes_por_contrato)
+        df = aplica_gerencia(df, sap.or_para_e, sap.gerencias_por_objeto)
+    with etapa(metricas, "disciplina", arquivo, n):
+        df = regras.aplica(df, "Disciplina")
+    return df, removidas
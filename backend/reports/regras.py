@@ -0,0 +1,144 @@
+# backend/reports/regras.py
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.reports.schema import por_valor_distinto
+
+REGRAS_PATH = Path(__file__).resolve().parent / "config" / "regras_classificacao.json"
+
+_FIM = ""  # chave do nó terminal na trie (nenhum prefixo real é vazio)
+
+
+class ClassificadorPrefixos:
+    """
+    Trie de prefixos compilada a partir de uma tabela {rótulo: [prefixos]}.
+
+    Semântica idêntica ao antigo str.match(r"^(p1|p2|...)") rótulo a rótulo:
+    - "ABC*" e "ABC" significam "começa com ABC"
+    - a ordem dos rótulos na tabela define a prioridade (o primeiro que casa vence)
+    """
+
+    def __init__(self, tabela: Dict[str, List[str]]) -> None:
+        self.raiz: Dict[str, Any] = {}
+        self.rotulos: List[str] = list(tabela.keys())
+
+        for prioridade, (rotulo, prefixos) in enumerate(tabela.items()):
+            for padrao in prefixos:
+                prefixo = padrao[:-1] if padrao.endswith("*") else padrao
+                if "*" in prefixo or not prefixo:
+                    raise ValueError(f"Padrão inválido para '{rotulo}': {padrao!r} (só '*' no final)")
+
+                no = self.raiz
+                for ch in prefixo:
+                    no = no.setdefault(ch, {})
+                # mantém só a regra de maior prioridade para o mesmo prefixo
+                atual = no.get(_FIM)
+                if atual is None or prioridade < atual:
+                    no[_FIM] = prioridade
+
+    def classifica_valor(self, texto: str) -> Optional[str]:
+        """Percorre a trie uma vez e devolve o rótulo de maior prioridade que casou."""
+        melhor: Optional[int] = None
+        no = self.raiz
+        for ch in texto:
+            no = no.get(ch)
+            if no is None:
+                break
+            p = no.get(_FIM)
+            if p is not None and (melhor is None or p < melhor):
+                melhor = p
+                if melhor == 0:
+                    break
+        return None if melhor is None else self.rotulos[melhor]
+
+    def classifica(self, serie: pd.Series, *, strip: bool = False) -> pd.Series:
+        """
+        Classifica a coluna inteira avaliando cada valor DISTINTO uma única vez
+        (com category, uma vez por categoria). Sem correspondência -> NaN.
+        """
+        def _classifica(s: pd.Series) -> pd.Series:
+            textos = s.astype(str)
+            if strip:
+                textos = textos.str.strip()
+            mapa = {v: self.classifica_valor(v) for v in pd.unique(textos)}
+            return textos.map(mapa)
+
+        return por_valor_distinto(serie, _classifica)
+
+
+class RegrasClassificacao:
+    """
+    Regras da Reduzida (Disciplina, Bem/Serviço) compiladas a partir do
+    arquivo versionado config/regras_classificacao.json.
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        self.versao: str = str(config.get("versao", ""))
+        self.classificadores: Dict[str, ClassificadorPrefixos] = {
+            nome: ClassificadorPrefixos(tabela) for nome, tabela in config.get("tabelas", {}).items()
+        }
+        self.colunas: Dict[str, Dict[str, Any]] = config.get("colunas", {})
+
+    def etapas(self, coluna_destino: str) -> List[Tuple[Dict[str, List[str]], str, bool, ClassificadorPrefixos]]:
+        cfg = self.colunas[coluna_destino]
+        return [
+            (e.get("quando") or {}, e["coluna"], bool(e.get("strip")), self.classificadores[e["tabela"]])
+            for e in cfg.get("etapas", [])
+        ]
+
+    def aplica(self, df: pd.DataFrame, coluna_destino: str) -> pd.DataFrame:
+        """
+        Preenche df[coluna_destino]: cada etapa só preenche linhas ainda vazias
+        (primeira etapa que casar vence); o que sobrar recebe o valor "padrao".
+        """
+        cfg = self.colunas[coluna_destino]
+        resultado = np.full(len(df), "", dtype=object)
+        pendentes = np.ones(len(df), dtype=bool)
+
+        for quando, coluna_origem, strip, clf in self.etapas(coluna_destino):
+            if coluna_origem not in df.columns:
+                continue
+
+            mask = pendentes.copy()
+            for col_filtro, valores in quando.items():
+                mask &= df[col_filtro].isin(valores).to_numpy()
+            linhas = np.flatnonzero(mask)
+            if not len(linhas):
+                continue
+
+            rotulos = clf.classifica(df[coluna_origem].iloc[linhas], strip=strip).to_numpy()
+            casou = pd.notna(rotulos)
+            resultado[linhas[casou]] = rotulos[casou]
+            pendentes[linhas[casou]] = False
+
+        resultado[pendentes] = cfg.get("padrao", "")
+        df[coluna_destino] = pd.Categorical(resultado)
+        return df
+
+
+# caminho -> (sha256 do conteúdo, regras compiladas)
+_COMPILADAS: Dict[str, Tuple[str, RegrasClassificacao]] = {}
+
+
+def carrega_regras(caminho: Optional[str] = None) -> RegrasClassificacao:
+    """
+    Regras compiladas, recompiladas só quando o conteúdo do arquivo muda:
+    o processo do pool de etapas vive entre jobs e o JSON pode ser editado
+    (mesmo hash que entra na chave do cache de etapas).
+    """
+    path = Path(caminho) if caminho else REGRAS_PATH
+    conteudo = path.read_bytes()
+    assinatura = hashlib.sha256(conteudo).hexdigest()
+    chave = str(path.resolve())
+    compiladas = _COMPILADAS.get(chave)
+    if compiladas is None or compiladas[0] != assinatura:
+        compiladas = (assinatura, RegrasClassificacao(json.loads(conteudo.decode("utf-8"))))
+        _COMPILADAS[chave] = compiladas
+    return compiladas[1]
@@ -0,0 +1,112 @@
+# backend/reports/resumo.py
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import pandas as pd
+
+from backend.reports.colunar import disponivel as colunar_disponivel, salva_colunar
+from backend.reports.escrita import salva_csv
+from backend.reports.excel import salva_xlsx
+
+# Cubo que os analistas montavam com tabela dinâmica sobre a Reduzida inteira
+DIMENSOES = ["Disciplina", "Tipo de Gasto", "Empresa", "Trimestre/Ano"]
+MEDIDAS = ["Valor total em reais", "Val suj cont loc R$", "Valor cont local R$", "Estrangeiro $"]
+CONTAGEM = "Linhas"
+
+# no modo em blocos, junta os parciais a cada N blocos (memória ~ nº de grupos)
+_COMPACTA_A_CADA = 16
+
+
+def caminhos_resumo(caminho_reduzida: Union[str, Path]) -> Dict[str, Path]:
+    """x_Reduzida.txt -> x_Reduzida_Resumo.txt / .parquet / .xlsx / .json"""
+    txt = Path(caminho_reduzida)
+    base = txt.with_name(txt.stem + "_Resumo.txt")
+    return {
+        "txt": base,
+        "parquet": base.with_suffix(".parquet"),
+        "xlsx": base.with_suffix(".xlsx"),
+        "json": base.with_suffix(".json"),
+    }
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    # vazio/NaN vira "" (grupo próprio) em vez de sumir do groupby
+    return serie.astype(object).where(serie.notna(), "").astype(str).str.strip()
+
+
+class AcumuladorResumo:
+    """
+    Soma as MEDIDAS por DIMENSOES durante o processamento da Reduzida: o frame
+    inteiro de uma vez, ou bloco a bloco no modo em blocos (só os grupos ficam
+    em memória, nunca as linhas).
+    """
+
+    def __init__(self) -> None:
+        self._parciais: List[pd.DataFrame] = []
+
+    def adiciona(self, bloco: pd.DataFrame) -> None:
+        n = len(bloco)
+        if n == 0:
+            return
+        dados = {d: _texto(bloco[d]) if d in bloco.columns else pd.Series("", index=bloco.index) for d in DIMENSOES}
+        for m in MEDIDAS:
+            dados[m] = pd.to_numeric(bloco[m], errors="coerce") if m in bloco.columns else 0.0
+        dados[CONTAGEM] = 1
+        parcial = pd.DataFrame(dados, index=bloco.index).groupby(DIMENSOES, sort=False).sum()
+        self._parciais.append(parcial)
+
+        if len(self._parciais) >= _COMPACTA_A_CADA:
+            self._parciais = [self._junta()]
+
+    def _junta(self) -> pd.DataFrame:
+        return pd.concat(self._parciais).groupby(level=list(range(len(DIMENSOES))), sort=False).sum()
+
+    def resultado(self) -> pd.DataFrame:
+        """Uma linha por combinação de DIMENSOES, ordenada; colunas DIMENSOES + MEDIDAS + Linhas."""
+        if not self._parciais:
+            return pd.DataFrame(columns=DIMENSOES + MEDIDAS + [CONTAGEM])
+        df = self._junta().reset_index().sort_values(DIMENSOES, ignore_index=True)
+        df[CONTAGEM] = df[CONTAGEM].astype("int64")
+        return df
+
+
+def totais(cubo: pd.DataFrame, arquivo: str = "") -> Dict[str, Any]:
+    """Resumo pequeno para a tela: total geral e quebras por Tipo de Gasto e Disciplina."""
+    colunas = MEDIDAS + [CONTAGEM]
+
+    def quebra(dim: str) -> List[Dict[str, Any]]:
+        g = cubo.groupby(dim, sort=True)[colunas].sum().reset_index()
+        return g.round(2).to_dict(orient="records")
+
+    total = cubo[colunas].sum()
+    return {
+        "arquivo": arquivo,
+        "medidas": MEDIDAS,
+        "linhas": int(total[CONTAGEM]),
+        "total": {m: round(float(total[m]), 2) for m in MEDIDAS},
+        "por_tipo_gasto": quebra("Tipo de Gasto"),
+        "por_disciplina": quebra("Disciplina"),
+    }
+
+
+def salva_resumo(cubo: pd.DataFrame, caminho_reduzida: Union[str, Path]) -> Dict[str, Path]:
+    """
+    Grava o cubo ao lado da Reduzida: .txt (mesmo layout ';' / "1.234,56"),
+    .parquet (se houver pyarrow), .xlsx com uma aba e .json com os totais.
+    """
+    caminhos = caminhos_resumo(caminho_reduzida)
+    salva_csv(cubo, caminhos["txt"], formato_brasileiro=True)
+    if colunar_disponivel():
+        salva_colunar(cubo, caminhos["txt"], formatos=("parquet",))
+    else:
+        caminhos.pop("parquet")
+    salva_xlsx(cubo, caminhos["xlsx"])
+
+    resumo = totais(cubo, Path(caminho_reduzida).name)
+    tmp = caminhos["json"].with_name(caminhos["json"].name + ".tmp")
+    tmp.write_text(json.dumps(resumo, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(caminhos["json"])
+    return caminhos
@@ -0,0 +1,244 @@
+# backend/reports/schema.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+import pandas as pd
+
+from backend.reports.colunar import le_colunar
+
+ENCODINGS = ("utf-8", "latin1")
+
+T = TypeVar("T")
+
+# Colunas com poucos valores distintos repetidos em milhões de linhas:
+# lidas como category (um código inteiro por linha + tabela de valores).
+COLUNAS_CATEGORICAS = (
+    "Empresa",
+    "Moeda do objeto",
+    "Tp.doc.",
+    "Centro",
+    "Sigla da Gerência",
+    "Objeto parceiro",
+    "Contrato",
+    "Código da unidade",
+    "Doc custo Expurgado",
+    "Tipo de Gasto",
+    "Disciplina",
+)
+
+
+@dataclass(frozen=True)
+class SchemaExtrato:
+    """
+    Layout declarado de um extrato SAP (';' separado).
+
+    - colunas: colunas lidas, na ordem do arquivo final (pode repetir nome,
+      ex: "Denominação", igual ao layout antigo)
+    - numericas: valores SAP ("1,234.56-") convertidos para float após a leitura
+    - datas: datas dd.mm.aaaa (mantidas como texto na saída)
+    - dtypes: exceções ao padrão (ex: "category"); o resto é lido como texto
+      (sem inferência, então "Contrato" não vira 4600001234.0)
+    - codigos: ids que o ALV alinha com espaços ("  10158821"): lidos sem eles,
+      como saíam quando a leitura antiga os inferia como número
+    """
+    nome: str
+    colunas: Tuple[str, ...]
+    numericas: Tuple[str, ...] = ()
+    datas: Tuple[str, ...] = ()
+    dtypes: Dict[str, str] = field(default_factory=dict)
+    codigos: Tuple[str, ...] = ()
+
+    def dtype_leitura(self, colunas: List[str]) -> Dict[str, str]:
+        return {c: self.dtypes.get(c, "str") for c in colunas}
+
+
+YSCLNRCL = SchemaExtrato(
+    nome="YSCLNRCL",
+    colunas=(
+        "Identificação DrillD", "Nº documento", "Linha lçto.", "Empresa", "Exercício", "Período",
+        "Trimestre/Ano", "Data lçto.", "Data documento", "Nº doc.referên.", "Denominação", "Txt.cab.doc.",
+        "Def.projeto", "Den. do projeto", "Elemento PEP", "Denominação do PEP", "Objeto", "Atividade Petrobras",
+        "Descrição Ativ", "Cta.contrapart.", "Denom.conta contrap.", "Centro", "Cen.cst.solic.", "Centro de lucro",
+        "Classe de custo", "Tp.doc.", "Desc Classe de Custo", "Valor/Moeda obj", "Moeda do objeto",
+        "Valor total em reais", "Val suj cont loc R$", "Valor cont local R$", "Valor/moeda ACC", "Moeda da ACC",
+        "Moeda transação", "Objeto parceiro", "Denom.obj.parc.", "Material", "Denominação", "Doc.compras",
+        "Trat. Cont. Local", "MIGO", "MIRO", "Perc Cont Local Calc", "Certificado C.L.", "Perc Cont Local Info",
+        "Justificativa %", "Taxa câmbio", "Grp.class.custo", "Doc.de estorno", "Doc.estornado", "Descrição da linha",
+        "Código Regra", "Nat. G. Cal", "Descrição calculada", "Reclassificação", "Fase Consolidada", "Nat. Gast. Cons",
+        "Perc Cont Local Con.", "Descrição con.", "Protocolo", "CNPJ do fornecedor", "Data Doc. Fiscal", "Referência",
+        "Valor Total NF Reais", "Nº NF", "Nº da NF-e", "Doc.material", "It.  Material", "Tipo avaliação",
+        "Código campo/bloco", "Sigla campo/bloco", "Contrato", "Forn. pedido", "Tipo movimento", "Desc. forn. pedido",
+        "Doc custo Expurgado", "Fator Apr.CCs Consol", "Código da unidade", "Tipo de Operação",
+        "Denom.Tp.Operação", "Texto", "Sigla da Gerência", "Doc.faturamento", "Doc.ref.", "Prog Expl Obrig/Mín",
+        "Denominação Obj.", "Status Item/pedido", "EAP Unica", "Ref.estorno", "Visão EAP ÚNICA",
+        "Percent_Rateio_Jaz", "Vl Nacional Atual", "Nome  do Índice", "Mês/ano ref.", "Ft. correção",
+    ),
+    numericas=(
+        "Valor/Moeda obj",
+        "Valor total em reais",
+        "Val suj cont loc R$",
+        "Valor cont local R$",
+        "Valor/moeda ACC",
+    ),
+    datas=("Data lçto.", "Data documento", "Data Doc. Fiscal"),
+    dtypes={c: "category" for c in COLUNAS_CATEGORICAS},
+    codigos=(
+        "Nº documento", "Nº doc.referên.", "Cta.contrapart.", "Classe de custo", "Material",
+        "Doc.compras", "Protocolo", "Doc.material", "Contrato", "Forn. pedido",
+        "Doc.de estorno", "Doc.estornado", "Doc.faturamento", "Doc.ref.",
+    ),
+)
+
+SCHEMAS: Dict[str, SchemaExtrato] = {
+    YSCLNRCL.nome: YSCLNRCL,
+}
+
+
+def le_cabecalho(caminho: Union[str, Path]) -> Tuple[List[str], str]:
+    """
+    Lê SÓ a linha de cabeçalho (nrows=0).
+    Retorna (colunas, encoding que funcionou).
+    """
+    ultimo_erro: Optional[Exception] = None
+    for enc in ENCODINGS:
+        try:
+            cab = pd.read_csv(caminho, sep=";", encoding=enc, nrows=0)
+            return list(cab.columns), enc
+        except UnicodeDecodeError as e:
+            ultimo_erro = e
+    raise ultimo_erro  # type: ignore[misc]
+
+
+def verifica_cabecalho(
+    caminho: Union[str, Path],
+    schema: SchemaExtrato = YSCLNRCL,
+) -> Tuple[List[str], List[str], str]:
+    """
+    Confere o cabeçalho contra o schema antes do parse completo.
+    Retorna (colunas_existentes, colunas_faltando, encoding), na ordem do schema.
+    """
+    cabecalho, enc = le_cabecalho(caminho)
+    presentes = set(cabecalho)
+    existentes = [c for c in schema.colunas if c in presentes]
+    faltando = [c for c in schema.colunas if c not in presentes]
+    return existentes, faltando, enc
+
+
+def le_extrato(
+    caminho: Union[str, Path],
+    schema: SchemaExtrato = YSCLNRCL,
+    colunas: Optional[List[str]] = None,
+    encoding: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Leitura projetada e tipada: só as colunas do schema (usecols) e como texto
+    (dtype), sem carregar o arquivo inteiro para depois recortar.
+    """
+    if colunas is None or encoding is None:
+        existentes, _faltando, enc = verifica_cabecalho(caminho, schema)
+        colunas = colunas if colunas is not None else existentes
+        encoding = encoding or enc
+
+    unicas = list(dict.fromkeys(colunas))
+    dtypes = schema.dtype_leitura(unicas)
+
+    # Cópia colunar do extrato (ver reports/colunar.py) em dia: leitura
+    # seletiva e já tipada, sem parse de texto
+    df = le_colunar(caminho, unicas, categorias=[c for c, t in dtypes.items() if t == "category"])
+    if df is None:
+        kwargs = dict(sep=";", usecols=unicas, dtype=dtypes)
+        try:
+            df = pd.read_csv(caminho, encoding=encoding, **kwargs)
+        except UnicodeDecodeError:
+            # cabeçalho em utf-8 válido, mas corpo não
+            df = pd.read_csv(caminho, encoding="latin1", **kwargs)
+
+    df = _sem_espacos_codigos(df, schema)
+
+    # reordena (e repete colunas duplicadas do layout, como "Denominação")
+    if list(df.columns) != list(colunas):
+        df = df[list(colunas)]
+    return df
+
+
+def _sem_espacos_codigos(df: pd.DataFrame, schema: SchemaExtrato) -> pd.DataFrame:
+    """Tira os espaços de alinhamento das colunas `codigos` (category: uma vez por valor distinto)."""
+    for col in schema.codigos:
+        if col not in df.columns:
+            continue
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            categorias = serie.cat.categories.astype(str)
+            if (categorias == categorias.str.strip()).all():
+                continue
+            df[col] = por_valor_distinto(serie, lambda s: s.str.strip()).astype("category")
+        elif serie.dtype == object:
+            df[col] = serie.str.strip()
+    return df
+
+
+def com_fallback_latin1(passada: Callable[[str], T], encoding: str) -> T:
+    """
+    Roda uma passada de leitura (função que recebe o encoding); se o corpo do
+    arquivo não for utf-8, recomeça a passada inteira em latin1.
+    """
+    try:
+        return passada(encoding)
+    except UnicodeDecodeError:
+        if encoding == "latin1":
+            raise
+        return passada("latin1")
+
+
+def le_extrato_em_blocos(
+    caminho: Union[str, Path],
+    schema: SchemaExtrato = YSCLNRCL,
+    colunas: Optional[List[str]] = None,
+    encoding: str = "utf-8",
+    linhas_por_bloco: int = 200_000,
+) -> Iterator[pd.DataFrame]:
+    """
+    Mesma leitura projetada/tipada de le_extrato, mas em blocos de
+    linhas_por_bloco linhas (memória limitada ao tamanho do bloco).
+
+    Obs.: um UnicodeDecodeError pode surgir no meio do arquivo; quem consome
+    decide se recomeça com latin1.
+    """
+    if colunas is None:
+        colunas, _faltando, _enc = verifica_cabecalho(caminho, schema)
+
+    unicas = list(dict.fromkeys(colunas))
+    leitor = pd.read_csv(
+        caminho,
+        sep=";",
+        encoding=encoding,
+        usecols=unicas,
+        dtype=schema.dtype_leitura(unicas),
+        chunksize=linhas_por_bloco,
+    )
+    with leitor:
+        for bloco in leitor:
+            bloco = _sem_espacos_codigos(bloco, schema)
+            if list(bloco.columns) != list(colunas):
+                bloco = bloco[list(colunas)]
+            yield bloco
+
+
+def por_valor_distinto(serie: pd.Series, funcao: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """
+    Aplica `funcao` (elemento a elemento, Series -> Series) uma vez por valor
+    distinto quando a coluna é category, e espalha o resultado pelos códigos.
+    NaN recebe o mesmo tratamento que teria sem category.
+    Para colunas comuns chama `funcao` direto.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        return funcao(serie)
+
+    valores = pd.Series(list(serie.cat.categories) + [np.nan], dtype=object)
+    resultado = funcao(valores).to_numpy()
+    # código -1 (NaN) pega a última posição, que é o resultado de NaN
+    return pd.Series(resultado[serie.cat.codes.to_numpy()], index=serie.index, name=serie.name)
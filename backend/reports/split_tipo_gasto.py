@@ -0,0 +1,190 @@
+# backend/reports/split_tipo_gasto.py
+"""
+Separação da Reduzida por "Tipo de Gasto" (substitui estoques.py,
+gastosDiretos.py e gastosIndiretos.py).
+
+Lê cada _Reduzida.txt UMA vez (em blocos, ou a cópia colunar se houver) e
+grava todas as partições ao mesmo tempo.
+
+requests.json (AppData):
+- destino[*].file_completaN + paths[0].path3 -> quais _Reduzida.txt ler
+- switches.diretos / indiretos / estoques / outros -> quais partições gravar
+  (sem "switches": grava as partições que têm pasta definida)
+- paths[0].path4 / path5 / path6 / path7 -> pasta de cada partição
+  (vazia = mesma pasta da Reduzida)
+"""
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.reports.colunar import le_colunar
+from backend.reports.escrita import salva_csv
+from backend.reports.schema import com_fallback_latin1, por_valor_distinto
+
+APP_NAME = "AUTO_CL"
+
+# Tipo de Gasto -> (switch, chave de paths, sufixo do arquivo)
+PARTICOES: Dict[str, Tuple[str, str, str]] = {
+    "Direto": ("diretos", "path4", "_gastosDiretos.txt"),
+    "Indireto": ("indiretos", "path5", "_gastosIndiretos.txt"),
+    "Estoque": ("estoques", "path6", "_estoques.txt"),
+    "Outros": ("outros", "path7", "_outros.txt"),
+}
+
+LINHAS_POR_BLOCO = 200_000
+
+
+def normaliza_tipo(serie: pd.Series) -> pd.Series:
+    """' direto ' -> 'Direto'; qualquer valor fora das partições -> 'Outros'."""
+    por_nome = {t.lower(): t for t in PARTICOES}
+    return por_valor_distinto(
+        serie,
+        lambda s: s.astype(str).str.strip().str.lower().map(por_nome).fillna("Outros"),
+    )
+
+
+def particiona_arquivo(
+    arquivo: Path,
+    destinos: Dict[str, Path],
+    linhas_por_bloco: int = LINHAS_POR_BLOCO,
+    encoding: str = "utf-8",
+) -> Dict[str, int]:
+    """
+    Grava as linhas de `arquivo` em destinos[tipo] numa única leitura.
+    Retorna {tipo: linhas gravadas}. Todo destino recebe ao menos o cabeçalho.
+    """
+    # Cópia colunar da Reduzida: já tipada, lida inteira de uma vez
+    df = le_colunar(arquivo, categorias=["Tipo de Gasto"])
+    if df is not None:
+        return _grava_blocos([df], destinos, _cabecalho_original(arquivo, encoding))
+
+    def passada(enc: str) -> Dict[str, int]:
+        cabecalho = _cabecalho_original(arquivo, enc)
+        # texto como texto: as linhas saem iguais às da Reduzida
+        leitor = pd.read_csv(
+            arquivo,
+            sep=";",
+            encoding=enc,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=linhas_por_bloco,
+        )
+        with leitor:
+            return _grava_blocos(leitor, destinos, cabecalho)
+
+    return com_fallback_latin1(passada, encoding)
+
+
+def _cabecalho_original(arquivo: Path, encoding: str) -> List[str]:
+    """
+    Cabeçalho como está no arquivo: o pandas renomeia a 2ª "Denominação"
+    para "Denominação.1" na leitura; na saída volta o nome original.
+    """
+    try:
+        linha = pd.read_csv(arquivo, sep=";", header=None, nrows=1, dtype=str, encoding=encoding)
+    except UnicodeDecodeError:
+        linha = pd.read_csv(arquivo, sep=";", header=None, nrows=1, dtype=str, encoding="latin1")
+    return linha.iloc[0].tolist()
+
+
+def _grava_blocos(blocos, destinos: Dict[str, Path], cabecalho: List[str]) -> Dict[str, int]:
+    contagem = {tipo: 0 for tipo in destinos}
+    primeiro = True
+    for bloco in blocos:
+        tipos = normaliza_tipo(bloco["Tipo de Gasto"]).to_numpy()
+        if len(cabecalho) == bloco.shape[1]:
+            bloco = bloco.set_axis(cabecalho, axis=1)
+        for tipo, destino in destinos.items():
+            parte = bloco[tipos == tipo]
+            # 1º bloco recria o arquivo (com cabeçalho); os demais acrescentam
+            salva_csv(parte, destino, modo="w" if primeiro else "a", cabecalho=primeiro)
+            contagem[tipo] += len(parte)
+        primeiro = False
+    return contagem
+
+
+def _requests_path_appdata() -> Path:
+    base = os.environ.get("LOCALAPPDATA")
+    appdata_dir = Path(base) / APP_NAME if base else Path.home() / f".{APP_NAME.lower()}"
+    return appdata_dir / "requests.json"
+
+
+def arquivos_reduzida(data: dict, pasta_reduzida: Path) -> List[Path]:
+    """_Reduzida.txt de cada arquivo do destino (mesma ordem da Reduzida)."""
+    arquivos = []
+    destinos = data.get("destino", [])
+    if not isinstance(destinos, list):
+        destinos = [destinos]
+    for d in destinos:
+        if not isinstance(d, dict):
+            continue
+        chaves = sorted(
+            (k for k in d if k.startswith("file_completa")),
+            key=lambda x: int(x.replace("file_completa", "") or 0),
+        )
+        for k in chaves:
+            if d.get(k):
+                arquivos.append(pasta_reduzida / os.path.basename(d[k]).replace(".txt", "_Reduzida.txt"))
+    return arquivos
+
+
+def main() -> int:
+    requests_path = _requests_path_appdata()
+    try:
+        with open(requests_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[ERRO] Falha ao ler requests.json ({requests_path}): {e}")
+        print("status_error")
+        return 1
+
+    paths = data.get("paths") or [{}]
+    paths = paths[0] if isinstance(paths, list) and paths else {}
+    pasta_reduzida = Path((paths.get("path3") or "").strip())
+    switches = data.get("switches") if isinstance(data.get("switches"), dict) else None
+    opcoes = data.get("opcoes") if isinstance(data.get("opcoes"), dict) else {}
+    linhas_por_bloco = int(opcoes.get("reduzida_linhas_por_bloco", LINHAS_POR_BLOCO) or LINHAS_POR_BLOCO)
+
+    ativas = {}
+    for tipo, (switch, chave_path, sufixo) in PARTICOES.items():
+        pasta = (paths.get(chave_path) or "").strip()
+        if (switches.get(switch) if switches is not None else bool(pasta)):
+            ativas[tipo] = (Path(pasta) if pasta else pasta_reduzida, sufixo)
+
+    if not ativas:
+        print("Nenhuma partição de Tipo de Gasto selecionada.")
+        print("status_success")
+        return 0
+
+    arquivos = [a for a in arquivos_reduzida(data, pasta_reduzida) if a.exists()]
+    if not arquivos:
+        print("[ERRO] Nenhum arquivo _Reduzida.txt encontrado para separar.")
+        print("status_error")
+        return 1
+
+    status_done = "status_success"
+    for arquivo in arquivos:
+        destinos = {}
+        for tipo, (pasta, sufixo) in ativas.items():
+            pasta.mkdir(parents=True, exist_ok=True)
+            destinos[tipo] = pasta / arquivo.name.replace("_Reduzida.txt", sufixo)
+
+        try:
+            contagem = particiona_arquivo(arquivo, destinos, linhas_por_bloco)
+            for tipo, linhas in contagem.items():
+                print(f"[OK] {arquivo.name} -> {destinos[tipo].name} ({linhas} linhas, {tipo})")
+        except Exception as e:
+            print(f"[ERRO] Falha ao separar {arquivo.name}: {e}")
+            status_done = "status_error"
+
+    print(status_done)
+    return 0 if status_done == "status_success" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,629 @@
+# backend/reports/tests.py
+# Da raiz do repo: python -m pytest backend/reports/tests.py
+# (ou, em backend/: PYTHONPATH=.. python manage.py test reports)
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from backend.benchmarks.executa import respostas_sap
+from backend.benchmarks.gerador import gera_extrato
+from backend.reports import colunar, escrita, split_tipo_gasto
+from backend.reports.escrita import COLUNAS_MOEDA, salva_csv
+from backend.reports.excel import FORMATO_MOEDA, EscritorXlsx, csv_para_xlsx
+from backend.reports.numeros import (
+    formata_brasileiro,
+    formata_brasileiro_serie,
+    sap_serie_para_float,
+    sap_str_para_float,
+)
+from backend.reports.reduzida import OpcoesReduzida, processa_arquivo
+from backend.reports.reduzida_etapas import filtra_expurgados
+from backend.reports.regras import REGRAS_PATH, ClassificadorPrefixos, RegrasClassificacao, carrega_regras
+from backend.reports.schema import YSCLNRCL, le_extrato, le_extrato_em_blocos, verifica_cabecalho
+from backend.reports.split_tipo_gasto import PARTICOES, normaliza_tipo, particiona_arquivo
+
+
+class SapSerieParaFloatTests(unittest.TestCase):
+    """A versão vetorizada dá o mesmo float que sap_str_para_float célula a célula."""
+
+    VALORES = [
+        "1,000.00-", "1,234,567.89", "0.00", "-", "  12.5  ", "", "   ", None, np.nan,
+        "abc", "1_000", "1.2.3", "12-", "-12", "1e3", "0,50", "-0.00", ".5", "5.",
+    ]
+
+    def test_igual_ao_escalar(self):
+        serie = pd.Series(self.VALORES, dtype=object)
+        esperado = [sap_str_para_float(v) for v in self.VALORES]
+        obtido = sap_serie_para_float(serie).tolist()
+        self.assertEqual(obtido, esperado)
+
+    def test_aleatorio(self):
+        rng = np.random.default_rng(0)
+        numeros = rng.normal(0, 1e6, 5000).round(2)
+        textos = [f"{abs(x):,.2f}" + ("-" if x < 0 else "") for x in numeros]
+        textos[::97] = [""] * len(textos[::97])
+        serie = pd.Series(textos)
+        esperado = [sap_str_para_float(v) for v in textos]
+        np.testing.assert_array_equal(sap_serie_para_float(serie).to_numpy(), esperado)
+
+    def test_preserva_indice_e_nome(self):
+        serie = pd.Series(["1.00", "2.00-"], index=[10, 20], name="Valor/Moeda obj")
+        resultado = sap_serie_para_float(serie)
+        self.assertEqual(list(resultado.index), [10, 20])
+        self.assertEqual(resultado.name, "Valor/Moeda obj")
+        self.assertEqual(resultado.dtype, np.float64)
+
+    def test_categoria(self):
+        serie = pd.Series(["1,000.00-", "", "1,000.00-", None], dtype="category")
+        self.assertEqual(sap_serie_para_float(serie).tolist(), [-1000.0, 0.0, -1000.0, 0.0])
+
+
+class FormatoBrasileiroTests(unittest.TestCase):
+    """Valores continuam float no frame; o "1.234,56" sai igual ao antigo .apply(formata_brasileiro)."""
+
+    VALORES = [0.0, -0.0, 1234.5, -1234.5, 1234567.891, 0.005, 0.015, -0.004, 1e12, np.nan, 7.0]
+
+    def test_serie_igual_ao_escalar(self):
+        serie = pd.Series(self.VALORES)
+        esperado = serie.apply(formata_brasileiro)
+        pd.testing.assert_series_equal(formata_brasileiro_serie(serie), esperado)
+
+    def test_serie_so_nan(self):
+        serie = pd.Series([np.nan, np.nan])
+        pd.testing.assert_series_equal(formata_brasileiro_serie(serie), serie.apply(formata_brasileiro))
+
+    def test_salva_csv_igual_ao_layout_antigo(self):
+        rng = np.random.default_rng(1)
+        n = 25
+        df = pd.DataFrame({
+            "Contrato": [f"46000{i:05d}" for i in range(n)],
+            "Valor/Moeda obj": rng.normal(0, 1e5, n).round(2),
+            "Valor total em reais": rng.normal(0, 1e5, n).round(2),
+            "Texto": ["á;b" if i % 5 == 0 else f"linha {i}" for i in range(n)],
+            "Estrangeiro $": rng.normal(0, 10, n).round(2),
+        })
+        df.loc[3, "Valor total em reais"] = np.nan
+
+        antigo = df.copy()
+        for col in COLUNAS_MOEDA:
+            if col in antigo.columns:
+                antigo[col] = antigo[col].apply(formata_brasileiro)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            esperado = Path(tmp) / "antigo.txt"
+            obtido = Path(tmp) / "novo.txt"
+            antigo.to_csv(esperado, sep=";", index=False, encoding="utf-8")
+            # blocos pequenos: cabeçalho só no primeiro, o resto acrescentado
+            with mock.patch.object(escrita, "LINHAS_POR_BLOCO", 7):
+                salva_csv(df, obtido)
+            self.assertEqual(obtido.read_bytes(), esperado.read_bytes())
+
+        self.assertTrue(pd.api.types.is_float_dtype(df["Valor/Moeda obj"]))
+
+
+def _regex_antigo(df: pd.DataFrame, config: dict, coluna_destino: str) -> pd.Series:
+    """
+    Classificação antiga da reduzida: um str.match(r"^(p1|p2|...)") por rótulo,
+    preenchendo só as linhas ainda vazias; o que sobra recebe o padrão.
+    """
+    cfg = config["colunas"][coluna_destino]
+    resultado = pd.Series("", index=df.index, dtype=object)
+    for etapa in cfg["etapas"]:
+        mask = pd.Series(True, index=df.index)
+        for col_filtro, valores in (etapa.get("quando") or {}).items():
+            mask &= df[col_filtro].isin(valores)
+        textos = df[etapa["coluna"]].astype(str)
+        if etapa.get("strip"):
+            textos = textos.str.strip()
+        for rotulo, prefixos in config["tabelas"][etapa["tabela"]].items():
+            regex = "^(" + "|".join(p.replace("*", ".*") for p in prefixos) + ")"
+            casou = mask & textos.str.match(regex, na=False) & (resultado == "")
+            resultado[casou] = rotulo
+    resultado[resultado == ""] = cfg.get("padrao", "")
+    return resultado
+
+
+class ClassificadorPrefixosTests(unittest.TestCase):
+    """A trie compilada do JSON classifica igual ao antigo regex rótulo a rótulo."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config = json.loads(REGRAS_PATH.read_text(encoding="utf-8"))
+
+    def _valores(self, rng, tabelas, n):
+        """Prefixos reais (com e sem sufixo), pedaços de prefixo, lixo e NaN."""
+        prefixos = [p.rstrip("*") for t in tabelas for ps in self.config["tabelas"][t].values() for p in ps]
+        valores = []
+        for _ in range(n):
+            p = prefixos[rng.integers(len(prefixos))]
+            sorteio = rng.random()
+            if sorteio < 0.5:
+                valores.append(p + str(rng.integers(0, 1000)))
+            elif sorteio < 0.65:
+                valores.append(p[: max(1, len(p) - 1)])
+            elif sorteio < 0.75:
+                valores.append(" " + p + " ")
+            elif sorteio < 0.9:
+                valores.append(f"X{rng.integers(0, 10**6)}")
+            else:
+                valores.append(np.nan)
+        return valores
+
+    def _frame(self, seed=0, n=3000):
+        rng = np.random.default_rng(seed)
+        tabelas_disciplina = ["diret_dict", "indireto_dict", "op_dict", "estoque_dict"]
+        return pd.DataFrame({
+            "Tipo de Gasto": rng.choice(["Direto", "Outros", "Indireto", "Estoque", ""], n),
+            "Sigla da Gerência": self._valores(rng, tabelas_disciplina, n),
+            "Gerência responsável pelo objeto parceiro": self._valores(rng, tabelas_disciplina, n),
+            "Objeto parceiro": self._valores(rng, tabelas_disciplina, n),
+            "Código da unidade": self._valores(rng, tabelas_disciplina, n),
+            "Material": self._valores(rng, ["bem_servico"], n),
+        })
+
+    def test_igual_ao_regex_antigo(self):
+        regras = RegrasClassificacao(self.config)
+        for seed in range(3):
+            df = self._frame(seed)
+            for coluna in ("Disciplina", "Bem/Serviço"):
+                esperado = _regex_antigo(df, self.config, coluna)
+                obtido = regras.aplica(df.copy(), coluna)[coluna]
+                self.assertEqual(obtido.astype(str).tolist(), esperado.tolist(), f"{coluna} (seed {seed})")
+
+    def test_igual_ao_regex_antigo_com_category(self):
+        regras = RegrasClassificacao(self.config)
+        df = self._frame(seed=7)
+        categorico = df.astype({c: "category" for c in ("Tipo de Gasto", "Sigla da Gerência", "Objeto parceiro")})
+        esperado = _regex_antigo(df, self.config, "Disciplina")
+        obtido = regras.aplica(categorico, "Disciplina")["Disciplina"]
+        self.assertEqual(obtido.astype(str).tolist(), esperado.tolist())
+
+    def test_primeiro_rotulo_vence(self):
+        clf = ClassificadorPrefixos({"A": ["ABC*"], "B": ["AB*", "ABCD"], "C": ["X"]})
+        self.assertEqual(clf.classifica_valor("ABCDE"), "A")
+        self.assertEqual(clf.classifica_valor("ABX"), "B")
+        self.assertEqual(clf.classifica_valor("XYZ"), "C")  # sem "*" também é prefixo, como no regex
+        self.assertIsNone(clf.classifica_valor("A"))
+        self.assertIsNone(clf.classifica_valor(""))
+
+    def test_padrao_invalido(self):
+        for padrao in ("A*B", "*", ""):
+            with self.assertRaises(ValueError):
+                ClassificadorPrefixos({"A": [padrao]})
+
+    def test_prefixos_sem_metacaracteres_de_regex(self):
+        # o regex antigo não escapava os prefixos: a comparação acima só vale sem eles
+        for tabela in self.config["tabelas"].values():
+            for prefixos in tabela.values():
+                for prefixo in prefixos:
+                    self.assertIsNone(re.search(r"[.+?()\[\]{}|^$\\]", prefixo), prefixo)
+
+
+class LeituraSchemaTests(unittest.TestCase):
+    """le_extrato (usecols + texto) contra a leitura antiga: arquivo inteiro com inferência, depois recorte."""
+
+    CABECALHO = [
+        "Identificação DrillD", "Nº documento", "Empresa", "Denominação", "Coluna fora do schema",
+        "Valor/Moeda obj", "Material", "Denominação", "Contrato", "Protocolo", "Taxa câmbio", "Texto",
+    ]
+
+    def _grava(self, pasta: Path, encoding: str = "utf-8", linhas: int = 40) -> Path:
+        registros = []
+        for i in range(linhas):
+            registros.append([
+                f"D{i}", f"{5100000000 + i}", "1000", f"Denominação {i}", "x",
+                f"{i},000.00-" if i % 3 else "12.50", f"  {10158821 + i}", f"Material ção {i}",
+                "" if i % 4 == 0 else f"{4600001234 + i}", f"{i:08d}", "1.0000", "" if i % 2 else " texto ",
+            ])
+        caminho = pasta / f"extrato_{encoding}.txt"
+        with caminho.open("w", encoding=encoding, newline="") as f:
+            f.write(";".join(self.CABECALHO) + "\n")
+            for r in registros:
+                f.write(";".join(r) + "\n")
+        return caminho
+
+    def _leitura_antiga(self, caminho: Path) -> pd.DataFrame:
+        """O que a reduzida fazia antes do schema (tipos inferidos pelo pandas)."""
+        try:
+            df = pd.read_csv(caminho, sep=";", encoding="utf-8", low_memory=False)
+        except UnicodeDecodeError:
+            df = pd.read_csv(caminho, sep=";", encoding="latin1", low_memory=False)
+        return df[[c for c in YSCLNRCL.colunas if c in df.columns]]
+
+    def test_cabecalho(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = self._grava(Path(tmp))
+            existentes, faltando, enc = verifica_cabecalho(caminho)
+        self.assertEqual(enc, "utf-8")
+        self.assertEqual(existentes, [c for c in YSCLNRCL.colunas if c in self.CABECALHO])
+        self.assertEqual(existentes.count("Denominação"), 2)
+        self.assertNotIn("Coluna fora do schema", existentes)
+        self.assertIn("Centro", faltando)
+        self.assertEqual(len(existentes) + len(faltando), len(YSCLNRCL.colunas))
+
+    def test_igual_a_leitura_antiga(self):
+        """
+        Texto igual ao antigo; o que ele inferia como número tem o mesmo valor,
+        mas agora como o texto do SAP (sem o ".0" dos ids, com os zeros à
+        esquerda do Protocolo e a "Taxa câmbio" como "1.0000").
+        """
+        for encoding in ("utf-8", "latin1"):
+            with tempfile.TemporaryDirectory() as tmp:
+                caminho = self._grava(Path(tmp), encoding)
+                antigo = self._leitura_antiga(caminho)
+                obtido = le_extrato(caminho)
+            self.assertEqual(list(obtido.columns), list(antigo.columns))
+            self.assertEqual(obtido["Empresa"].dtype, "category")
+
+            for j, coluna in enumerate(antigo.columns):
+                velho = antigo.iloc[:, j]
+                novo = obtido.iloc[:, j].astype(object)
+                if pd.api.types.is_numeric_dtype(velho):
+                    pd.testing.assert_series_equal(pd.to_numeric(novo), velho.astype(float), check_dtype=False)
+                else:
+                    pd.testing.assert_series_equal(novo, velho.astype(object))
+
+    def test_codigos_sem_espacos_de_alinhamento(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = self._grava(Path(tmp))
+            inteiro = le_extrato(caminho)
+            blocos = pd.concat(le_extrato_em_blocos(caminho, linhas_por_bloco=7), ignore_index=True)
+        for df in (inteiro, blocos):
+            self.assertEqual(df["Material"].iloc[0], "10158821")
+            self.assertEqual(df["Texto"].iloc[0], " texto ")  # texto livre fica como veio
+
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = Path(tmp) / "extrato.txt"
+            caminho.write_text("Contrato;Material\n  4600000001;10\n4600000001;  10\n;\n", encoding="utf-8")
+            df = le_extrato(caminho)
+        self.assertEqual(df["Contrato"].dtype, "category")
+        self.assertEqual(list(df["Contrato"].cat.categories), ["4600000001"])
+        self.assertEqual(df["Material"].tolist()[:2], ["10", "10"])
+        self.assertTrue(df.iloc[2].isna().all())
+
+    def test_ids_continuam_texto(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            df = le_extrato(self._grava(Path(tmp)))
+        self.assertEqual(df["Contrato"].iloc[1], "4600001235")
+        self.assertTrue(pd.isna(df["Contrato"].iloc[0]))
+        self.assertEqual(df["Protocolo"].iloc[7], "00000007")
+        self.assertEqual(df["Nº documento"].iloc[2], "5100000002")
+        self.assertEqual(df["Valor/Moeda obj"].iloc[1], "1,000.00-")  # convertido depois, com sap_serie_para_float
+
+    def test_em_blocos_igual_ao_inteiro(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = self._grava(Path(tmp), linhas=95)
+            inteiro = le_extrato(caminho)
+            blocos = list(le_extrato_em_blocos(caminho, linhas_por_bloco=30))
+        self.assertEqual(len(blocos), 4)
+        juntos = pd.concat(blocos, ignore_index=True)
+        pd.testing.assert_frame_equal(juntos.astype(object), inteiro.astype(object))
+
+
+@unittest.skipUnless(colunar.disponivel(), "pyarrow não instalado")
+class CopiaColunarTests(unittest.TestCase):
+    """
+    A cópia Parquet/Arrow da Completa sai dos blocos da conversão para xlsx
+    e tem de ser igual à leitura antiga (read_csv do .txt, tudo texto).
+    """
+
+    CABECALHO = ["Nº documento", "Denominação", "Valor/Moeda obj", "Denominação", "Contrato", "Texto"]
+
+    def _grava(self, pasta: Path, linhas: int, acento_na_linha: int, encoding: str, cabecalho=CABECALHO) -> Path:
+        caminho = pasta / "extrato.txt"
+        with caminho.open("w", encoding=encoding, newline="") as f:
+            f.write(";".join(cabecalho) + "\n")
+            for i in range(linhas):
+                texto = "manutenção" if i == acento_na_linha else f"linha {i:06d} com texto de preenchimento"
+                valor = "" if i % 11 == 0 else f"{i},{i % 1000:03d}.50-"
+                contrato = "" if i % 7 == 0 else f"{4600000000 + i}"
+                f.write(";".join([f"{5100000000 + i}", f"Den {i}", valor, f"Den2 {i}", contrato, texto]) + "\n")
+        return caminho
+
+    def _confere(self, txt: Path, encoding: str, linhas_por_bloco: int) -> None:
+        pasta = txt.parent
+        escritor = csv_para_xlsx(txt, pasta / "extrato.xlsx", linhas_por_bloco=linhas_por_bloco, copia_colunar=True)
+        esperado = pd.read_csv(txt, sep=";", encoding=encoding, dtype=str)
+        self.assertEqual(escritor.linhas, len(esperado))
+
+        for formato in colunar.FORMATOS:
+            self.assertTrue(colunar.caminho_colunar(txt, formato).exists(), formato)
+        self.assertEqual([p.name for p in pasta.glob("*.tmp")], [])
+
+        obtido = colunar.le_colunar(txt)
+        self.assertIsNotNone(obtido)
+        pd.testing.assert_frame_equal(obtido, esperado)
+        parquet = pd.read_parquet(colunar.caminho_colunar(txt, "parquet"))
+        pd.testing.assert_frame_equal(parquet.where(parquet.notna(), np.nan), esperado)
+
+    def test_utf8(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._confere(self._grava(Path(tmp), 500, 10, "utf-8"), "utf-8", linhas_por_bloco=64)
+
+    def test_latin1_desde_o_cabecalho(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._confere(self._grava(Path(tmp), 500, 10, "latin1"), "latin1", linhas_por_bloco=64)
+
+    def test_latin1_no_meio_recomeca_do_zero(self):
+        # cabeçalho ASCII: a passada utf-8 grava vários blocos antes do primeiro byte latin1
+        cabecalho = ["Documento", "Denominacao", "Valor/Moeda obj", "Denominacao", "Contrato", "Texto"]
+        escritos = []
+        escreve = colunar.EscritorColunar.escreve
+
+        def conta(escritor, bloco):
+            escritos.append(len(bloco))
+            escreve(escritor, bloco)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            txt = self._grava(Path(tmp), 60_000, 59_000, "latin1", cabecalho)
+            with mock.patch.object(colunar.EscritorColunar, "escreve", conta):
+                self._confere(txt, "latin1", linhas_por_bloco=5_000)
+        self.assertGreater(sum(escritos), 60_000)  # utf-8 parcial descartado + latin1 completo
+
+    def test_sem_copia(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pasta = Path(tmp)
+            txt = self._grava(pasta, 20, 0, "utf-8")
+            csv_para_xlsx(txt, pasta / "extrato.xlsx")
+            self.assertIsNone(colunar.colunar_atual(txt))
+
+
+class ReduzidaEmBlocosTests(unittest.TestCase):
+    """Modo em blocos (processa_streaming) contra o DataFrame inteiro: mesma _Reduzida.txt e mesmo resumo."""
+
+    LINHAS = 5_000
+    LINHAS_POR_BLOCO = 700
+
+    def _reduzida(self, extrato: Path, pasta: Path, em_blocos: bool):
+        colunas, _faltando, enc = verifica_cabecalho(extrato)
+        sap = respostas_sap(filtra_expurgados(le_extrato(extrato))[0])
+        cfg = OpcoesReduzida(
+            streaming_forcado=em_blocos,
+            limite_streaming_mb=0,
+            linhas_por_bloco=self.LINHAS_POR_BLOCO,
+        )
+        status, totais = processa_arquivo(extrato, colunas, enc, pasta, cfg, carrega_regras(), sap)
+        self.assertEqual(status, "status_success")
+        return (pasta / extrato.name.replace(".txt", "_Reduzida.txt")).read_bytes(), totais
+
+    def _confere(self, extrato: Path) -> None:
+        pasta = extrato.parent
+        inteiro, totais_inteiro = self._reduzida(extrato, pasta / "inteiro", em_blocos=False)
+        blocos, totais_blocos = self._reduzida(extrato, pasta / "blocos", em_blocos=True)
+        self.assertEqual(blocos, inteiro)
+        self.assertEqual(totais_blocos, totais_inteiro)
+        self.assertGreater(inteiro.count(b"\n"), self.LINHAS // 2)
+
+    def test_utf8(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self._confere(gera_extrato(self.LINHAS, Path(tmp) / "extrato.txt", semente=3))
+
+    def test_latin1_no_meio_recomeca_do_zero(self):
+        """
+        Cabeçalho ASCII: a passada utf-8 grava vários blocos ("w" no 1º, "a" nos
+        demais) antes do primeiro byte latin1; a passada latin1 recria o arquivo.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            pasta = Path(tmp)
+            origem = gera_extrato(self.LINHAS, pasta / "origem.txt", semente=3)
+            df = pd.read_csv(origem, sep=";", dtype=str, keep_default_na=False)
+            df = df[[c for c in dict.fromkeys(df.columns) if c.isascii()]]
+            df.loc[4 * self.LINHAS_POR_BLOCO + 10, "Texto"] = "manutenção"
+            extrato = pasta / "extrato.txt"
+            df.to_csv(extrato, sep=";", index=False, encoding="latin1", lineterminator="\n")
+            self.assertEqual(verifica_cabecalho(extrato)[2], "utf-8")
+
+            escritas = []
+            salva = escrita.salva_csv
+
+            def registra(df, caminho, **kwargs):
+                escritas.append(kwargs.get("modo", "w"))
+                return salva(df, caminho, **kwargs)
+
+            with mock.patch("backend.reports.reduzida.salva_csv", registra):
+                self._confere(extrato)
+
+        # escritas[0]: modo inteiro; depois 4 blocos utf-8 e os 8 blocos da passada latin1
+        self.assertEqual("".join(escritas[1:]), "waaa" + "w" + "a" * 7)
+
+
+class SplitTipoGastoTests(unittest.TestCase):
+    """split_tipo_gasto sobre uma _Reduzida real (processa_arquivo em extrato sintético)."""
+
+    LINHAS_POR_BLOCO = 700
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        pasta = Path(cls._tmp.name)
+        extrato = gera_extrato(3_000, pasta / "extrato.txt", semente=5)
+        colunas, _faltando, enc = verifica_cabecalho(extrato)
+        sap = respostas_sap(filtra_expurgados(le_extrato(extrato))[0])
+        cfg = OpcoesReduzida(saida_colunar=colunar.disponivel(), gera_resumo=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            processa_arquivo(extrato, colunas, enc, pasta / "reduzida", cfg, carrega_regras(), sap)
+        cls.extrato = extrato
+        cls.reduzida = pasta / "reduzida" / "extrato_Reduzida.txt"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.pasta = Path(self._tmp.name)
+
+    def _destinos(self, nome: str) -> dict:
+        pasta = self.pasta / nome
+        pasta.mkdir()
+        return {tipo: pasta / f"{tipo}.txt" for tipo in PARTICOES}
+
+    @staticmethod
+    def _le(caminho: Path, encoding: str = "utf-8") -> pd.DataFrame:
+        return pd.read_csv(caminho, sep=";", encoding=encoding, dtype=str, keep_default_na=False)
+
+    def _confere_particoes(self, origem: Path, destinos: dict, contagem: dict, encoding: str = "utf-8") -> None:
+        esperado = self._le(origem, encoding)
+        tipos = normaliza_tipo(esperado["Tipo de Gasto"])
+        primeira = origem.read_bytes().split(b"\n", 1)[0]
+        for tipo, destino in destinos.items():
+            parte = esperado[(tipos == tipo).to_numpy()].reset_index(drop=True)
+            self.assertEqual(contagem[tipo], len(parte), tipo)
+            pd.testing.assert_frame_equal(self._le(destino), parte)
+            # "Denominação.1" do pandas volta a ser a 2ª "Denominação"
+            self.assertEqual(destino.read_bytes().split(b"\n", 1)[0], primeira)
+        self.assertEqual(sum(contagem.values()), len(esperado))
+
+    def test_linhas_por_particao(self):
+        reduzida = self.pasta / self.reduzida.name
+        shutil.copy(self.reduzida, reduzida)  # só o .txt: sem cópia colunar
+        destinos = self._destinos("txt")
+        contagem = particiona_arquivo(reduzida, destinos, self.LINHAS_POR_BLOCO)
+        self.assertTrue(all(contagem.values()))
+        self._confere_particoes(reduzida, destinos, contagem)
+        self.assertEqual(self._le(reduzida).columns.tolist().count("Denominação.1"), 1)
+
+    @unittest.skipUnless(colunar.disponivel(), "pyarrow não instalado")
+    def test_colunar_igual_ao_txt(self):
+        self.assertIsNotNone(colunar.colunar_atual(self.reduzida))
+        pelo_colunar = self._destinos("colunar")
+        contagem = particiona_arquivo(self.reduzida, pelo_colunar, self.LINHAS_POR_BLOCO)
+
+        reduzida = self.pasta / self.reduzida.name
+        shutil.copy(self.reduzida, reduzida)
+        pelo_txt = self._destinos("txt")
+        self.assertEqual(particiona_arquivo(reduzida, pelo_txt, self.LINHAS_POR_BLOCO), contagem)
+        for tipo in PARTICOES:
+            self.assertEqual(pelo_colunar[tipo].read_bytes(), pelo_txt[tipo].read_bytes(), tipo)
+
+    def test_latin1_no_meio_recomeca_do_zero(self):
+        """
+        Arquivo ASCII (com as duas "Denominacao" no cabeçalho) até o 1º byte
+        latin1: a passada utf-8 grava 3 blocos em cada partição antes dele; a
+        passada latin1 recria os arquivos ("w") em vez de acrescentar. As
+        partições saem em utf-8, como toda saída de salva_csv.
+        """
+        df = self._le(self.reduzida)
+        df = df[[c for c in df.columns if c.isascii()] + ["Denominação", "Denominação.1"]]
+        df = df.apply(lambda s: s.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii"))
+        df.loc[3 * self.LINHAS_POR_BLOCO + 10, "Texto"] = "manutenção"
+        origem = self.pasta / "latin1_Reduzida.txt"
+        cabecalho = list(df.columns[:-2]) + ["Denominacao", "Denominacao"]
+        df.to_csv(origem, sep=";", index=False, header=cabecalho, encoding="latin1", lineterminator="\n")
+
+        modos = []
+        salva = escrita.salva_csv
+
+        def registra(df, caminho, **kwargs):
+            modos.append(kwargs["modo"])
+            return salva(df, caminho, **kwargs)
+
+        destinos = self._destinos("latin1")
+        with mock.patch.object(split_tipo_gasto, "salva_csv", registra):
+            contagem = particiona_arquivo(origem, destinos, self.LINHAS_POR_BLOCO)
+        self._confere_particoes(origem, destinos, contagem, "latin1")
+
+        n = len(PARTICOES)
+        blocos = -(-len(df) // self.LINHAS_POR_BLOCO)
+        self.assertEqual(modos, (["w"] * n + ["a"] * 2 * n) + (["w"] * n + ["a"] * (blocos - 1) * n))
+
+    def _main(self, paths: dict, switches=None) -> int:
+        pasta_reduzida = self.pasta / "reduzida"
+        pasta_reduzida.mkdir(exist_ok=True)
+        shutil.copy(self.reduzida, pasta_reduzida / self.reduzida.name)
+        data = {
+            "paths": [{"path3": str(pasta_reduzida), **paths}],
+            "destino": [{"file_completa1": str(self.extrato)}],
+            "opcoes": {"reduzida_linhas_por_bloco": self.LINHAS_POR_BLOCO},
+        }
+        if switches is not None:
+            data["switches"] = switches
+        appdata = self.pasta / "appdata"
+        (appdata / split_tipo_gasto.APP_NAME).mkdir(parents=True, exist_ok=True)
+        (appdata / split_tipo_gasto.APP_NAME / "requests.json").write_text(json.dumps(data), encoding="utf-8")
+        saida = io.StringIO()
+        with mock.patch.dict(os.environ, {"LOCALAPPDATA": str(appdata)}), contextlib.redirect_stdout(saida):
+            codigo = split_tipo_gasto.main()
+        self.assertIn("status_success", saida.getvalue())
+        return codigo
+
+    def _gerados(self) -> list:
+        return sorted(
+            str(p.relative_to(self.pasta)) for p in self.pasta.rglob("extrato_*.txt")
+            if not p.name.endswith("_Reduzida.txt")
+        )
+
+    def test_switches_escolhem_as_particoes(self):
+        diretos = self.pasta / "diretos"
+        codigo = self._main(
+            {"path4": str(diretos), "path5": str(self.pasta / "indiretos"), "path6": ""},
+            switches={"diretos": True, "indiretos": False, "estoques": True, "outros": False},
+        )
+        self.assertEqual(codigo, 0)
+        # path6 vazio: estoques na pasta da Reduzida
+        self.assertEqual(self._gerados(), ["diretos/extrato_gastosDiretos.txt", "reduzida/extrato_estoques.txt"])
+
+    def test_sem_switches_grava_as_pastas_definidas(self):
+        codigo = self._main({"path5": str(self.pasta / "indiretos"), "path7": str(self.pasta / "outros"), "path4": " "})
+        self.assertEqual(codigo, 0)
+        self.assertEqual(self._gerados(), ["indiretos/extrato_gastosIndiretos.txt", "outros/extrato_outros.txt"])
+
+    def test_nenhuma_particao(self):
+        self.assertEqual(self._main({}, switches={}), 0)
+        self.assertEqual(self._gerados(), [])
+
+
+class EscritorXlsxTests(unittest.TestCase):
+    """Troca de aba do EscritorXlsx com um max_linhas_aba pequeno."""
+
+    COLUNAS = ["Contrato", "Valor/Moeda obj", "Texto"]
+
+    def test_troca_de_aba(self):
+        linhas = [[f"{4600000000 + i}", None if i == 4 else i * 1000.5, f"linha {i}"] for i in range(10)]
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = Path(tmp) / "saida.xlsx"
+            escritor = EscritorXlsx(
+                caminho, self.COLUNAS, colunas_moeda=["Valor/Moeda obj"],
+                max_linhas_aba=4, congela_cabecalho=True, autofiltro=True,
+            )
+            # blocos que não coincidem com o tamanho da aba
+            for inicio, fim in ((0, 2), (2, 7), (7, 10)):
+                escritor.escreve(pd.DataFrame(linhas[inicio:fim], columns=self.COLUNAS))
+            escritor.fecha()
+            self.assertEqual((escritor.abas, escritor.linhas), (4, 10))
+
+            wb = load_workbook(caminho)
+            self.assertEqual(wb.sheetnames, ["Sheet1", "Sheet2", "Sheet3", "Sheet4"])
+            lidas = []
+            for ws in wb.worksheets:
+                valores = list(ws.iter_rows(values_only=True))
+                self.assertEqual(list(valores[0]), self.COLUNAS)
+                self.assertLessEqual(len(valores), 4)
+                self.assertEqual(ws.freeze_panes, "A2")
+                self.assertEqual(ws.auto_filter.ref, f"A1:C{len(valores)}")
+                self.assertEqual(ws.column_dimensions["B"].number_format, FORMATO_MOEDA)
+                for linha in ws.iter_rows(min_row=2):
+                    if linha[1].value is not None:
+                        self.assertEqual(linha[1].number_format, FORMATO_MOEDA)
+                    self.assertEqual(linha[0].number_format, "General")
+                lidas.extend(list(v) for v in valores[1:])
+            wb.close()
+        self.assertEqual(lidas, linhas)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import multiprocessing
 import os
 import sys
 from pathlib import Path
@@ -37,6 +38,8 @@ def main() -> int:
     _add_manage_py_to_syspath()
 
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
+    # processo do servidor: o app jobs aquece o pool de etapas no boot
+    os.environ["AUTOCL_SERVIDOR"] = "1"
 
     from django.core.management import execute_from_command_line
 
@@ -51,4 +54,6 @@ def main() -> int:
 
 
 if __name__ == "__main__":
+    # no exe (PyInstaller) os processos do pool de etapas relançam o próprio exe
+    multiprocessing.freeze_support()
     raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,191 @@
+# backend/sap_manager/cache.py
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.core.paths import cache_dir
+
+TTL_PADRAO_HORAS = 24 * 7      # gerentes / centros / gerências mudam pouco
+TTL_NEGATIVO_PADRAO_HORAS = 24  # chave que o SAP não achou: tenta de novo no dia seguinte
+
+_LOTE_SQL = 500  # chaves por SELECT ... IN (...)
+
+
+def caminho_padrao() -> Path:
+    return cache_dir() / "consultas_sap.sqlite3"
+
+
+class RespostaParcial(dict):
+    """
+    Resposta do SAP em que parte das chaves não foi lida até o fim (erro de
+    COM / leitura que o executor engoliu para seguir com as demais): essas
+    chaves ficam em `nao_confirmadas` e não viram negativo no cache — a
+    próxima execução pergunta de novo.
+    """
+
+    def __init__(self, *args, nao_confirmadas: Iterable[str] = (), **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.nao_confirmadas: Set[str] = set(nao_confirmadas)
+
+
+def nao_confirmadas(resposta: Optional[Dict[str, str]]) -> Set[str]:
+    return set(getattr(resposta, "nao_confirmadas", ()))
+
+
+def une_respostas(respostas: Iterable[Dict[str, str]]) -> Dict[str, str]:
+    """União de respostas parciais (pedaços da mesma consulta) sem perder as não confirmadas."""
+    unido = RespostaParcial()
+    for r in respostas:
+        unido.update(r)
+        unido.nao_confirmadas |= nao_confirmadas(r)
+    return unido if unido.nao_confirmadas else dict(unido)
+
+
+class CacheConsultas:
+    """
+    Cache persistente (SQLite em AppData) das respostas de YSRELCONT, KO03 e KS13.
+
+    - uma linha por (transacao, chave)
+    - encontrado=0 guarda "o SAP não achou" (cache negativo, TTL próprio)
+    - contadores de hit/miss por transação (estatisticas())
+    """
+
+    def __init__(
+        self,
+        caminho: Optional[Path] = None,
+        ttl_horas: float = TTL_PADRAO_HORAS,
+        ttl_negativo_horas: float = TTL_NEGATIVO_PADRAO_HORAS,
+    ) -> None:
+        self.caminho = Path(caminho) if caminho else caminho_padrao()
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_horas * 3600
+        self.ttl_negativo = ttl_negativo_horas * 3600
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        self._conn = sqlite3.connect(str(self.caminho), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS consultas (
+                transacao     TEXT    NOT NULL,
+                chave         TEXT    NOT NULL,
+                valor         TEXT,
+                encontrado    INTEGER NOT NULL,
+                atualizado_em REAL    NOT NULL,
+                PRIMARY KEY (transacao, chave)
+            )
+            """
+        )
+        self._conn.commit()
+
+    # -------- leitura --------
+    def busca(self, transacao: str, chaves: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Retorna (encontrados, faltando):
+        - encontrados: {chave: valor} válidos no cache
+        - faltando: chaves ausentes ou vencidas (precisam ir ao SAP)
+        Negativos válidos não entram em nenhum dos dois (o SAP já disse que não existe).
+        """
+        chaves = list(dict.fromkeys(chaves))
+        agora = time.time()
+        linhas: Dict[str, Tuple[Optional[str], int, float]] = {}
+
+        for i in range(0, len(chaves), _LOTE_SQL):
+            lote = chaves[i:i + _LOTE_SQL]
+            marcadores = ",".join("?" * len(lote))
+            cur = self._conn.execute(
+                f"SELECT chave, valor, encontrado, atualizado_em FROM consultas "
+                f"WHERE transacao = ? AND chave IN ({marcadores})",
+                [transacao, *lote],
+            )
+            for chave, valor, encontrado, atualizado_em in cur:
+                linhas[chave] = (valor, encontrado, atualizado_em)
+
+        encontrados: Dict[str, str] = {}
+        faltando: List[str] = []
+        stats = self._stats.setdefault(transacao, {"hits": 0, "misses": 0, "negativos": 0})
+
+        for chave in chaves:
+            linha = linhas.get(chave)
+            if linha is not None:
+                valor, encontrado, atualizado_em = linha
+                ttl = self.ttl if encontrado else self.ttl_negativo
+                if agora - atualizado_em <= ttl:
+                    stats["hits"] += 1
+                    if encontrado:
+                        encontrados[chave] = valor or ""
+                    else:
+                        stats["negativos"] += 1
+                    continue
+            stats["misses"] += 1
+            faltando.append(chave)
+
+        return encontrados, faltando
+
+    # -------- escrita --------
+    def grava(self, transacao: str, resultados: Dict[str, str], consultadas: Iterable[str]) -> None:
+        """
+        Grava as respostas do SAP; chaves consultadas sem resposta viram
+        negativos, menos as que a leitura não confirmou (RespostaParcial).
+        """
+        agora = time.time()
+        pendentes = nao_confirmadas(resultados)
+        registros = [(transacao, k, v, 1, agora) for k, v in resultados.items()]
+        registros += [
+            (transacao, k, None, 0, agora)
+            for k in consultadas
+            if k not in resultados and k not in pendentes
+        ]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO consultas (transacao, chave, valor, encontrado, atualizado_em) "
+            "VALUES (?, ?, ?, ?, ?)",
+            registros,
+        )
+        self._conn.commit()
+
+    def limpa(self, transacao: Optional[str] = None) -> None:
+        if transacao:
+            self._conn.execute("DELETE FROM consultas WHERE transacao = ?", (transacao,))
+        else:
+            self._conn.execute("DELETE FROM consultas")
+        self._conn.commit()
+
+    # -------- métricas --------
+    def estatisticas(self) -> Dict[str, Dict[str, int]]:
+        return {t: dict(s) for t, s in self._stats.items()}
+
+    def resumo(self) -> str:
+        partes = [f"{t}: {s['hits']} hits / {s['misses']} misses" for t, s in self._stats.items()]
+        return "Cache SAP — " + ("; ".join(partes) if partes else "sem consultas")
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+
+def consulta_com_cache(
+    cache: CacheConsultas,
+    transacao: str,
+    chaves: Iterable[str],
+    consulta: Callable[[List[str]], Optional[Dict[str, str]]],
+) -> Dict[str, str]:
+    """
+    Resolve o que der pelo cache e chama `consulta` (o SAP) só com as chaves
+    ausentes/vencidas. Se a consulta falhar (não devolver dict), nada é gravado;
+    chaves não confirmadas (RespostaParcial) ficam fora do cache negativo.
+    """
+    chaves = list(chaves)
+    encontrados, faltando = cache.busca(transacao, chaves)
+
+    if faltando:
+        novos = consulta(faltando)
+        if isinstance(novos, dict):
+            cache.grava(transacao, novos, faltando)
+            encontrados.update(novos)
+
+    return encontrados
@@ -0,0 +1,142 @@
+# backend/sap_manager/espera.py
+"""
+Esperas por prontidão no lugar dos time.sleep fixos depois de cada ação SAP.
+
+- aguarda(condicao, rotulo): repete condicao() com intervalo crescente
+  (20 ms -> 500 ms) até ela ser verdadeira ou o prazo acabar
+- aguarda_tela(session, rotulo, ...): a sessão não está Busy e a tela
+  esperada chegou (algum id de `qualquer` existe, nenhum de `ausentes`)
+- cada espera é registrada por rótulo (quantas, tempo total, maior,
+  esgotadas): esperas() / drena_esperas() mostram onde o SAP é o gargalo
+
+Com o SAP rápido a espera termina na 1ª verificação (sem dormir nada);
+com o SAP lento ela dura o necessário, até o prazo.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+PRAZO_PADRAO_S = 30.0
+INTERVALO_INICIAL_S = 0.02
+INTERVALO_MAXIMO_S = 0.5
+FATOR_INTERVALO = 1.5
+
+
+class TempoEsgotado(TimeoutError):
+    """A condição não ficou verdadeira dentro do prazo."""
+
+
+_lock = threading.Lock()
+_registro: Dict[str, Dict[str, float]] = {}
+
+
+def _registra(rotulo: str, segundos: float, tentativas: int, ok: bool) -> None:
+    with _lock:
+        r = _registro.setdefault(rotulo, {"esperas": 0, "total_s": 0.0, "maximo_s": 0.0, "tentativas": 0, "esgotadas": 0})
+        r["esperas"] += 1
+        r["total_s"] += segundos
+        r["maximo_s"] = max(r["maximo_s"], segundos)
+        r["tentativas"] += tentativas
+        if not ok:
+            r["esgotadas"] += 1
+
+
+def _copia() -> Dict[str, Dict[str, float]]:
+    return {
+        rotulo: {**r, "total_s": round(r["total_s"], 3), "maximo_s": round(r["maximo_s"], 3)}
+        for rotulo, r in _registro.items()
+    }
+
+
+def esperas() -> Dict[str, Dict[str, float]]:
+    """Cópia do registro {rótulo: {esperas, total_s, maximo_s, tentativas, esgotadas}}."""
+    with _lock:
+        return _copia()
+
+
+def drena_esperas() -> Dict[str, Dict[str, float]]:
+    """esperas() e zera o registro (uma leitura por job / etapa)."""
+    with _lock:
+        copia = _copia()
+        _registro.clear()
+    return copia
+
+
+def zera_esperas() -> None:
+    with _lock:
+        _registro.clear()
+
+
+def resumo_esperas(registro: Dict[str, Dict[str, float]]) -> str:
+    """Uma linha por rótulo, do maior tempo total para o menor."""
+    linhas = ["Esperas pelo SAP (rótulo: n / total / maior):"]
+    for rotulo, r in sorted(registro.items(), key=lambda kv: -kv[1]["total_s"]):
+        esgotadas = f" / {r['esgotadas']} esgotada(s)" if r["esgotadas"] else ""
+        linhas.append(f"  {rotulo}: {r['esperas']} / {r['total_s']:.2f}s / {r['maximo_s']:.2f}s{esgotadas}")
+    return "\n".join(linhas)
+
+
+def aguarda(
+    condicao: Callable[[], bool],
+    rotulo: str,
+    prazo_s: Optional[float] = PRAZO_PADRAO_S,
+    intervalo_maximo_s: float = INTERVALO_MAXIMO_S,
+    levanta: bool = True,
+) -> bool:
+    """
+    Espera condicao() ficar verdadeira (exceção dentro dela = ainda não).
+    prazo_s=None espera sem limite. Sem levanta, devolve False no prazo.
+    """
+    inicio = time.perf_counter()
+    intervalo = INTERVALO_INICIAL_S
+    tentativas = 0
+    while True:
+        tentativas += 1
+        try:
+            pronto = bool(condicao())
+        except Exception:
+            pronto = False
+        decorrido = time.perf_counter() - inicio
+        if pronto:
+            _registra(rotulo, decorrido, tentativas, True)
+            return True
+        if prazo_s is not None and decorrido >= prazo_s:
+            _registra(rotulo, decorrido, tentativas, False)
+            if levanta:
+                raise TempoEsgotado(f"{rotulo}: SAP não respondeu em {prazo_s:g}s")
+            return False
+        pausa = intervalo if prazo_s is None else min(intervalo, max(prazo_s - decorrido, 0.0))
+        time.sleep(pausa)
+        intervalo = min(intervalo * FATOR_INTERVALO, intervalo_maximo_s)
+
+
+def _existe(session, id_: str) -> bool:
+    return session.findById(id_, False) is not None
+
+
+def aguarda_tela(
+    session,
+    rotulo: str,
+    qualquer: Iterable[str] = (),
+    ausentes: Iterable[str] = (),
+    prazo_s: Optional[float] = PRAZO_PADRAO_S,
+    levanta: bool = True,
+) -> bool:
+    """
+    Sessão livre (not session.Busy) e na tela esperada:
+    - qualquer: ids dos quais pelo menos um precisa existir (ex.: grade OU popup "sem dados")
+    - ausentes: ids que precisam ter sumido (ex.: o popup que acabou de ser confirmado)
+    """
+    qualquer = tuple(qualquer)
+    ausentes = tuple(ausentes)
+
+    def pronta() -> bool:
+        if session.Busy:
+            return False
+        if qualquer and not any(_existe(session, i) for i in qualquer):
+            return False
+        return not any(_existe(session, i) for i in ausentes)
+
+    return aguarda(pronta, rotulo, prazo_s=prazo_s, levanta=levanta)
@@ -0,0 +1,134 @@
+# backend/sap_manager/exportacao_alv.py
+"""
+Leitura de uma grade ALV (GuiGridView) inteira de uma vez.
+
+getCellValue(linha, coluna) é uma chamada COM por célula: o tempo cresce
+com o nº de linhas. Aqui a grade é salva em arquivo local pelo próprio ALV
+("Exportar > Arquivo local... > Texto com tabulações") e lida com o parser
+de CSV; o custo fica fixo (um punhado de chamadas COM) qualquer que seja o
+tamanho do resultado.
+
+- le_grade(session, id_grade, colunas) -> [{coluna: valor}, ...] na ordem
+  da grade, só com as colunas pedidas (nomes técnicos: EBELN, KOSTV...)
+- AUTOCL_LEITURA_GRADE=celulas volta à leitura célula a célula, que também
+  é o fallback se a exportação falhar ou não bater com rowCount
+"""
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from backend.sap_manager.espera import aguarda_tela
+
+MODOS = ("arquivo", "celulas")
+
+_FORMATO_TEXTO_TAB = (
+    "wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/"
+    "sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[1,0]"
+)
+_CODIFICACAO_UTF8 = "4110"
+
+
+def modo_padrao() -> str:
+    modo = os.environ.get("AUTOCL_LEITURA_GRADE", "arquivo").strip().lower()
+    return modo if modo in MODOS else "arquivo"
+
+
+def le_grade(session, id_grade: str, colunas: Sequence[str], modo: Optional[str] = None) -> List[Dict[str, str]]:
+    """Linhas da grade como dicts {coluna técnica: valor sem espaços nas pontas}."""
+    grade = session.findById(id_grade)
+    if (modo or modo_padrao()) == "arquivo":
+        try:
+            return _por_arquivo(session, grade, colunas)
+        except Exception as e:
+            print(f"⚠️ Exportação da grade para arquivo falhou ({e}); lendo célula a célula.")
+            _fecha_popup(session)
+            grade = session.findById(id_grade)
+    return _por_celulas(grade, colunas)
+
+
+def _por_celulas(grade, colunas: Sequence[str]) -> List[Dict[str, str]]:
+    return [
+        {c: str(grade.getCellValue(r, c)).strip() for c in colunas}
+        for r in range(grade.rowCount)
+    ]
+
+
+def _ordem_colunas(grade) -> List[str]:
+    # colunas visíveis na ordem da tela = ordem das colunas do arquivo exportado
+    ordem = grade.ColumnOrder
+    return [str(ordem.ElementAt(i)) for i in range(ordem.Count)]
+
+
+def _por_arquivo(session, grade, colunas: Sequence[str]) -> List[Dict[str, str]]:
+    ordem = _ordem_colunas(grade)
+    faltando = [c for c in colunas if c not in ordem]
+    if faltando:
+        raise ValueError(f"colunas fora do layout da grade: {', '.join(faltando)}")
+    esperadas = grade.rowCount
+
+    fd, caminho = tempfile.mkstemp(prefix="autocl_grade_", suffix=".txt")
+    os.close(fd)
+    arquivo = Path(caminho)
+    try:
+        grade.pressToolbarContextButton("&MB_EXPORT")
+        grade.selectContextMenuItem("&PC")
+        aguarda_tela(session, "grade_exporta_formato", qualquer=(_FORMATO_TEXTO_TAB,))
+        session.findById(_FORMATO_TEXTO_TAB).select()
+        session.findById("wnd[1]/tbar[0]/btn[0]").press()
+        aguarda_tela(session, "grade_exporta_dialogo", qualquer=("wnd[1]/usr/ctxtDY_PATH",))
+        session.findById("wnd[1]/usr/ctxtDY_PATH").text = str(arquivo.parent)
+        session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = arquivo.name
+        codificacao = session.findById("wnd[1]/usr/ctxtDY_FILE_ENCODING", False)
+        if codificacao is not None:
+            codificacao.text = _CODIFICACAO_UTF8
+        session.findById("wnd[1]/tbar[0]/btn[11]").press()  # Substituir
+        aguarda_tela(session, "grade_exporta", ausentes=("wnd[1]",))
+
+        linhas = le_texto_exportado(_le_texto(arquivo), len(ordem))
+    finally:
+        try:
+            arquivo.unlink()
+        except OSError:
+            pass
+
+    if len(linhas) != esperadas:
+        raise ValueError(f"arquivo com {len(linhas)} linhas, grade com {esperadas}")
+    indices = {c: ordem.index(c) for c in colunas}
+    return [{c: linha[i] for c, i in indices.items()} for linha in linhas]
+
+
+def _le_texto(arquivo: Path) -> str:
+    dados = arquivo.read_bytes()
+    try:
+        return dados.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return dados.decode("cp1252", errors="replace")
+
+
+def le_texto_exportado(texto: str, n_colunas: int) -> List[List[str]]:
+    """
+    "Texto com tabulações" do ALV: 1ª linha não vazia = títulos das colunas,
+    depois uma linha por registro; algumas versões do GUI põem uma tabulação
+    no início de cada linha.
+    """
+    leitor = csv.reader(texto.splitlines(), delimiter="\t", quoting=csv.QUOTE_NONE)
+    registros = [r for r in leitor if any(v.strip() for v in r)]
+    if registros and all(r[0] == "" for r in registros) and all(len(r) > n_colunas for r in registros):
+        registros = [r[1:] for r in registros]
+    return [
+        [v.strip() for v in (r + [""] * n_colunas)[:n_colunas]]
+        for r in registros[1:]
+    ]
+
+
+def _fecha_popup(session) -> None:
+    popup = session.findById("wnd[1]", False)
+    if popup is not None:
+        try:
+            popup.close()
+        except Exception:
+            pass
@@ -1,22 +1,79 @@
-import time
+from backend.sap_manager.cache import RespostaParcial, consulta_com_cache
+from backend.sap_manager.espera import aguarda_tela
+from backend.sap_manager.se16n import consulta_se16n
+from backend.sap_manager.selecao_multipla import LIMITE_LOTE
+
+# SE16N na tabela AUFK (mestre de ordens): AUFNR -> KOSTV (centro responsável),
+# o mesmo campo que a KO03 mostra, para todas as ordens numa execução só
+TABELA_ORDENS = "AUFK"
+
+_SE16N_LINHA_AUFNR = 0  # AUFNR é o 1º campo de seleção da AUFK (MANDT não aparece)
+_KO03_ORDEM = "wnd[0]/usr/ctxtCOAS-AUFNR"
+
+
+def _sem_zeros(numero):
+    # AUFNR vem com zeros à esquerda (ALPHA); a chave do extrato não
+    return str(numero).strip().lstrip("0")
+
+
+def executar_ko03(session, ordens_or, cache=None, lote=True):
+    """
+    Executa KO03 e retorna dict {ORxxxxx: Exxxxx}
+
+    lote=True: uma leitura da AUFK pela SE16N para todas as ordens; se falhar
+    (sem autorização, layout diferente), cai na KO03 ordem a ordem.
+    """
+    if cache is not None:
+        # só vai ao SAP com as chaves ausentes/vencidas no cache local
+        return consulta_com_cache(cache, "KO03", ordens_or, lambda faltando: executar_ko03(session, faltando, lote=lote))
 
-def executar_ko03(session, ordens_or):
-    """Executa KO03 e retorna dict {ORxxxxx: Exxxxx}"""
     if not ordens_or:
         return {}
 
+    if lote:
+        try:
+            return executar_ko03_lote(session, ordens_or)
+        except Exception as e:
+            print(f"⚠️ Leitura em lote da {TABELA_ORDENS} falhou ({e}); usando KO03 ordem a ordem.")
+
+    return executar_ko03_por_ordem(session, ordens_or)
+
+
+def executar_ko03_lote(session, ordens_or, tamanho_lote=LIMITE_LOTE):
+    """
+    Mesmo resultado de executar_ko03_por_ordem ({ORxxxxx: Exxxxx}), lendo
+    AUFNR/KOSTV da AUFK na SE16N com seleção múltipla: uma execução por lote
+    de ordens em vez de duas idas ao servidor (e duas esperas) por ordem.
+    """
+    por_numero = {_sem_zeros(o.replace("OR", "")): o for o in ordens_or}
+    or_para_e = {}
+
+    registros = consulta_se16n(session, TABELA_ORDENS, _SE16N_LINHA_AUFNR, por_numero, ("AUFNR", "KOSTV"), tamanho_lote=tamanho_lote)
+    for registro in registros:
+        ordem = por_numero.get(_sem_zeros(registro["AUFNR"]))
+        if ordem and registro["KOSTV"]:
+            or_para_e[ordem] = registro["KOSTV"]
+
+    return or_para_e
+
+
+def executar_ko03_por_ordem(session, ordens_or):
+    """
+    KO03 ordem a ordem (caminho original; fallback da leitura em lote).
+    Ordem que deu erro na leitura fica como não confirmada (RespostaParcial).
+    """
     session.findById("wnd[0]/tbar[0]/okcd").text = "/nKO03"
     session.findById("wnd[0]").sendVKey(0)
-    time.sleep(1)
+    aguarda_tela(session, "KO03_inicio", qualquer=(_KO03_ORDEM,))
 
-    or_para_e = {}
+    or_para_e = RespostaParcial()
 
     for ordem in ordens_or:
         try:
             ordem_num = ordem.replace("OR", "")
-            session.findById("wnd[0]/usr/ctxtCOAS-AUFNR").text = ordem_num
+            session.findById(_KO03_ORDEM).text = ordem_num
             session.findById("wnd[0]/tbar[1]/btn[42]").press()  # Executar
-            time.sleep(0.5)
+            aguarda_tela(session, "KO03_ordem")
 
             status_message = session.findById("wnd[0]/sbar").text.strip()
             if not status_message:
@@ -28,9 +85,10 @@ def executar_ko03(session, ordens_or):
                 if centro:
                     or_para_e[ordem] = centro
                 session.findById("wnd[0]/tbar[0]/btn[3]").press()
-                time.sleep(0.5)
+                aguarda_tela(session, "KO03_voltar", qualquer=(_KO03_ORDEM,))
         except Exception as e:
             print(f"⚠️ Erro ao buscar {ordem}: {e}")
+            or_para_e.nao_confirmadas.add(ordem)
             continue
 
     return or_para_e
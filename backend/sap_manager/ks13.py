@@ -1,24 +1,84 @@
-import time
+from backend.sap_manager.cache import RespostaParcial, consulta_com_cache
+from backend.sap_manager.espera import aguarda_tela
+from backend.sap_manager.se16n import consulta_se16n
+from backend.sap_manager.selecao_multipla import CAMPO_VALOR, lotes, preenche_selecao
+
+# SE16N na CSKS (mestre de centros de custo): KOSTL -> VERAK (responsável), só
+# o registro vigente (DATBI 31.12.9999) — as mesmas colunas do help da KS13
+TABELA_CENTROS = "CSKS"
+AREA_CONTABILIDADE = "ACPB"
+_SE16N_LINHA_KOKRS = 0
+_SE16N_LINHA_KOSTL = 1
+
+_KS13_CENTRO = "wnd[0]/usr/subKOSTL_SELECTION:SAPLKMS1:0100/ctxtKMAS_D-KOSTL"
+# a seleção múltipla do help de pesquisa tem o campo de valor sem "c"
+_CAMPO_VALOR = CAMPO_VALOR.replace("ctxtRSCSEL_255", "txtRSCSEL_255")
+
+def executar_ks13(session, objetos_e, cache=None, lote=True):
+    """
+    Executa KS13 e retorna dict {Exxxxx: GERÊNCIA}
+
+    lote=True: leitura da CSKS pela SE16N (grade exportada de uma vez); se
+    falhar, cai no help de pesquisa da KS13 lido label a label.
+    """
+    if cache is not None:
+        # só vai ao SAP com as chaves ausentes/vencidas no cache local
+        return consulta_com_cache(cache, "KS13", objetos_e, lambda faltando: executar_ks13(session, faltando, lote=lote))
 
-def executar_ks13(session, objetos_e):
-    """Executa KS13 e retorna dict {Exxxxx: GERÊNCIA}"""
     if not objetos_e:
         return {}
 
+    if lote:
+        try:
+            return executar_ks13_lote(session, objetos_e)
+        except Exception as e:
+            print(f"⚠️ Leitura em lote da {TABELA_CENTROS} falhou ({e}); usando o help de pesquisa da KS13.")
+
+    return executar_ks13_por_help(session, objetos_e)
+
+
+def executar_ks13_lote(session, objetos_e):
+    """Mesmo resultado de executar_ks13_por_help, numa execução da SE16N por lote."""
+    registros = consulta_se16n(
+        session,
+        TABELA_CENTROS,
+        _SE16N_LINHA_KOSTL,
+        objetos_e,
+        ("KOSTL", "DATBI", "VERAK"),
+        fixos={_SE16N_LINHA_KOKRS: AREA_CONTABILIDADE},
+    )
+    return {r["KOSTL"]: r["VERAK"] for r in registros if ".9999" in r["DATBI"]}
+
+
+def executar_ks13_por_help(session, objetos_e):
+    """
+    KS13 pelo help de pesquisa do centro (caminho original; fallback da
+    leitura em lote). Centros de um lote cuja lista não foi lida até o fim
+    ficam como não confirmados (RespostaParcial).
+    """
     session.findById("wnd[0]/tbar[0]/okcd").text = "/nKS13"
     session.findById("wnd[0]").sendVKey(0)
-    time.sleep(1)
+    aguarda_tela(session, "KS13_inicio", qualquer=(_KS13_CENTRO,))
 
-    gerencias = {}
+    gerencias = RespostaParcial()
 
     try:
         session.findById("wnd[0]").sendVKey(6)
-        session.findById("wnd[1]/usr/sub:SAPLSPO4:0300/ctxtSVALD-VALUE[0,21]").text = "ACPB"
+        session.findById("wnd[1]/usr/sub:SAPLSPO4:0300/ctxtSVALD-VALUE[0,21]").text = AREA_CONTABILIDADE
         session.findById("wnd[1]").sendVKey(0)
     except:
         pass
 
-    session.findById("wnd[0]/usr/subKOSTL_SELECTION:SAPLKMS1:0100/ctxtKMAS_D-KOSTL").setFocus()
+    for lote in lotes(objetos_e):
+        if not _consulta_lote(session, lote, gerencias):
+            gerencias.nao_confirmadas.update(o for o in lote if o not in gerencias)
+
+    return gerencias
+
+
+def _consulta_lote(session, objetos_e, gerencias):
+    """Help de pesquisa do centro de custo para um lote de objetos; False se a lista não foi lida até o fim."""
+    session.findById(_KS13_CENTRO).setFocus()
     session.findById("wnd[0]").sendVKey(4)
     session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001").select()
     session.findById(
@@ -27,25 +87,17 @@ def executar_ks13(session, objetos_e):
         "sub:SAPLSDH4:0220/btnG_SELFLD_TAB-MORE[0,56]"
     ).press()
 
-    # Preenche lista de objetos
-    for obj in objetos_e:
-        try:
-            session.findById(
-                "wnd[2]/usr/tabsTAB_STRIP/tabpSIVA/"
-                "ssubSCREEN_HEADER:SAPLALDB:3010/"
-                "tblSAPLALDBSINGLE/txtRSCSEL_255-SLOW_I[1,0]"
-            ).text = obj
-            session.findById("wnd[2]/tbar[0]/btn[13]").press()
-        except:
-            pass
+    # Preenche lista de objetos (de uma vez; ver selecao_multipla.py)
+    preenche_selecao(session, objetos_e, janela=2, campo=_CAMPO_VALOR)
 
     session.findById("wnd[2]/tbar[0]/btn[8]").press()
-    time.sleep(1)
+    aguarda_tela(session, "KS13_selecao", ausentes=("wnd[2]",))
     session.findById(
         "wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/"
         "ssubSUBSCR_PRESEL:SAPLSDH4:0220/chkG_SELPOP_STATE-BUTTON"
     ).selected = True
     session.findById("wnd[1]/tbar[0]/btn[0]").press()
+    aguarda_tela(session, "KS13_lista")
 
     try:
         container = session.findById("wnd[1]/usr")
@@ -68,5 +120,16 @@ def executar_ks13(session, objetos_e):
         session.findById("wnd[1]/tbar[0]/btn[12]").press()
     except Exception as e:
         print(f"⚠️ Erro durante leitura KS13: {e}")
+        return False
+    return True
 
-    return gerencias
+
+def executar_ks13_completo(session, padrao="E*"):
+    """
+    Todos os centros de custo válidos (".9999") que casam com `padrao`
+    (sincronização do snapshot), pela leitura da CSKS na SE16N (sem limite
+    de linhas). Só o fallback pelo help de pesquisa da KS13 fica sujeito ao
+    limite de ocorrências do usuário SAP; o que ele cortar a Reduzida ainda
+    busca por chave (enriquecimento._pelo_snapshot).
+    """
+    return executar_ks13(session, [padrao])
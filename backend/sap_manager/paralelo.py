@@ -0,0 +1,225 @@
+# backend/sap_manager/paralelo.py
+"""
+Consultas SAP em várias sessões GUI ao mesmo tempo.
+
+A conexão aceita até 6 sessões; com uma só, YSRELCONT, KO03 e KS13 rodam em
+fila. Aqui cada tarefa pega uma sessão livre e roda numa thread própria:
+
+- submete(nome, funcao, *args): funcao(session, *args) numa sessão livre
+- fragmenta(nome, funcao, chaves): lista grande dividida entre as sessões
+  (um pedaço por sessão, nunca menor que um lote da seleção múltipla) e os
+  dicts devolvidos juntados no fim
+- cada thread inicializa o COM (CoInitialize) e pega o seu próprio proxy
+  da sessão pelo id: objeto COM não passa de uma thread para outra
+
+Dependências (KO03 -> KS13) ficam com quem chama: espera o futuro da KO03
+antes de submeter a KS13 dos centros que ela devolveu.
+
+Provedores de sessão: SessoesSap (SAP GUI real, sap_connect.py) e
+SessoesSimuladas (simulador.py, para benchmark).
+"""
+from __future__ import annotations
+
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Sequence
+
+from backend.sap_manager.cache import une_respostas
+from backend.sap_manager.selecao_multipla import LIMITE_LOTE
+
+MAX_SESSOES = 6  # limite do SAP por conexão
+
+
+class ProvedorSessoes(Protocol):
+    def abre(self, quantidade: int) -> List[str]:
+        """Abre/reserva até `quantidade` sessões (thread principal); devolve os ids."""
+
+    def sessao(self, id_: str) -> Any:
+        """Objeto da sessão para a thread atual (já com o COM inicializado)."""
+
+    def fecha(self) -> None:
+        """Fecha as sessões que o provedor abriu."""
+
+
+@dataclass
+class TempoTarefa:
+    nome: str
+    sessao: str
+    segundos: float
+    ok: bool
+
+
+@contextmanager
+def apartamento_com() -> Iterator[None]:
+    """CoInitialize/CoUninitialize da thread (nada fora do Windows)."""
+    try:
+        import pythoncom
+    except ImportError:
+        yield
+        return
+    pythoncom.CoInitialize()
+    try:
+        yield
+    finally:
+        pythoncom.CoUninitialize()
+
+
+class ExecutorSessoes:
+    """
+    Pool de threads com uma sessão SAP por thread em execução:
+
+        with ExecutorSessoes(SessoesSap(), sessoes=3) as executor:
+            f_ko03 = executor.submete("KO03", executar_ko03, ordens)
+            f_ys = executor.fragmenta("YSRELCONT", executar_ysrelcont, contratos)
+            or_para_e = f_ko03.result()
+
+    As sessões só são abertas na 1ª tarefa (nada de SAP se o cache resolveu tudo).
+    """
+
+    def __init__(self, provedor: ProvedorSessoes, sessoes: int = 3) -> None:
+        self.provedor = provedor
+        self.sessoes = max(1, min(int(sessoes), MAX_SESSOES))
+        self.tempos: List[TempoTarefa] = []
+        self._ids: "queue.Queue[str]" = queue.Queue()
+        self._n_abertas = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # -------- ciclo de vida --------
+    def __enter__(self) -> "ExecutorSessoes":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.encerra()
+
+    def _garante(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                ids = self.provedor.abre(self.sessoes)
+                if not ids:
+                    raise RuntimeError("Nenhuma sessão SAP disponível.")
+                for id_ in ids:
+                    self._ids.put(id_)
+                self._n_abertas = len(ids)
+                self._pool = ThreadPoolExecutor(max_workers=len(ids), thread_name_prefix="sap-sessao")
+                if len(ids) < self.sessoes:
+                    print(f"Sessões SAP disponíveis: {len(ids)} de {self.sessoes} pedidas.")
+            return self._pool
+
+    def encerra(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+            self.provedor.fecha()
+
+    @property
+    def sessoes_abertas(self) -> int:
+        return self._n_abertas
+
+    # -------- tarefas --------
+    def _roda(self, nome: str, funcao: Callable[..., Any], args: Sequence[Any], kwargs: Dict[str, Any]) -> Any:
+        id_ = self._ids.get()
+        inicio = time.perf_counter()
+        ok = False
+        try:
+            with apartamento_com():
+                resultado = funcao(self.provedor.sessao(id_), *args, **kwargs)
+            ok = True
+            return resultado
+        finally:
+            with self._lock:
+                self.tempos.append(TempoTarefa(nome, id_, time.perf_counter() - inicio, ok))
+            self._ids.put(id_)
+
+    def submete(self, nome: str, funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self._garante().submit(self._roda, nome, funcao, args, kwargs)
+
+    def fragmenta(
+        self,
+        nome: str,
+        funcao: Callable[..., Optional[Dict[str, str]]],
+        chaves: Sequence[str],
+        minimo_por_parte: int = LIMITE_LOTE,
+        **kwargs: Any,
+    ) -> Future:
+        """
+        funcao(session, pedaço, **kwargs) em paralelo; o futuro devolve a união
+        dos dicts (None se algum pedaço falhou, como a consulta sequencial).
+        """
+        chaves = list(dict.fromkeys(chaves))
+        self._garante()
+        partes = max(1, min(self._n_abertas, math.ceil(len(chaves) / max(1, minimo_por_parte))))
+        if partes == 1:
+            return self.submete(nome, funcao, chaves, **kwargs)
+
+        tamanho = math.ceil(len(chaves) / partes)
+        futuros = [
+            self.submete(nome, funcao, chaves[i:i + tamanho], **kwargs)
+            for i in range(0, len(chaves), tamanho)
+        ]
+        return _junta(futuros)
+
+
+def _junta(futuros: List[Future]) -> Future:
+    """Futuro que termina com a união dos dicts de `futuros`."""
+    final: Future = Future()
+    restantes = [len(futuros)]
+    lock = threading.Lock()
+
+    def terminou(_: Future) -> None:
+        with lock:
+            restantes[0] -= 1
+            if restantes[0]:
+                return
+        erros = [f.exception() for f in futuros if f.exception() is not None]
+        if erros:
+            final.set_exception(erros[0])
+            return
+        resultados = [f.result() for f in futuros]
+        if any(not isinstance(r, dict) for r in resultados):
+            final.set_result(None)
+            return
+        # mantém as chaves não confirmadas de cada pedaço (cache negativo)
+        final.set_result(une_respostas(resultados))
+
+    for f in futuros:
+        f.add_done_callback(terminou)
+    return final
+
+
+class SessoesSap:
+    """Sessões da conexão SAP GUI: a livre de sempre + as que faltarem (fechadas no fim)."""
+
+    def __init__(self) -> None:
+        self._criadas: List[str] = []
+
+    def abre(self, quantidade: int) -> List[str]:
+        from backend.sap_manager.sap_connect import get_sap_free_sessions, start_connection, start_sap_manager
+
+        print("Iniciando SAP GUI...")
+        start_sap_manager()
+        start_connection()
+        ids, self._criadas = get_sap_free_sessions(quantidade)
+        print(f"Sessões SAP em uso: {', '.join(ids)}")
+        return ids
+
+    def sessao(self, id_: str) -> Any:
+        from backend.sap_manager.sap_connect import get_sap_session_by_id
+
+        session = get_sap_session_by_id(id_)
+        if session is None:
+            raise RuntimeError(f"Sessão SAP {id_} não encontrada.")
+        return session
+
+    def fecha(self) -> None:
+        from backend.sap_manager.sap_connect import close_sap_opened_session
+
+        for id_ in self._criadas:
+            close_sap_opened_session(id_)
+        self._criadas = []
@@ -1,7 +1,8 @@
 import win32com.client
 import subprocess
 import psutil
-import time
+
+from backend.sap_manager.espera import TempoEsgotado, aguarda
 
 # Caminho para o executável do SAP Logon
 SAP_PATH = r"C:\Program Files\SAP\FrontEnd\SAPgui\saplogon.exe"
@@ -26,12 +27,12 @@ def open_sap_process_and_wait(timeout=30):
     """Abre o SAP Logon e aguarda até estar ativo"""
     print("Abrindo SAP Logon...")
     subprocess.Popen([SAP_PATH], shell=False)
-    for _ in range(timeout):
-        if is_sap_running():
-            print("SAP Logon iniciado com sucesso.")
-            return True
-        time.sleep(1)
-    raise TimeoutError("SAP Logon não iniciou dentro do tempo esperado.")
+    try:
+        aguarda(is_sap_running, "saplogon", prazo_s=timeout)
+    except TempoEsgotado:
+        raise TimeoutError("SAP Logon não iniciou dentro do tempo esperado.")
+    print("SAP Logon iniciado com sucesso.")
+    return True
 
 
 def force_close_sap_process():
@@ -75,14 +76,13 @@ def start_connection():
 
     print("Tentando conectar ao SAP GUI Scripting Engine...")
 
-    # Espera até o SAP GUI estar pronto para scripting
-    for i in range(30):  # tenta por até ~30 segundos
-        try:
-            sapgui = win32com.client.GetObject("SAPGUI")
-            break
-        except Exception:
-            time.sleep(1)
-    else:
+    # Espera até o SAP GUI estar pronto para scripting (até ~30 segundos)
+    def conecta():
+        global sapgui
+        sapgui = win32com.client.GetObject("SAPGUI")
+        return True
+
+    if not aguarda(conecta, "scripting_engine", prazo_s=30, levanta=False):
         raise RuntimeError("Não foi possível acessar o SAPGUI via COM (Scripting Engine não disponível).")
 
     App = sapgui.GetScriptingEngine
@@ -110,14 +110,13 @@ def get_sap_free_session():
     if connection is None:
         raise RuntimeError("Conexão SAP não inicializada. Chame start_connection() antes.")
 
-    while connection.Sessions.Count >= 6:
+    if connection.Sessions.Count >= 6:
         print("Limite de sessões atingido. Aguardando...")
-        time.sleep(10)
+        aguarda(lambda: connection.Sessions.Count < 6, "sessao_livre", prazo_s=None, intervalo_maximo_s=10)
 
     main = connection.Children(0)
 
-    while main.Busy:
-        time.sleep(1)
+    aguarda(lambda: not main.Busy, "sessao_ocupada", prazo_s=None)
 
     if connection.Sessions.Count == 0:
         main.CreateSession()
@@ -131,6 +130,33 @@ def get_sap_free_session():
     print(f"Sessão livre obtida: {ss.Id}")
     return ss
 
+def get_sap_free_sessions(quantidade: int, max_sessions: int = 6):
+    """
+    Sessão livre de get_sap_free_session + novas sessões até `quantidade`
+    (respeitando o limite da conexão). Retorna (ids, ids criadas aqui).
+    """
+    first = get_sap_free_session()
+    ids = [first.Id]
+    created = []
+    main = connection.Children(0)
+
+    while len(ids) < quantidade and connection.Sessions.Count < max_sessions:
+        before = {connection.Children(i).Id for i in range(connection.Sessions.Count)}
+        main.CreateSession()
+        if not aguarda(lambda: connection.Sessions.Count > len(before), "nova_sessao", prazo_s=30, levanta=False):
+            print("Nova sessão SAP não abriu no prazo.")
+            break
+        new = [connection.Children(i) for i in range(connection.Sessions.Count)]
+        new = [ss for ss in new if ss.Id not in before][0]
+        aguarda(lambda: not new.Busy, "nova_sessao_ocupada", prazo_s=30, levanta=False)
+        new.findById("wnd[0]").maximize()
+        ids.append(new.Id)
+        created.append(new.Id)
+        print(f"Sessão SAP criada: {new.Id}")
+
+    return ids, created
+
+
 def get_sap_session_by_id(session_id: str):
     """Retorna a sessão SAP pelo ID"""
     try:
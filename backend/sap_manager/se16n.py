@@ -0,0 +1,66 @@
+# backend/sap_manager/se16n.py
+"""
+Leitura de tabela pela SE16N: seleção múltipla num campo (carregada de uma
+vez, selecao_multipla.py) e resultado lido pela exportação da grade ALV
+(exportacao_alv.py). Uma execução por lote de valores.
+
+Usada pela resolução em lote de ordens (AUFK) e de centros de custo (CSKS).
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from backend.sap_manager.espera import aguarda_tela
+from backend.sap_manager.exportacao_alv import le_grade
+from backend.sap_manager.selecao_multipla import LIMITE_LOTE, lotes, preenche_selecao
+
+TABELA = "wnd[0]/usr/ctxtGD-TAB"
+MAX_LINHAS = "wnd[0]/usr/txtGD-MAX_LINES"
+GRADE = "wnd[0]/usr/cntlRESULT_LIST/shellcont/shell"
+_CAMPOS = "wnd[0]/usr/tblSAPLSE16NSELFIELDS_TC"
+
+
+def consulta_se16n(
+    session,
+    tabela: str,
+    linha_selecao: int,
+    valores: Iterable[str],
+    colunas: Sequence[str],
+    fixos: Optional[Dict[int, str]] = None,
+    tamanho_lote: int = LIMITE_LOTE,
+) -> List[Dict[str, str]]:
+    """
+    Registros de `tabela` cujo campo da linha `linha_selecao` (posição na
+    lista de campos de seleção, sem MANDT) está em `valores`.
+    fixos: {linha: valor "de"} de outros campos (ex.: área de contabilidade).
+    """
+    registros: List[Dict[str, str]] = []
+
+    for lote in lotes(valores, tamanho_lote):
+        session.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16N"
+        session.findById("wnd[0]").sendVKey(0)
+        aguarda_tela(session, "SE16N_inicio", qualquer=(TABELA,))
+
+        session.findById(TABELA).text = tabela
+        session.findById("wnd[0]").sendVKey(0)
+        aguarda_tela(session, "SE16N_tabela")
+        # sem limite de ocorrências (o padrão da SE16N corta em 500)
+        session.findById(MAX_LINHAS).text = ""
+
+        for linha, valor in (fixos or {}).items():
+            session.findById(f"{_CAMPOS}/ctxtGS_SELFIELDS-LOW[2,{linha}]").text = valor
+
+        session.findById(f"{_CAMPOS}/btnPUSH[4,{linha_selecao}]").press()
+        preenche_selecao(session, lote, janela=1)
+        session.findById("wnd[1]/tbar[0]/btn[8]").press()
+
+        session.findById("wnd[0]").sendVKey(8)  # Executar
+        aguarda_tela(session, "SE16N_execucao")
+
+        # nenhum registro: a SE16N fica na tela de seleção (sem grade)
+        if session.findById(GRADE, False) is not None:
+            registros.extend(le_grade(session, GRADE, colunas))
+
+        session.findById("wnd[0]/tbar[0]/btn[3]").press()
+
+    return registros
@@ -0,0 +1,156 @@
+# backend/sap_manager/selecao_multipla.py
+"""
+Preenchimento em massa da tela de seleção múltipla (SAPLALDB), usada pela
+KS13 (wnd[2]), YSRELCONT e SE16N (wnd[1]).
+
+Digitar valor a valor (RSCSEL_255-SLOW_I + btn[13]) custa duas chamadas COM
+e uma ida ao servidor por chave. Aqui a lista inteira entra de uma vez:
+
+- "arquivo":   "Importar de arquivo texto" (btn[23]) com um .txt temporário
+- "clipboard": "Carregar da área de transferência" (btn[24]); sobrescreve a
+               área de transferência do usuário (restaurada no fim) e não
+               serve para sessões em paralelo
+- "um_a_um":   o caminho antigo; também é o fallback se os outros falharem
+
+AUTOCL_SELECAO_MULTIPLA escolhe o modo (padrão: arquivo). Listas grandes
+são quebradas em lotes (lotes()) abaixo do que a seleção aguenta: cada
+lote é uma execução da transação.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from backend.sap_manager.espera import aguarda_tela
+
+MODOS = ("arquivo", "clipboard", "um_a_um")
+
+# valores por execução: acima disso o SELECT gerado pela seleção estoura
+# (dump de SQL muito longo) ou a lista de resultado passa do limite
+LIMITE_LOTE = 3000
+
+CAMPO_VALOR = (
+    "usr/tabsTAB_STRIP/tabpSIVA/"
+    "ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/"
+    "ctxtRSCSEL_255-SLOW_I[1,0]"
+)
+
+_BTN_INSERE = "tbar[0]/btn[13]"
+_BTN_APAGA = "tbar[0]/btn[16]"
+_BTN_ARQUIVO = "tbar[0]/btn[23]"
+_BTN_CLIPBOARD = "tbar[0]/btn[24]"
+
+_clipboard_lock = threading.Lock()
+
+
+def modo_padrao() -> str:
+    modo = os.environ.get("AUTOCL_SELECAO_MULTIPLA", "arquivo").strip().lower()
+    return modo if modo in MODOS else "arquivo"
+
+
+def lotes(valores: Iterable[str], tamanho: int = LIMITE_LOTE) -> Iterator[List[str]]:
+    """Valores sem repetição, em listas de até `tamanho`."""
+    unicos = list(dict.fromkeys(valores))
+    for inicio in range(0, len(unicos), max(1, tamanho)):
+        yield unicos[inicio:inicio + tamanho]
+
+
+def preenche_selecao(
+    session,
+    valores: Sequence[str],
+    janela: int = 1,
+    modo: Optional[str] = None,
+    campo: str = CAMPO_VALOR,
+) -> str:
+    """
+    Apaga a seleção do diálogo aberto em wnd[janela] e carrega `valores`.
+    `campo`: id do valor relativo à janela (a KS13 usa txt em vez de ctxt).
+    Devolve o modo que funcionou.
+    """
+    wnd = f"wnd[{janela}]"
+    session.findById(f"{wnd}/{_BTN_APAGA}").press()
+    if not valores:
+        return "vazio"
+
+    modo = modo or modo_padrao()
+    if modo != "um_a_um":
+        try:
+            if modo == "clipboard":
+                _por_clipboard(session, wnd, valores)
+            else:
+                _por_arquivo(session, janela, valores)
+            return modo
+        except Exception as e:
+            print(f"⚠️ Seleção múltipla por {modo} falhou ({e}); digitando valor a valor.")
+            _fecha_popups(session, janela)
+            session.findById(f"{wnd}/{_BTN_APAGA}").press()
+
+    for valor in valores:
+        session.findById(f"{wnd}/{campo}").text = valor
+        session.findById(f"{wnd}/{_BTN_INSERE}").press()
+    return "um_a_um"
+
+
+def _texto(valores: Sequence[str]) -> str:
+    return "\r\n".join(str(v) for v in valores) + "\r\n"
+
+
+def _por_arquivo(session, janela: int, valores: Sequence[str]) -> None:
+    dialogo = f"wnd[{janela + 1}]"
+    fd, caminho = tempfile.mkstemp(prefix="autocl_selecao_", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="latin-1", newline="") as f:
+            f.write(_texto(valores))
+        arquivo = Path(caminho)
+        session.findById(f"wnd[{janela}]/{_BTN_ARQUIVO}").press()
+        aguarda_tela(session, "selecao_arquivo_dialogo", qualquer=(dialogo,))
+        session.findById(f"{dialogo}/usr/ctxtDY_PATH").text = str(arquivo.parent)
+        session.findById(f"{dialogo}/usr/ctxtDY_FILENAME").text = arquivo.name
+        session.findById(f"{dialogo}/tbar[0]/btn[0]").press()
+        aguarda_tela(session, "selecao_arquivo", ausentes=(dialogo,))
+    finally:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def _por_clipboard(session, wnd: str, valores: Sequence[str]) -> None:
+    import win32clipboard
+
+    with _clipboard_lock:
+        win32clipboard.OpenClipboard()
+        try:
+            try:
+                anterior = win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+            except Exception:
+                anterior = None
+            win32clipboard.EmptyClipboard()
+            win32clipboard.SetClipboardText(_texto(valores), win32clipboard.CF_UNICODETEXT)
+        finally:
+            win32clipboard.CloseClipboard()
+        try:
+            session.findById(f"{wnd}/{_BTN_CLIPBOARD}").press()
+            aguarda_tela(session, "selecao_clipboard")
+        finally:
+            if anterior is not None:
+                win32clipboard.OpenClipboard()
+                try:
+                    win32clipboard.EmptyClipboard()
+                    win32clipboard.SetClipboardText(anterior, win32clipboard.CF_UNICODETEXT)
+                finally:
+                    win32clipboard.CloseClipboard()
+
+
+def _fecha_popups(session, janela: int) -> None:
+    # diálogo de arquivo / mensagem que tenha ficado aberto acima da seleção
+    for n in range(janela + 2, janela, -1):
+        popup = session.findById(f"wnd[{n}]", False)
+        if popup is not None:
+            try:
+                popup.close()
+            except Exception:
+                pass
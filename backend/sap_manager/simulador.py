@@ -0,0 +1,950 @@
+# backend/sap_manager/simulador.py
+"""
+Sessão SAP GUI simulada (sem COM) para medir e otimizar ko03 / ks13 /
+ysrelcont (e as leituras em lote da AUFK / CSKS pela SE16N) fora do Windows.
+
+- SessaoSimulada: implementa a superfície usada pelos scripts (findById,
+  .text/.key/.selected, press, sendVKey, select, setFocus, getCellValue,
+  rowCount, VerticalScrollbar, Children/ElementAt, ColumnOrder e a
+  exportação da grade para arquivo local) com o comportamento de tela de
+  cada transação, respondendo com DadosSimulados
+- DadosSimulados: respostas sintéticas (tamanho configurável) ou extraídas
+  de uma fita gravada no SAP real (GravadorSessao)
+- Latencia: custo por chamada COM (propriedade) e por ida ao servidor
+  (press / sendVKey / select / rolagem)
+- estatísticas por transação: chamadas COM por tipo, tempo de parede,
+  latência simulada e time.sleep fixos pedidos pelos scripts
+"""
+from __future__ import annotations
+
+import fnmatch
+import json
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from unittest import mock
+
+# ids usados pelos scripts (ko03.py / ks13.py / ysrelcont.py)
+_OKCD = "wnd[0]/tbar[0]/okcd"
+_VOLTAR = "wnd[0]/tbar[0]/btn[3]"
+
+_KO03_ORDEM = "wnd[0]/usr/ctxtCOAS-AUFNR"
+_KO03_EXECUTA = "wnd[0]/tbar[1]/btn[42]"
+_KO03_CENTRO = (
+    "wnd[0]/usr/tabsTABSTRIP_600/tabpBUT1/"
+    "ssubAREA_FOR_601:SAPMKAUF:0601/"
+    "subAREA1:SAPMKAUF:0315/ctxtCOAS-KOSTV"
+)
+
+_SELECAO_MULTIPLA_VALOR = "tblSAPLALDBSINGLE/"  # ...txtRSCSEL_255-SLOW_I[1,0] / ctxtRSCSEL_255-SLOW_I[1,0]
+_KS13_MAIS = "btnG_SELFLD_TAB-MORE[0,56]"
+_KS13_LISTA = "wnd[1]/usr"
+_KS13_COLUNAS = 10  # labels por linha da lista do help de pesquisa (ver ks13.py)
+
+_YSR_TIPO = "wnd[0]/usr/ctxtSC_BSART-LOW"
+_YSR_SELECAO = "wnd[0]/usr/btn%_SC_EBELN_%_APP_%-VALU_PUSH"
+_YSR_GRADE = "wnd[0]/usr/cntlGRID1/shellcont/shell"
+
+_SE16N_TABELA = "wnd[0]/usr/ctxtGD-TAB"
+_SE16N_SELECAO = "wnd[0]/usr/tblSAPLSE16NSELFIELDS_TC/btnPUSH["
+_SE16N_GRADE = "wnd[0]/usr/cntlRESULT_LIST/shellcont/shell"
+
+# colunas técnicas e títulos (o arquivo exportado traz os títulos)
+_YSR_COLUNAS = (("EBELN", "Contrato"), ("GERENTE", "Gerente"))
+_AUFK_COLUNAS = (("AUFNR", "Ordem"), ("KOSTV", "Centro cst.responsável"))
+_CSKS_COLUNAS = (("KOSTL", "Centro cst."), ("DATBI", "Válido até"), ("VERAK", "Responsável"))
+
+# a latência simulada dorme de verdade mesmo com time.sleep substituído (esperas)
+_dorme = time.sleep
+
+# transações com telas modeladas; nas demais (YSCLNRCL, SM37...) todo id existe
+TRANSACOES_MODELADAS = frozenset({"KO03", "KS13", "YSRELCONT", "SE16N"})
+
+# operações que vão ao servidor SAP (as demais são leitura/escrita local na GUI)
+OPERACOES_ROUNDTRIP = frozenset({"press", "sendVKey", "select", "scroll_set", "close", "selectContextMenuItem"})
+
+
+class ErroSimulado(Exception):
+    """Equivalente ao com_error do SAP GUI (ex: findById de controle inexistente)."""
+
+
+@dataclass
+class Latencia:
+    """Segundos por chamada COM simples e por ida ao servidor (press / sendVKey...)."""
+    propriedade_s: float = 0.0
+    roundtrip_s: float = 0.0
+
+    def custo(self, operacao: str) -> float:
+        return self.roundtrip_s if operacao in OPERACOES_ROUNDTRIP else self.propriedade_s
+
+
+@dataclass
+class DadosSimulados:
+    """
+    O que o "SAP" responde:
+    - ordens: nº da ordem (sem "OR") -> centro E (KO03)
+    - centros: [centro, responsável, válido até] (KS13; só ".9999" é vigente)
+    - contratos: tipo (ZCVR/ZCVM) -> [[contrato, gerente]] (YSRELCONT)
+    - limite_ks13: máximo de ocorrências do help de pesquisa da KS13
+    - linhas_visiveis_ks13: linhas por página da lista (rolagem)
+    """
+    ordens: Dict[str, str] = field(default_factory=dict)
+    centros: List[List[str]] = field(default_factory=list)
+    contratos: Dict[str, List[List[str]]] = field(default_factory=dict)
+    limite_ks13: int = 5000
+    linhas_visiveis_ks13: int = 20
+
+    @classmethod
+    def sinteticos(
+        cls,
+        n_contratos: int = 2000,
+        n_centros: int = 800,
+        n_ordens: int = 3000,
+        semente: int = 0,
+        **kwargs: Any,
+    ) -> "DadosSimulados":
+        rng = random.Random(semente)
+        prefixos = ["E8", "E9", "E5", "E7", "E4", "EZ", "E1", "SH"]
+        centros = sorted({f"{rng.choice(prefixos)}{rng.randrange(10**5):05d}" for _ in range(n_centros)})
+        gerencias = ["LMS/OP", "POCOS/SUP", "SUB/ENG", "SH/GEO", "EXP/AEXP", "CORP/TI"]
+        linhas_centros = []
+        for c in centros:
+            # ~10% com um registro antigo (encerrado) antes do vigente
+            if rng.random() < 0.1:
+                linhas_centros.append([c, rng.choice(gerencias), "31.12.2020"])
+            linhas_centros.append([c, rng.choice(gerencias), "31.12.9999"])
+
+        contratos: Dict[str, List[List[str]]] = {"ZCVR": [], "ZCVM": []}
+        for n in rng.sample(range(10**8), n_contratos):
+            contratos[rng.choice(["ZCVR", "ZCVM"])].append([f"46{n:08d}", f"GERENTE {rng.randrange(300)}"])
+
+        ordens = {f"{n:06d}": rng.choice(centros) for n in rng.sample(range(10**6), n_ordens)} if centros else {}
+        return cls(ordens=ordens, centros=linhas_centros, contratos=contratos, **kwargs)
+
+    # -------- chaves válidas (para montar consultas) --------
+    def chaves_ordens(self) -> List[str]:
+        return [f"OR{n}" for n in self.ordens]
+
+    def chaves_centros(self) -> List[str]:
+        return list(dict.fromkeys(c for c, _r, _d in self.centros))
+
+    def chaves_contratos(self) -> List[str]:
+        return [c for linhas in self.contratos.values() for c, _g in linhas]
+
+    # -------- persistência --------
+    def salva(self, caminho: Union[str, Path]) -> None:
+        Path(caminho).write_text(json.dumps(asdict(self), ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def carrega(cls, caminho: Union[str, Path]) -> "DadosSimulados":
+        """Lê DadosSimulados salvos ou uma fita do GravadorSessao."""
+        dados = json.loads(Path(caminho).read_text(encoding="utf-8"))
+        if "eventos" in dados:
+            return cls.de_fita(dados["eventos"])
+        return cls(**dados)
+
+    @classmethod
+    def de_fita(cls, eventos: List[Dict[str, Any]]) -> "DadosSimulados":
+        """
+        Reconstrói as telas a partir dos valores lidos no SAP real:
+        KO03 = ordem digitada + centro lido; SE16N = células AUFNR/KOSTV
+        (AUFK) e KOSTL/VERAK/DATBI (CSKS); KS13 = textos da lista;
+        YSRELCONT = células EBELN/GERENTE da grade, por tipo de contrato.
+        Só a leitura célula a célula fica na fita: grave com
+        AUTOCL_LEITURA_GRADE=celulas (a exportação vai para um arquivo).
+        """
+        dados = cls()
+        transacao = ""
+        ordem = None
+        tipo = None
+        celulas: Dict[int, Dict[str, str]] = {}
+        celulas_se16n: Dict[int, Dict[str, str]] = {}
+        textos_lista: Dict[int, str] = {}
+
+        def fecha_grade() -> None:
+            for linha in celulas.values():
+                if "EBELN" in linha:
+                    dados.contratos.setdefault(tipo or "", []).append([linha["EBELN"], linha.get("GERENTE", "")])
+            celulas.clear()
+            for linha in celulas_se16n.values():
+                if linha.get("AUFNR") and linha.get("KOSTV"):
+                    dados.ordens[linha["AUFNR"].lstrip("0")] = linha["KOSTV"]
+                elif linha.get("KOSTL"):
+                    dados.centros.append([linha["KOSTL"], linha.get("VERAK", ""), linha.get("DATBI", "")])
+            celulas_se16n.clear()
+
+        def fecha_lista() -> None:
+            # mesma leitura do ks13.py: linha = bloco de 10 labels após o cabeçalho
+            for i in range(2 * _KS13_COLUNAS - 1, max(textos_lista, default=-1) + 1, _KS13_COLUNAS):
+                if i in textos_lista:
+                    dados.centros.append([textos_lista.get(i - 9, ""), textos_lista.get(i - 5, ""), textos_lista[i]])
+            textos_lista.clear()
+
+        for ev in eventos:
+            op, id_, valor = ev.get("op"), ev.get("id", ""), ev.get("valor")
+            if op == "text_set" and id_ == _OKCD:
+                fecha_grade()
+                fecha_lista()
+                transacao = str(valor).replace("/n", "").upper()
+            elif transacao == "KO03" and op == "text_set" and id_ == _KO03_ORDEM:
+                ordem = str(valor)
+            elif transacao == "KO03" and op == "text_get" and id_ == _KO03_CENTRO and ordem and valor:
+                dados.ordens[ordem] = str(valor).strip()
+            elif transacao == "SE16N" and op == "getCellValue":
+                linha, coluna = ev["args"]
+                celulas_se16n.setdefault(int(linha), {})[str(coluna)] = str(valor).strip()
+            elif transacao == "KS13" and op == "elementAt":
+                textos_lista[int(ev["args"][0]) + int(ev.get("posicao", 0)) * _KS13_COLUNAS] = str(valor)
+            elif transacao == "YSRELCONT" and op == "text_set" and id_ == _YSR_TIPO:
+                fecha_grade()
+                tipo = str(valor)
+            elif transacao == "YSRELCONT" and op == "getCellValue":
+                linha, coluna = ev["args"]
+                celulas.setdefault(int(linha), {})[str(coluna)] = str(valor).strip()
+        fecha_grade()
+        fecha_lista()
+        dados.centros = [list(x) for x in dict.fromkeys(tuple(c) for c in dados.centros)]
+        return dados
+
+
+@dataclass
+class EstatisticasTransacao:
+    chamadas: Counter = field(default_factory=Counter)
+    tempo_s: float = 0.0
+    latencia_s: float = 0.0
+    espera_fixa_s: float = 0.0  # time.sleep dos scripts
+
+    @property
+    def total_chamadas(self) -> int:
+        return sum(self.chamadas.values())
+
+    @property
+    def roundtrips(self) -> int:
+        return sum(n for op, n in self.chamadas.items() if op in OPERACOES_ROUNDTRIP)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "chamadas": self.total_chamadas,
+            "roundtrips": self.roundtrips,
+            "por_operacao": dict(sorted(self.chamadas.items())),
+            "tempo_s": round(self.tempo_s, 4),
+            "latencia_s": round(self.latencia_s, 4),
+            "espera_fixa_s": round(self.espera_fixa_s, 4),
+        }
+
+
+# =========================================================
+# Elementos da GUI (o que findById devolve)
+# =========================================================
+
+class _Elemento:
+    def __init__(self, sessao: "SessaoSimulada", id_: str) -> None:
+        self._sessao = sessao
+        self.Id = id_
+
+    # -------- propriedades --------
+    @property
+    def text(self) -> str:
+        return self._sessao._chama("text_get", self.Id)
+
+    @text.setter
+    def text(self, valor: str) -> None:
+        self._sessao._chama("text_set", self.Id, valor)
+
+    Text = text
+
+    @property
+    def key(self) -> str:
+        return self._sessao._chama("key_get", self.Id)
+
+    @key.setter
+    def key(self, valor: str) -> None:
+        self._sessao._chama("key_set", self.Id, valor)
+
+    @property
+    def selected(self) -> bool:
+        return self._sessao._chama("selected_get", self.Id)
+
+    @selected.setter
+    def selected(self, valor: bool) -> None:
+        self._sessao._chama("selected_set", self.Id, valor)
+
+    @property
+    def rowCount(self) -> int:
+        return self._sessao._chama("rowCount", self.Id)
+
+    @property
+    def VerticalScrollbar(self) -> "_Rolagem":
+        return _Rolagem(self._sessao, self.Id)
+
+    @property
+    def Children(self) -> "_Filhos":
+        self._sessao._chama("children", self.Id)
+        return _Filhos(self._sessao, self.Id)
+
+    # -------- métodos --------
+    def press(self) -> None:
+        self._sessao._chama("press", self.Id)
+
+    def select(self) -> None:
+        self._sessao._chama("select", self.Id)
+
+    def setFocus(self) -> None:
+        self._sessao._chama("setFocus", self.Id)
+
+    def sendVKey(self, tecla: int) -> None:
+        self._sessao._chama("sendVKey", self.Id, tecla)
+
+    def maximize(self) -> None:
+        self._sessao._chama("maximize", self.Id)
+
+    def close(self) -> None:
+        self._sessao._chama("close", self.Id)
+
+    @property
+    def ColumnOrder(self) -> "_Colunas":
+        return _Colunas(self._sessao, self.Id, self._sessao._chama("columnOrder", self.Id))
+
+    def pressToolbarContextButton(self, botao: str) -> None:
+        self._sessao._chama("pressToolbarContextButton", self.Id, botao)
+
+    def selectContextMenuItem(self, item: str) -> None:
+        self._sessao._chama("selectContextMenuItem", self.Id, item)
+
+    def getCellValue(self, linha: int, coluna: str) -> str:
+        return self._sessao._chama("getCellValue", self.Id, linha, coluna)
+
+
+class _Rolagem:
+    def __init__(self, sessao: "SessaoSimulada", id_: str) -> None:
+        self._sessao = sessao
+        self._id = id_
+
+    @property
+    def Maximum(self) -> int:
+        return self._sessao._chama("scroll_get", self._id, "Maximum")
+
+    @property
+    def Range(self) -> int:
+        return self._sessao._chama("scroll_get", self._id, "Range")
+
+    @property
+    def Position(self) -> int:
+        return self._sessao._chama("scroll_get", self._id, "Position")
+
+    @Position.setter
+    def Position(self, valor: int) -> None:
+        self._sessao._chama("scroll_set", self._id, valor)
+
+
+class _Filhos:
+    def __init__(self, sessao: "SessaoSimulada", id_: str) -> None:
+        self._sessao = sessao
+        self._id = id_
+
+    def __len__(self) -> int:
+        return self._sessao._chama("count", self._id)
+
+    @property
+    def Count(self) -> int:
+        return len(self)
+
+    def ElementAt(self, indice: int) -> "_Texto":
+        return _Texto(self._sessao._chama("elementAt", self._id, indice))
+
+
+class _Colunas:
+    """GuiCollection de ColumnOrder: cada ElementAt é uma chamada COM."""
+
+    def __init__(self, sessao: "SessaoSimulada", id_: str, colunas: List[str]) -> None:
+        self._sessao = sessao
+        self._id = id_
+        self._colunas = colunas
+
+    @property
+    def Count(self) -> int:
+        return len(self._colunas)
+
+    def ElementAt(self, indice: int) -> str:
+        self._sessao._chama("columnAt", self._id, indice)
+        return self._colunas[indice]
+
+
+@dataclass
+class _Texto:
+    Text: str
+
+
+# =========================================================
+# Comportamento das telas
+# =========================================================
+
+class _Telas:
+    """Estado de tela de uma sessão: transação atual, janelas abertas, campos."""
+
+    def __init__(self, dados: DadosSimulados) -> None:
+        self.dados = dados
+        self.transacao = ""
+        self.janelas = {0}
+        self.campos: Dict[str, Any] = {}
+        self.status = ""
+        # seleção múltipla (KS13 / YSRELCONT)
+        self.selecao: List[str] = []
+        self.popup = ""  # qual popup está em wnd[1]
+        self.importacao = 0  # janela do diálogo "importar de arquivo texto" aberto
+        self._selecao_cache: Tuple[Any, Any, Any] = (None, None, None)
+        # KO03
+        self.centro_ko03 = ""
+        # KS13
+        self.lista: List[List[str]] = []
+        self.posicao = 0
+        # YSRELCONT / SE16N
+        self.grade: List[List[str]] = []
+        self.colunas_grade: Tuple[Tuple[str, str], ...] = ()
+        self.campo_se16n = 0  # linha do campo com a seleção múltipla
+
+    # -------- utilidades --------
+    @staticmethod
+    def _janela(id_: str) -> int:
+        if id_.startswith("wnd["):
+            return int(id_[4:id_.index("]")])
+        return 0
+
+    def existe(self, id_: str) -> bool:
+        if self.transacao not in TRANSACOES_MODELADAS and self.transacao:
+            return True
+        if self._janela(id_) not in self.janelas:
+            return False
+        if id_ == _YSR_GRADE:
+            return self.transacao == "YSRELCONT" and self.popup == "" and bool(self.grade)
+        if id_ == _SE16N_GRADE:
+            return self.transacao == "SE16N" and bool(self.grade)
+        return True
+
+    def _abre(self, janela: int, popup: str = "") -> None:
+        self.janelas.add(janela)
+        if janela == 1:
+            self.popup = popup
+
+    def _fecha(self, janela: int) -> None:
+        self.janelas.discard(janela)
+        if janela == 1:
+            self.popup = ""
+
+    # -------- leitura / escrita --------
+    def escreve(self, id_: str, valor: Any) -> None:
+        self.campos[id_] = valor
+        if id_.startswith("wnd[1]/usr/tabsTAB_STRIP") or id_.startswith("wnd[2]/usr/tabsTAB_STRIP"):
+            if _SELECAO_MULTIPLA_VALOR in id_:
+                self.campos["_valor_selecao"] = valor
+
+    def le(self, id_: str) -> Any:
+        if id_ == "wnd[0]/sbar":
+            return self.status
+        if id_ == _KO03_CENTRO:
+            return self.centro_ko03
+        return self.campos.get(id_, "")
+
+    # -------- ações --------
+    def aciona(self, operacao: str, id_: str, args: Tuple[Any, ...]) -> None:
+        if operacao == "close":
+            janela = self._janela(id_)
+            self._fecha(janela)
+            if janela == self.importacao:
+                self.importacao = 0
+            return
+        if self.importacao and operacao == "press" and id_ == f"wnd[{self.importacao}]/tbar[0]/btn[0]":
+            self._importa_arquivo()
+            return
+        if self._exportacao(operacao, id_, args):
+            return
+        if operacao == "sendVKey" and id_ == "wnd[0]" and args and args[0] == 0 and str(self.campos.get(_OKCD, "")).startswith("/n"):
+            self._inicia(str(self.campos.pop(_OKCD))[2:].upper())
+            return
+
+        t = self.transacao
+        if id_ == _VOLTAR:
+            self.status = ""
+            self.centro_ko03 = ""
+            self.grade = []
+            return
+
+        if t == "KO03":
+            self._ko03(operacao, id_)
+        elif t == "KS13":
+            self._ks13(operacao, id_, args)
+        elif t == "YSRELCONT":
+            self._ysrelcont(operacao, id_)
+        elif t == "SE16N":
+            self._se16n(operacao, id_, args)
+        # outras transações (YSCLNRCL, SM37...): só contam chamadas
+
+    def _exportacao(self, operacao: str, id_: str, args: Tuple[Any, ...]) -> bool:
+        """Exportar > Arquivo local > Texto com tabulações, de qualquer grade."""
+        if operacao == "selectContextMenuItem" and args and args[0] == "&PC" and self.grade:
+            self._abre(1, "exporta_formato")
+            return True
+        if operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[0]" and self.popup == "exporta_formato":
+            self.popup = "exporta_arquivo"
+            return True
+        if operacao == "press" and id_ in ("wnd[1]/tbar[0]/btn[0]", "wnd[1]/tbar[0]/btn[11]") and self.popup == "exporta_arquivo":
+            pasta = str(self.campos.get("wnd[1]/usr/ctxtDY_PATH", ""))
+            nome = str(self.campos.get("wnd[1]/usr/ctxtDY_FILENAME", ""))
+            linhas = ["\t".join(titulo for _, titulo in self.colunas_grade)]
+            linhas += ["\t".join(linha) for linha in self.grade]
+            (Path(pasta) / nome).write_text("\r\n".join(linhas) + "\r\n", encoding="utf-8")
+            self._fecha(1)
+            return True
+        return False
+
+    def _inicia(self, transacao: str) -> None:
+        self.transacao = transacao
+        self.janelas = {0}
+        self.popup = ""
+        self.importacao = 0
+        self.campos.clear()
+        self.status = ""
+        self.selecao = []
+        self.lista = []
+        self.grade = []
+        self.centro_ko03 = ""
+
+    def _selecao_multipla(self, operacao: str, id_: str, janela: int) -> bool:
+        """Botões da tela de seleção múltipla; True se tratou."""
+        if operacao != "press" or not id_.startswith(f"wnd[{janela}]/tbar[0]/"):
+            return False
+        if id_.endswith("btn[13]"):  # insere linha com o valor digitado
+            valor = str(self.campos.get("_valor_selecao", "")).strip()
+            if valor:
+                self.selecao.append(valor)
+            return True
+        if id_.endswith("btn[16]"):  # apaga a seleção inteira
+            self.selecao = []
+            return True
+        if id_.endswith("btn[23]"):  # importar de arquivo texto: abre o diálogo de arquivo
+            self.importacao = janela + 1
+            self.janelas.add(self.importacao)
+            return True
+        if id_.endswith("btn[24]"):
+            raise ErroSimulado("Área de transferência não disponível no simulador")
+        return False
+
+    def _importa_arquivo(self) -> None:
+        janela = self.importacao
+        pasta = str(self.campos.get(f"wnd[{janela}]/usr/ctxtDY_PATH", ""))
+        nome = str(self.campos.get(f"wnd[{janela}]/usr/ctxtDY_FILENAME", ""))
+        texto = (Path(pasta) / nome).read_text(encoding="latin-1")
+        self.selecao.extend(v.strip() for v in texto.splitlines() if v.strip())
+        self.janelas.discard(janela)
+        self.importacao = 0
+
+    def _ko03(self, operacao: str, id_: str) -> None:
+        if operacao == "press" and id_ == _KO03_EXECUTA:
+            ordem = str(self.campos.get(_KO03_ORDEM, "")).strip()
+            centro = self.dados.ordens.get(ordem)
+            if centro is None:
+                self.status = f"Ordem {ordem} não existe"
+                self.centro_ko03 = ""
+            else:
+                self.status = ""
+                self.centro_ko03 = centro
+
+    def _ks13(self, operacao: str, id_: str, args: Tuple[Any, ...]) -> None:
+        if operacao == "sendVKey" and id_ == "wnd[0]" and args[0] == 6:
+            self._abre(1, "area")  # área de contabilidade de custos
+        elif operacao == "sendVKey" and id_ == "wnd[1]" and self.popup == "area":
+            self._fecha(1)
+        elif operacao == "sendVKey" and id_ == "wnd[0]" and args[0] == 4:
+            self._abre(1, "help")
+            self.selecao = []
+        elif operacao == "press" and id_.endswith(_KS13_MAIS):
+            self._abre(2)
+        elif 2 in self.janelas and self._selecao_multipla(operacao, id_, 2):
+            pass
+        elif operacao == "press" and id_ == "wnd[2]/tbar[0]/btn[8]":
+            self._fecha(2)
+        elif operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[0]" and self.popup == "help":
+            padroes = self.selecao or ["*"]
+            achados = [list(c) for c in self.dados.centros if any(fnmatch.fnmatchcase(c[0], p) for p in padroes)]
+            self.lista = achados[: self.dados.limite_ks13]
+            self.posicao = 0
+            self.popup = "lista"
+        elif operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[12]":
+            self._fecha(1)
+            self.lista = []
+
+    def _ysrelcont(self, operacao: str, id_: str) -> None:
+        if operacao == "press" and id_ == _YSR_SELECAO:
+            self._abre(1, "selecao")
+        elif self.popup == "selecao" and self._selecao_multipla(operacao, id_, 1):
+            pass
+        elif operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[8]" and self.popup == "selecao":
+            # copia a seleção; o relatório pede confirmação antes de rodar
+            self._fecha(1)
+            self._abre(1, "confirma")
+        elif operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[8]" and self.popup == "confirma":
+            self._fecha(1)
+            tipo = str(self.campos.get(_YSR_TIPO, ""))
+            pedidos = set(self.selecao)
+            self.grade = [
+                list(linha) for linha in self.dados.contratos.get(tipo, [])
+                if not pedidos or linha[0] in pedidos
+            ]
+            self.colunas_grade = _YSR_COLUNAS
+            if not self.grade:
+                self._abre(1, "sem_dados")
+        elif operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[0]" and self.popup == "sem_dados":
+            self._fecha(1)
+
+    def _se16n(self, operacao: str, id_: str, args: Tuple[Any, ...]) -> None:
+        # AUFK: AUFNR (12 dígitos, zeros à esquerda) -> KOSTV; CSKS: KOSTL/DATBI/VERAK
+        if operacao == "press" and id_.startswith(_SE16N_SELECAO):
+            self.campo_se16n = int(id_[len(_SE16N_SELECAO):].split(",")[1].rstrip("]"))
+            self._abre(1, "selecao")
+        elif self.popup == "selecao" and self._selecao_multipla(operacao, id_, 1):
+            pass
+        elif operacao == "press" and id_ == "wnd[1]/tbar[0]/btn[8]" and self.popup == "selecao":
+            self._fecha(1)
+        elif operacao == "sendVKey" and id_ == "wnd[0]" and args and args[0] == 8:
+            tabela = str(self.campos.get(_SE16N_TABELA, "")).upper()
+            if tabela == "AUFK" and self.campo_se16n == 0:
+                linhas = [[ordem.zfill(12), centro] for ordem, centro in self.dados.ordens.items()]
+                self.colunas_grade = _AUFK_COLUNAS
+            elif tabela == "CSKS" and self.campo_se16n == 1:
+                linhas = [[centro, ate, responsavel] for centro, responsavel, ate in self.dados.centros]
+                self.colunas_grade = _CSKS_COLUNAS
+            else:
+                self.grade = []
+                self.status = "Tabela/campo não modelado no simulador"
+                return
+            self.grade = [linha for linha in linhas if self._na_selecao(linha[0])]
+            self.status = "" if self.grade else "Nenhum valor encontrado"
+
+    def _na_selecao(self, valor: str) -> bool:
+        # valor exato (sem zeros à esquerda) ou padrão com * / +
+        if not self.selecao:
+            return True
+        if self._selecao_cache[0] is not self.selecao:
+            exatos = {p.lstrip("0") for p in self.selecao if "*" not in p and "+" not in p}
+            padroes = [p.replace("+", "?") for p in self.selecao if "*" in p or "+" in p]
+            self._selecao_cache = (self.selecao, exatos, padroes)
+        _, exatos, padroes = self._selecao_cache
+        return valor.lstrip("0") in exatos or any(fnmatch.fnmatchcase(valor, p) for p in padroes)
+
+    # -------- lista da KS13 / grade da YSRELCONT / SE16N --------
+    def rolagem(self, campo: str) -> int:
+        visiveis = self.dados.linhas_visiveis_ks13
+        if campo == "Range":
+            return visiveis
+        if campo == "Maximum":
+            return max(0, len(self.lista) - visiveis)
+        return self.posicao
+
+    def rola(self, posicao: int) -> None:
+        self.posicao = max(0, min(int(posicao), self.rolagem("Maximum")))
+
+    def _visiveis(self) -> List[List[str]]:
+        return self.lista[self.posicao:self.posicao + self.dados.linhas_visiveis_ks13]
+
+    def n_filhos(self) -> int:
+        return _KS13_COLUNAS * (1 + len(self._visiveis()))
+
+    def filho(self, indice: int) -> str:
+        linha, coluna = divmod(indice, _KS13_COLUNAS)
+        if linha == 0:
+            return ["Centro cst.", "", "", "", "Responsável", "", "", "", "", "Válido até"][coluna]
+        centro, responsavel, ate = self._visiveis()[linha - 1]
+        return {0: centro, 4: responsavel, 9: ate}.get(coluna, "")
+
+    def celula(self, linha: int, coluna: str) -> str:
+        for indice, (nome, _) in enumerate(self.colunas_grade):
+            if nome == coluna:
+                return self.grade[linha][indice]
+        return ""
+
+
+class SessaoSimulada:
+    """
+    Sessão SAP GUI falsa para os scripts de sap_manager.
+
+        sessao = SessaoSimulada(DadosSimulados.sinteticos(), Latencia(roundtrip_s=0.03))
+        with sessao.esperas("contadas"):
+            executar_ko03(sessao, ordens)
+        print(sessao.relatorio())
+    """
+
+    def __init__(self, dados: Optional[DadosSimulados] = None, latencia: Optional[Latencia] = None) -> None:
+        self.dados = dados or DadosSimulados.sinteticos()
+        self.latencia = latencia or Latencia()
+        self.Id = "/app/con[0]/ses[0]"
+        self.Busy = False
+        self._telas = _Telas(self.dados)
+        self.estatisticas: Dict[str, EstatisticasTransacao] = {}
+        self._relogio = time.perf_counter()
+
+    # -------- contabilidade --------
+    def _stats(self) -> EstatisticasTransacao:
+        return self.estatisticas.setdefault(self._telas.transacao or "(sem transação)", EstatisticasTransacao())
+
+    def _marca_tempo(self) -> None:
+        agora = time.perf_counter()
+        self._stats().tempo_s += agora - self._relogio
+        self._relogio = agora
+
+    def _chama(self, operacao: str, id_: str, *args: Any) -> Any:
+        self._marca_tempo()
+        if operacao == "text_set" and id_ == _OKCD and str(args[0]).startswith("/n"):
+            # "/nXXXX" + Enter já conta para a nova transação
+            self._telas.transacao = str(args[0])[2:].upper()
+        stats = self._stats()
+        stats.chamadas[operacao] += 1
+        custo = self.latencia.custo(operacao)
+        if custo:
+            _dorme(custo)
+            stats.latencia_s += custo
+
+        telas = self._telas
+        if not telas.existe(id_):
+            raise ErroSimulado(f"Controle não encontrado: {id_}")
+
+        if operacao == "text_set" or operacao == "key_set" or operacao == "selected_set":
+            telas.escreve(id_, args[0])
+            return None
+        if operacao in ("text_get", "key_get"):
+            return telas.le(id_)
+        if operacao == "selected_get":
+            return bool(telas.campos.get(id_, False))
+        if operacao == "rowCount":
+            return len(telas.grade)
+        if operacao == "columnOrder":
+            return [nome for nome, _ in telas.colunas_grade]
+        if operacao == "getCellValue":
+            return telas.celula(*args)
+        if operacao == "scroll_get":
+            return telas.rolagem(args[0])
+        if operacao == "scroll_set":
+            telas.rola(args[0])
+            return None
+        if operacao == "count":
+            return telas.n_filhos()
+        if operacao == "elementAt":
+            return telas.filho(args[0])
+        if operacao in ("press", "select", "sendVKey", "close", "selectContextMenuItem"):
+            telas.aciona(operacao, id_, args)
+            # a troca de transação conta a partir daqui
+            self._marca_tempo()
+        return None
+
+    # -------- API COM --------
+    def findById(self, id_: str, levanta: bool = True) -> Optional[_Elemento]:
+        self._chama_find(id_)
+        if not self._telas.existe(id_):
+            if levanta:
+                raise ErroSimulado(f"Controle não encontrado: {id_}")
+            return None
+        return _Elemento(self, id_)
+
+    def _chama_find(self, id_: str) -> None:
+        self._marca_tempo()
+        stats = self._stats()
+        stats.chamadas["findById"] += 1
+        custo = self.latencia.propriedade_s
+        if custo:
+            _dorme(custo)
+            stats.latencia_s += custo
+
+    # -------- esperas fixas (time.sleep dos scripts) --------
+    @contextmanager
+    def esperas(self, modo: str = "contadas") -> Iterator[None]:
+        """
+        "contadas": os time.sleep dos scripts são somados por transação mas
+        não esperados (o benchmark mede só o trabalho); "reais": somados e
+        esperados. A latência simulada não passa por aqui.
+        """
+        def espera(segundos: float) -> None:
+            self._marca_tempo()
+            self._stats().espera_fixa_s += segundos
+            if modo == "reais":
+                _dorme(segundos)
+
+        with mock.patch("time.sleep", espera):
+            yield
+        self._marca_tempo()
+
+    # -------- relatório --------
+    def relatorio(self) -> Dict[str, Dict[str, Any]]:
+        self._marca_tempo()
+        return {t: e.como_dict() for t, e in self.estatisticas.items()}
+
+    def zera(self) -> None:
+        self.estatisticas.clear()
+        self._relogio = time.perf_counter()
+
+
+class SessoesSimuladas:
+    """
+    Provedor de sessões do ExecutorSessoes (paralelo.py) para benchmark:
+    `maximo` sessões simuladas independentes sobre os mesmos dados, como
+    várias janelas da mesma conexão.
+    """
+
+    def __init__(self, dados: DadosSimulados, latencia: Optional[Latencia] = None, maximo: int = 6) -> None:
+        self.dados = dados
+        self.latencia = latencia or Latencia()
+        self.maximo = maximo
+        self.sessoes: Dict[str, SessaoSimulada] = {}
+
+    def abre(self, quantidade: int) -> List[str]:
+        for i in range(min(quantidade, self.maximo)):
+            id_ = f"/app/con[0]/ses[{i}]"
+            if id_ not in self.sessoes:
+                sessao = SessaoSimulada(self.dados, self.latencia)
+                sessao.Id = id_
+                self.sessoes[id_] = sessao
+        return list(self.sessoes)
+
+    def sessao(self, id_: str) -> SessaoSimulada:
+        return self.sessoes[id_]
+
+    def fecha(self) -> None:
+        pass
+
+    def relatorio(self) -> Dict[str, Dict[str, Any]]:
+        """Estatísticas somadas de todas as sessões, por transação."""
+        total: Dict[str, EstatisticasTransacao] = {}
+        for sessao in self.sessoes.values():
+            sessao._marca_tempo()
+            for transacao, e in sessao.estatisticas.items():
+                t = total.setdefault(transacao, EstatisticasTransacao())
+                t.chamadas.update(e.chamadas)
+                t.tempo_s += e.tempo_s
+                t.latencia_s += e.latencia_s
+                t.espera_fixa_s += e.espera_fixa_s
+        return {t: e.como_dict() for t, e in total.items()}
+
+
+# =========================================================
+# Gravação no SAP real
+# =========================================================
+
+class GravadorSessao:
+    """
+    Envolve uma sessão COM real e registra cada chamada (id, operação,
+    argumentos e valor lido) numa fita JSON, para depois reproduzir as
+    mesmas telas com DadosSimulados.carrega(fita) fora do SAP.
+
+        sessao = GravadorSessao(get_sap_free_session())
+        executar_ks13(sessao, centros)
+        sessao.salva("ks13.json")
+    """
+
+    def __init__(self, sessao: Any) -> None:
+        self._sessao = sessao
+        self.eventos: List[Dict[str, Any]] = []
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._sessao, nome)
+
+    def _registra(self, op: str, id_: str, valor: Any = None, *args: Any, **extra: Any) -> None:
+        ev: Dict[str, Any] = {"op": op, "id": id_, "t": time.time()}
+        if valor is not None:
+            ev["valor"] = valor if isinstance(valor, (str, int, float, bool)) else str(valor)
+        if args:
+            ev["args"] = list(args)
+        ev.update(extra)
+        self.eventos.append(ev)
+
+    def findById(self, id_: str, *args: Any) -> Any:
+        elemento = self._sessao.findById(id_, *args)
+        self._registra("findById", id_)
+        return None if elemento is None else _ElementoGravado(self, elemento, id_)
+
+    def salva(self, caminho: Union[str, Path]) -> None:
+        Path(caminho).write_text(json.dumps({"versao": 1, "eventos": self.eventos}, ensure_ascii=False), encoding="utf-8")
+
+
+class _ElementoGravado:
+    _PROPRIEDADES = ("text", "Text", "key", "selected", "rowCount")
+
+    def __init__(self, gravador: GravadorSessao, elemento: Any, id_: str) -> None:
+        object.__setattr__(self, "_gravador", gravador)
+        object.__setattr__(self, "_elemento", elemento)
+        object.__setattr__(self, "_id", id_)
+
+    def __getattr__(self, nome: str) -> Any:
+        valor = getattr(self._elemento, nome)
+        if nome in self._PROPRIEDADES:
+            self._gravador._registra(f"{nome.lower()}_get" if nome != "rowCount" else "rowCount", self._id, valor)
+            return valor
+        if nome == "VerticalScrollbar":
+            return _RolagemGravada(self._gravador, valor, self._id)
+        if nome == "Children":
+            return _FilhosGravados(self._gravador, valor, self._id)
+        if callable(valor):
+            def chamada(*args: Any) -> Any:
+                resultado = valor(*args)
+                self._gravador._registra(nome, self._id, resultado, *args)
+                return resultado
+            return chamada
+        return valor
+
+    def __setattr__(self, nome: str, valor: Any) -> None:
+        setattr(self._elemento, nome, valor)
+        self._gravador._registra(f"{nome.lower()}_set", self._id, valor)
+
+
+class _RolagemGravada:
+    def __init__(self, gravador: GravadorSessao, rolagem: Any, id_: str) -> None:
+        object.__setattr__(self, "_gravador", gravador)
+        object.__setattr__(self, "_rolagem", rolagem)
+        object.__setattr__(self, "_id", id_)
+
+    def __getattr__(self, nome: str) -> Any:
+        valor = getattr(self._rolagem, nome)
+        self._gravador._registra("scroll_get", self._id, valor, nome)
+        return valor
+
+    def __setattr__(self, nome: str, valor: Any) -> None:
+        setattr(self._rolagem, nome, valor)
+        self._gravador._registra("scroll_set", self._id, valor, nome)
+        if nome == "Position":
+            self._gravador._posicao = int(valor)
+
+
+class _FilhosGravados:
+    def __init__(self, gravador: GravadorSessao, filhos: Any, id_: str) -> None:
+        self._gravador = gravador
+        self._filhos = filhos
+        self._id = id_
+
+    def __len__(self) -> int:
+        return len(self._filhos)
+
+    @property
+    def Count(self) -> int:
+        return self._filhos.Count
+
+    def ElementAt(self, indice: int) -> Any:
+        filho = self._filhos.ElementAt(indice)
+        # posição da rolagem junto: a lista é reconstruída página a página
+        posicao = getattr(self._gravador, "_posicao", 0)
+        self._gravador._registra("elementAt", self._id, filho.Text, indice, posicao=posicao)
+        return filho
+
+
+def mede(
+    sessao: SessaoSimulada,
+    funcao: Callable[..., Any],
+    *args: Any,
+    esperas: str = "contadas",
+    **kwargs: Any,
+) -> Tuple[Any, Dict[str, Dict[str, Any]]]:
+    """Roda funcao(sessao, *args) do zero e devolve (resultado, relatório por transação)."""
+    sessao.zera()
+    with sessao.esperas(esperas):
+        resultado = funcao(sessao, *args, **kwargs)
+    return resultado, sessao.relatorio()
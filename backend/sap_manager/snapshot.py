@@ -0,0 +1,247 @@
+# backend/sap_manager/snapshot.py
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from backend.core.paths import cache_dir
+from backend.sap_manager.ks13 import executar_ks13_completo
+from backend.sap_manager.ysrelcont import executar_ysrelcont_completo
+
+# Fontes sincronizadas em lote (as tabelas mestre inteiras, não por chave)
+FONTE_CONTRATOS = "YSRELCONT"  # contrato ZCVR/ZCVM -> gerente
+FONTE_CENTROS = "KS13"         # centro de custo E... válido (".9999") -> gerência
+
+FONTES = (FONTE_CONTRATOS, FONTE_CENTROS)
+
+IDADE_MAXIMA_PADRAO_HORAS = 36  # sync noturno + folga de um dia útil
+
+_LOTE_SQL = 500
+
+Buscador = Callable[[object], Optional[Dict[str, str]]]
+
+
+def caminho_padrao() -> Path:
+    return cache_dir() / "dados_mestres.sqlite3"
+
+
+@dataclass
+class ResultadoSync:
+    fonte: str
+    versao: Optional[int]  # None = sync falhou, nada foi alterado
+    total: int = 0
+    inseridos: int = 0
+    alterados: int = 0
+    removidos: int = 0
+
+    def resumo(self) -> str:
+        if self.versao is None:
+            return f"{self.fonte}: falha na extração (snapshot anterior mantido)"
+        return (
+            f"{self.fonte}: versão {self.versao} — {self.total} registros "
+            f"(+{self.inseridos} / ~{self.alterados} / -{self.removidos})"
+        )
+
+
+class SnapshotDadosMestres:
+    """
+    Cópia local (SQLite em AppData) das tabelas mestre usadas na Reduzida.
+
+    - dados_mestres: estado atual, uma linha por (fonte, chave)
+    - dados_mestres_diffs: o que mudou em cada versão (I / U / D)
+    - snapshot_versoes: uma linha por sincronização concluída
+
+    A sincronização é incremental: só as diferenças em relação à versão
+    anterior são gravadas, tudo numa transação.
+    """
+
+    def __init__(self, caminho: Optional[Path] = None) -> None:
+        self.caminho = Path(caminho) if caminho else caminho_padrao()
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.caminho), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS snapshot_versoes (
+                versao       INTEGER PRIMARY KEY AUTOINCREMENT,
+                fonte        TEXT    NOT NULL,
+                concluido_em REAL    NOT NULL,
+                total        INTEGER NOT NULL,
+                inseridos    INTEGER NOT NULL,
+                alterados    INTEGER NOT NULL,
+                removidos    INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_snapshot_versoes_fonte
+                ON snapshot_versoes (fonte, versao);
+
+            CREATE TABLE IF NOT EXISTS dados_mestres (
+                fonte  TEXT    NOT NULL,
+                chave  TEXT    NOT NULL,
+                valor  TEXT    NOT NULL,
+                versao INTEGER NOT NULL,
+                PRIMARY KEY (fonte, chave)
+            );
+
+            CREATE TABLE IF NOT EXISTS dados_mestres_diffs (
+                versao         INTEGER NOT NULL,
+                fonte          TEXT    NOT NULL,
+                chave          TEXT    NOT NULL,
+                operacao       TEXT    NOT NULL,
+                valor_anterior TEXT,
+                valor_novo     TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_dados_mestres_diffs_versao
+                ON dados_mestres_diffs (fonte, versao);
+            """
+        )
+        self._conn.commit()
+
+    # -------- leitura --------
+    def versao_atual(self, fonte: str) -> Optional[int]:
+        row = self._conn.execute(
+            "SELECT MAX(versao) FROM snapshot_versoes WHERE fonte = ?", (fonte,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def idade_horas(self, fonte: str) -> Optional[float]:
+        row = self._conn.execute(
+            "SELECT MAX(concluido_em) FROM snapshot_versoes WHERE fonte = ?", (fonte,)
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return (time.time() - row[0]) / 3600
+
+    def disponivel(self, fonte: str, idade_maxima_horas: float = IDADE_MAXIMA_PADRAO_HORAS) -> bool:
+        """True se existe snapshot da fonte e ele não está vencido."""
+        idade = self.idade_horas(fonte)
+        return idade is not None and idade <= idade_maxima_horas
+
+    def tabela(self, fonte: str) -> Dict[str, str]:
+        cur = self._conn.execute("SELECT chave, valor FROM dados_mestres WHERE fonte = ?", (fonte,))
+        return dict(cur.fetchall())
+
+    def consulta(self, fonte: str, chaves: Iterable[str]) -> Dict[str, str]:
+        """{chave: valor} só das chaves pedidas (join local, pela PK)."""
+        chaves = list(dict.fromkeys(chaves))
+        resultado: Dict[str, str] = {}
+        for i in range(0, len(chaves), _LOTE_SQL):
+            lote = chaves[i:i + _LOTE_SQL]
+            marcadores = ",".join("?" * len(lote))
+            cur = self._conn.execute(
+                f"SELECT chave, valor FROM dados_mestres WHERE fonte = ? AND chave IN ({marcadores})",
+                [fonte, *lote],
+            )
+            resultado.update(cur.fetchall())
+        return resultado
+
+    def diffs(self, fonte: str, desde_versao: int = 0) -> List[tuple]:
+        """(versao, chave, operacao, valor_anterior, valor_novo) após `desde_versao`."""
+        cur = self._conn.execute(
+            "SELECT versao, chave, operacao, valor_anterior, valor_novo FROM dados_mestres_diffs "
+            "WHERE fonte = ? AND versao > ? ORDER BY versao",
+            (fonte, desde_versao),
+        )
+        return cur.fetchall()
+
+    # -------- escrita --------
+    def aplica(self, fonte: str, novos: Dict[str, str]) -> ResultadoSync:
+        """
+        Compara a extração completa `novos` com o estado atual e grava só as
+        diferenças, sob uma nova versão.
+        """
+        atual = self.tabela(fonte)
+        novos = {str(k).strip(): str(v or "").strip() for k, v in novos.items() if str(k).strip()}
+
+        inseridos = [(k, v) for k, v in novos.items() if k not in atual]
+        alterados = [(k, atual[k], v) for k, v in novos.items() if k in atual and atual[k] != v]
+        removidos = [(k, v) for k, v in atual.items() if k not in novos]
+
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO snapshot_versoes (fonte, concluido_em, total, inseridos, alterados, removidos) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fonte, time.time(), len(novos), len(inseridos), len(alterados), len(removidos)),
+            )
+            versao = cur.lastrowid
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dados_mestres (fonte, chave, valor, versao) VALUES (?, ?, ?, ?)",
+                [(fonte, k, v, versao) for k, v in inseridos]
+                + [(fonte, k, v, versao) for k, _ant, v in alterados],
+            )
+            self._conn.executemany(
+                "DELETE FROM dados_mestres WHERE fonte = ? AND chave = ?",
+                [(fonte, k) for k, _v in removidos],
+            )
+            self._conn.executemany(
+                "INSERT INTO dados_mestres_diffs (versao, fonte, chave, operacao, valor_anterior, valor_novo) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(versao, fonte, k, "I", None, v) for k, v in inseridos]
+                + [(versao, fonte, k, "U", ant, v) for k, ant, v in alterados]
+                + [(versao, fonte, k, "D", v, None) for k, v in removidos],
+            )
+
+        return ResultadoSync(fonte, versao, len(novos), len(inseridos), len(alterados), len(removidos))
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+
+# =========================================================
+# Extrações completas (fluxos SAP existentes, sem filtro de chave)
+# =========================================================
+
+def baixa_contratos(session) -> Optional[Dict[str, str]]:
+    """Todos os contratos ZCVR/ZCVM -> gerente (YSRELCONT sem seleção de contratos)."""
+    return executar_ysrelcont_completo(session)
+
+
+def baixa_centros(session) -> Optional[Dict[str, str]]:
+    """Todos os centros E* válidos (".9999") -> responsável (KS13)."""
+    return executar_ks13_completo(session)
+
+
+BUSCADORES_PADRAO: Dict[str, Buscador] = {
+    FONTE_CONTRATOS: baixa_contratos,
+    FONTE_CENTROS: baixa_centros,
+}
+
+
+def sincroniza(
+    session,
+    snapshot: SnapshotDadosMestres,
+    fontes: Iterable[str] = FONTES,
+    buscadores: Optional[Dict[str, Buscador]] = None,
+) -> List[ResultadoSync]:
+    """
+    Baixa cada fonte inteira e aplica o diff no snapshot.
+
+    `buscadores` ({fonte: função(session) -> dict}) permite trocar a extração
+    SAP por uma sessão/função fake nos testes.
+    Extração que falha (None / exceção / vazia) não altera a versão anterior.
+    """
+    buscadores = buscadores or BUSCADORES_PADRAO
+    resultados: List[ResultadoSync] = []
+
+    for fonte in fontes:
+        try:
+            novos = buscadores[fonte](session)
+        except Exception as e:
+            print(f"⚠️ Erro ao extrair {fonte}: {e}")
+            novos = None
+
+        # lista vazia quase sempre é falha de tela, não "todos os contratos sumiram"
+        if not novos:
+            resultados.append(ResultadoSync(fonte, None))
+            continue
+
+        resultados.append(snapshot.aplica(fonte, novos))
+
+    return resultados
@@ -0,0 +1,65 @@
+# backend/sap_manager/sync_dados_mestres.py
+"""
+Sincronização noturna do snapshot de dados mestre (YSRELCONT + KS13).
+
+Rodar fora do horário comercial, ex. pelo Agendador de Tarefas do Windows:
+    schtasks /Create /SC DAILY /ST 02:00 /TN AUTO_CL_DadosMestres ^
+        /TR "python -u <repo>\\backend\\sap_manager\\sync_dados_mestres.py"
+
+Com o snapshot em dia, a Reduzida resolve gerentes e gerências por join
+local, sem abrir essas transações no SAP.
+"""
+from pathlib import Path
+import sys
+
+try:
+    repo_root = Path(__file__).resolve().parents[2]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+except Exception:
+    pass
+
+from backend.sap_manager.espera import aguarda_tela, esperas, resumo_esperas
+from backend.sap_manager.sap_connect import (
+    get_sap_free_session,
+    start_sap_manager,
+    start_connection,
+    close_sap_manager,
+)
+from backend.sap_manager.snapshot import SnapshotDadosMestres, sincroniza
+
+
+def main() -> int:
+    snapshot = SnapshotDadosMestres()
+    sap_ja_aberto = None
+    try:
+        print("Iniciando SAP GUI...")
+        sap_ja_aberto = start_sap_manager()
+        start_connection()
+        session = get_sap_free_session()
+        aguarda_tela(session, "sessao_pronta", qualquer=("wnd[0]",))
+
+        resultados = sincroniza(session, snapshot)
+        for r in resultados:
+            print(r.resumo())
+        print(resumo_esperas(esperas()))
+
+        if all(r.versao is not None for r in resultados):
+            print("status_success")
+            return 0
+        print("status_error")
+        return 1
+
+    except Exception as e:
+        print(f"Erro na sincronização dos dados mestre: {e}")
+        print("status_error")
+        return 1
+
+    finally:
+        snapshot.close()
+        if sap_ja_aberto is not None:
+            close_sap_manager(sap_ja_aberto)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,478 @@
+# backend/sap_manager/tests.py
+# Da raiz do repo: python -m pytest backend/sap_manager/tests.py
+# (ou, em backend/: PYTHONPATH=.. python manage.py test sap_manager)
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from backend.sap_manager import cache as cache_mod
+from backend.sap_manager import exportacao_alv, ko03, se16n, selecao_multipla, simulador
+from backend.sap_manager.cache import (
+    CacheConsultas,
+    RespostaParcial,
+    consulta_com_cache,
+    nao_confirmadas,
+    une_respostas,
+)
+from backend.sap_manager.selecao_multipla import LIMITE_LOTE, preenche_selecao
+from backend.sap_manager.simulador import DadosSimulados, ErroSimulado, SessaoSimulada, mede
+from backend.sap_manager.snapshot import FONTE_CENTROS, FONTE_CONTRATOS, SnapshotDadosMestres, sincroniza
+from backend.reports.enriquecimento import _pelo_snapshot
+
+
+class _ConsultaFake:
+    """Faz o papel do SAP: responde do dicionário e anota cada chamada."""
+
+    def __init__(self, dados, resposta=None):
+        self.dados = dados
+        self.resposta = resposta
+        self.chamadas = []
+
+    def __call__(self, chaves):
+        self.chamadas.append(list(chaves))
+        if self.resposta is not None:
+            return self.resposta(chaves)
+        return {k: self.dados[k] for k in chaves if k in self.dados}
+
+
+class ConsultaComCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.caminho = Path(self._tmp.name) / "consultas.sqlite3"
+        self.cache = CacheConsultas(self.caminho, ttl_horas=1, ttl_negativo_horas=0.5)
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def _no_futuro(self, segundos):
+        relogio = mock.Mock()
+        relogio.time.return_value = time.time() + segundos
+        return mock.patch.object(cache_mod, "time", relogio)
+
+    def test_miss_depois_hit(self):
+        sap = _ConsultaFake({"A": "gerente a", "B": "gerente b"})
+        self.assertEqual(consulta_com_cache(self.cache, "KS13", ["A", "B"], sap), {"A": "gerente a", "B": "gerente b"})
+        self.assertEqual(consulta_com_cache(self.cache, "KS13", ["A", "B"], sap), {"A": "gerente a", "B": "gerente b"})
+        self.assertEqual(sap.chamadas, [["A", "B"]])
+        self.assertEqual(self.cache.estatisticas()["KS13"], {"hits": 2, "misses": 2, "negativos": 0})
+
+    def test_so_faltantes_vao_ao_sap(self):
+        sap = _ConsultaFake({"A": "1", "B": "2", "C": "3"})
+        consulta_com_cache(self.cache, "KO03", ["A"], sap)
+        resultado = consulta_com_cache(self.cache, "KO03", ["A", "B", "C", "B"], sap)
+        self.assertEqual(resultado, {"A": "1", "B": "2", "C": "3"})
+        self.assertEqual(sap.chamadas, [["A"], ["B", "C"]])
+
+    def test_transacoes_separadas(self):
+        consulta_com_cache(self.cache, "KO03", ["A"], _ConsultaFake({"A": "ordem"}))
+        sap = _ConsultaFake({"A": "centro"})
+        self.assertEqual(consulta_com_cache(self.cache, "KS13", ["A"], sap), {"A": "centro"})
+        self.assertEqual(sap.chamadas, [["A"]])
+
+    def test_negativo(self):
+        sap = _ConsultaFake({"A": "1"})
+        self.assertEqual(consulta_com_cache(self.cache, "YSRELCONT", ["A", "X"], sap), {"A": "1"})
+        self.assertEqual(consulta_com_cache(self.cache, "YSRELCONT", ["A", "X"], sap), {"A": "1"})
+        self.assertEqual(sap.chamadas, [["A", "X"]])
+        self.assertEqual(self.cache.estatisticas()["YSRELCONT"]["negativos"], 1)
+
+    def test_ttl(self):
+        sap = _ConsultaFake({"A": "1"})
+        consulta_com_cache(self.cache, "KS13", ["A", "X"], sap)
+
+        # negativo (30 min) vence antes do positivo (1 h)
+        with self._no_futuro(45 * 60):
+            consulta_com_cache(self.cache, "KS13", ["A", "X"], sap)
+        self.assertEqual(sap.chamadas, [["A", "X"], ["X"]])
+
+        with self._no_futuro(2 * 3600):
+            self.assertEqual(consulta_com_cache(self.cache, "KS13", ["A", "X"], sap), {"A": "1"})
+        self.assertEqual(sap.chamadas[-1], ["A", "X"])
+
+    def test_persistente(self):
+        consulta_com_cache(self.cache, "KS13", ["A"], _ConsultaFake({"A": "1"}))
+        outro = CacheConsultas(self.caminho)
+        try:
+            sap = _ConsultaFake({})
+            self.assertEqual(consulta_com_cache(outro, "KS13", ["A"], sap), {"A": "1"})
+            self.assertEqual(sap.chamadas, [])
+        finally:
+            outro.close()
+
+    def test_falha_nao_grava(self):
+        falha = _ConsultaFake({}, resposta=lambda chaves: None)
+        self.assertEqual(consulta_com_cache(self.cache, "KO03", ["A"], falha), {})
+        sap = _ConsultaFake({"A": "1"})
+        self.assertEqual(consulta_com_cache(self.cache, "KO03", ["A"], sap), {"A": "1"})
+        self.assertEqual(sap.chamadas, [["A"]])
+
+    def test_resposta_parcial_nao_vira_negativo(self):
+        # "B" deu erro no meio da leitura; "C" o SAP leu e não achou
+        parcial = _ConsultaFake({}, resposta=lambda chaves: RespostaParcial({"A": "1"}, nao_confirmadas={"B"}))
+        self.assertEqual(consulta_com_cache(self.cache, "KO03", ["A", "B", "C"], parcial), {"A": "1"})
+
+        sap = _ConsultaFake({"A": "1", "B": "2", "C": "3"})
+        self.assertEqual(consulta_com_cache(self.cache, "KO03", ["A", "B", "C"], sap), {"A": "1", "B": "2"})
+        self.assertEqual(sap.chamadas, [["B"]])
+
+    def test_une_respostas(self):
+        unido = une_respostas([
+            RespostaParcial({"A": "1"}, nao_confirmadas={"B"}),
+            {"C": "3"},
+            RespostaParcial({"D": "4"}, nao_confirmadas={"E"}),
+        ])
+        self.assertEqual(unido, {"A": "1", "C": "3", "D": "4"})
+        self.assertEqual(nao_confirmadas(unido), {"B", "E"})
+
+        completo = une_respostas([{"A": "1"}, {"B": "2"}])
+        self.assertIs(type(completo), dict)
+        self.assertEqual(nao_confirmadas(completo), set())
+        self.assertEqual(nao_confirmadas(None), set())
+
+    def test_limpa(self):
+        sap = _ConsultaFake({"A": "1"})
+        consulta_com_cache(self.cache, "KS13", ["A"], sap)
+        consulta_com_cache(self.cache, "KO03", ["A"], sap)
+        self.cache.limpa("KS13")
+        consulta_com_cache(self.cache, "KS13", ["A"], sap)
+        consulta_com_cache(self.cache, "KO03", ["A"], sap)
+        self.assertEqual(sap.chamadas, [["A"], ["A"], ["A"]])
+
+
+class SnapshotDadosMestresTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.snapshot = SnapshotDadosMestres(Path(self._tmp.name) / "dados_mestres.sqlite3")
+
+    def tearDown(self):
+        self.snapshot.close()
+        self._tmp.cleanup()
+
+    def _sincroniza(self, buscadores, fontes=(FONTE_CONTRATOS,)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sincroniza(None, self.snapshot, fontes=fontes, buscadores=buscadores)
+
+    def test_aplica_e_diffs(self):
+        v1 = self.snapshot.aplica(FONTE_CONTRATOS, {"4600000001": "ANA", " 4600000002 ": " BRUNO ", "": "x"})
+        self.assertEqual((v1.total, v1.inseridos, v1.alterados, v1.removidos), (2, 2, 0, 0))
+        self.assertEqual(self.snapshot.tabela(FONTE_CONTRATOS), {"4600000001": "ANA", "4600000002": "BRUNO"})
+
+        v2 = self.snapshot.aplica(FONTE_CONTRATOS, {"4600000001": "CARLA", "4600000003": "DANI"})
+        self.assertEqual((v2.total, v2.inseridos, v2.alterados, v2.removidos), (2, 1, 1, 1))
+        self.assertEqual(self.snapshot.versao_atual(FONTE_CONTRATOS), v2.versao)
+
+        self.assertEqual(
+            sorted(self.snapshot.diffs(FONTE_CONTRATOS, desde_versao=v1.versao)),
+            sorted([
+                (v2.versao, "4600000003", "I", None, "DANI"),
+                (v2.versao, "4600000001", "U", "ANA", "CARLA"),
+                (v2.versao, "4600000002", "D", "BRUNO", None),
+            ]),
+        )
+        self.assertEqual(len(self.snapshot.diffs(FONTE_CONTRATOS)), 5)
+
+        # mesma extração de novo: versão nova, nenhuma diferença gravada
+        v3 = self.snapshot.aplica(FONTE_CONTRATOS, {"4600000001": "CARLA", "4600000003": "DANI"})
+        self.assertEqual((v3.inseridos, v3.alterados, v3.removidos), (0, 0, 0))
+        self.assertEqual(self.snapshot.diffs(FONTE_CONTRATOS, desde_versao=v2.versao), [])
+
+    def test_fontes_separadas(self):
+        self.snapshot.aplica(FONTE_CONTRATOS, {"A": "1"})
+        self.snapshot.aplica(FONTE_CENTROS, {"A": "centro"})
+        self.assertEqual(self.snapshot.consulta(FONTE_CONTRATOS, ["A", "B"]), {"A": "1"})
+        self.assertEqual(self.snapshot.consulta(FONTE_CENTROS, ["A"]), {"A": "centro"})
+
+    def test_sincroniza_com_buscador_fake(self):
+        chamadas = []
+
+        def contratos(session):
+            chamadas.append(session)
+            return {"4600000001": "ANA"}
+
+        def centros(session):
+            raise RuntimeError("tela inesperada")
+
+        resultados = self._sincroniza({FONTE_CONTRATOS: contratos, FONTE_CENTROS: centros},
+                                      fontes=(FONTE_CONTRATOS, FONTE_CENTROS))
+        self.assertEqual([r.fonte for r in resultados], [FONTE_CONTRATOS, FONTE_CENTROS])
+        self.assertIsNotNone(resultados[0].versao)
+        self.assertIsNone(resultados[1].versao)
+        self.assertEqual(chamadas, [None])
+        self.assertTrue(self.snapshot.disponivel(FONTE_CONTRATOS))
+        self.assertFalse(self.snapshot.disponivel(FONTE_CENTROS))
+
+    def test_extracao_vazia_mantem_versao_anterior(self):
+        self._sincroniza({FONTE_CONTRATOS: lambda s: {"A": "1"}})
+        versao = self.snapshot.versao_atual(FONTE_CONTRATOS)
+        for falha in (lambda s: {}, lambda s: None):
+            resultado, = self._sincroniza({FONTE_CONTRATOS: falha})
+            self.assertIsNone(resultado.versao)
+        self.assertEqual(self.snapshot.versao_atual(FONTE_CONTRATOS), versao)
+        self.assertEqual(self.snapshot.tabela(FONTE_CONTRATOS), {"A": "1"})
+
+    def test_disponivel_pela_idade(self):
+        self.assertFalse(self.snapshot.disponivel(FONTE_CONTRATOS))
+        self.snapshot.aplica(FONTE_CONTRATOS, {"A": "1"})
+        self.assertTrue(self.snapshot.disponivel(FONTE_CONTRATOS, idade_maxima_horas=1))
+        relogio = mock.Mock()
+        relogio.time.return_value = time.time() + 2 * 3600
+        with mock.patch("backend.sap_manager.snapshot.time", relogio):
+            self.assertFalse(self.snapshot.disponivel(FONTE_CONTRATOS, idade_maxima_horas=1))
+
+    def test_chaves_fora_do_snapshot_seguem_para_o_sap(self):
+        self.snapshot.aplica(FONTE_CENTROS, {"E1": "GER1", "E2": "GER2"})
+        with contextlib.redirect_stdout(io.StringIO()):
+            achadas, restantes = _pelo_snapshot(self.snapshot, FONTE_CENTROS, ["E1", "E3", "E2", "E3", "E4"])
+        self.assertEqual(achadas, {"E1": "GER1", "E2": "GER2"})
+        self.assertEqual(restantes, ["E3", "E4"])
+
+        self.assertEqual(_pelo_snapshot(None, FONTE_CENTROS, ["E1", "E1"]), ({}, ["E1"]))
+
+
+class _SessaoComFalha(SessaoSimulada):
+    """SessaoSimulada em que executar a KO03 de certas ordens dá erro de GUI."""
+
+    def __init__(self, dados, ordens_com_erro):
+        super().__init__(dados)
+        self.ordens_com_erro = set(ordens_com_erro)
+
+    def _chama(self, operacao, id_, *args):
+        if operacao == "press" and id_ == "wnd[0]/tbar[1]/btn[42]":
+            if self._telas.campos.get(ko03._KO03_ORDEM) in self.ordens_com_erro:
+                raise ErroSimulado("sessão ocupada")
+        return super()._chama(operacao, id_, *args)
+
+
+class Ko03LoteTests(unittest.TestCase):
+    """Leitura em lote da AUFK (SE16N) contra a KO03 ordem a ordem, no simulador."""
+
+    def setUp(self):
+        self.dados = DadosSimulados.sinteticos(n_contratos=10, n_centros=40, n_ordens=60, semente=7)
+        # 45 ordens do "SAP" + uma que não existe lá
+        self.ordens = self.dados.chaves_ordens()[:45] + ["OR999999999"]
+        self.esperado = {f"OR{n}": c for n, c in list(self.dados.ordens.items())[:45]}
+
+    def _executa(self, sessao, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return mede(sessao, ko03.executar_ko03, self.ordens, **kwargs)
+
+    def test_lote_igual_ordem_a_ordem(self):
+        lote, rel_lote = self._executa(SessaoSimulada(self.dados), lote=True)
+        por_ordem, rel_por_ordem = self._executa(SessaoSimulada(self.dados), lote=False)
+        self.assertEqual(dict(lote), self.esperado)
+        self.assertEqual(dict(por_ordem), self.esperado)
+        self.assertNotIn("KO03", rel_lote)
+        self.assertNotIn("SE16N", rel_por_ordem)
+
+    def test_varios_lotes(self):
+        sessao = SessaoSimulada(self.dados)
+        with mock.patch.object(se16n, "preenche_selecao", wraps=se16n.preenche_selecao) as preenche:
+            with sessao.esperas():
+                resultado = ko03.executar_ko03_lote(sessao, self.ordens, tamanho_lote=10)
+        self.assertEqual(resultado, self.esperado)
+        self.assertEqual([len(c.args[1]) for c in preenche.call_args_list], [10, 10, 10, 10, 6])
+
+    def test_lote_falhou_cai_na_ko03(self):
+        falha = mock.patch.object(ko03, "consulta_se16n", side_effect=ErroSimulado("sem autorização para AUFK"))
+        with falha:
+            resultado, relatorio = self._executa(SessaoSimulada(self.dados), lote=True)
+        self.assertEqual(dict(resultado), self.esperado)
+        self.assertIn("KO03", relatorio)
+        self.assertEqual(nao_confirmadas(resultado), set())
+
+    def test_erro_numa_ordem_fica_nao_confirmada(self):
+        com_erro = self.ordens[3]
+        sessao = _SessaoComFalha(self.dados, {com_erro[2:]})
+        with mock.patch.object(ko03, "consulta_se16n", side_effect=ErroSimulado("sem autorização para AUFK")):
+            resultado, _relatorio = self._executa(sessao, lote=True)
+        esperado = dict(self.esperado)
+        del esperado[com_erro]
+        self.assertEqual(dict(resultado), esperado)
+        # "OR999999999" o SAP leu e não achou; só a ordem com erro fica para a próxima consulta
+        self.assertEqual(nao_confirmadas(resultado), {com_erro})
+
+
+class _ClipboardFake:
+    """Faz o papel do win32clipboard: um texto só, e erro se usado sem OpenClipboard."""
+
+    CF_UNICODETEXT = 13
+
+    def __init__(self, texto=None):
+        self.texto = texto
+        self.aberto = False
+
+    def OpenClipboard(self):
+        self.aberto = True
+
+    def CloseClipboard(self):
+        self.aberto = False
+
+    def EmptyClipboard(self):
+        assert self.aberto
+        self.texto = None
+
+    def GetClipboardData(self, formato):
+        assert self.aberto
+        if self.texto is None:
+            raise TypeError("área de transferência vazia")
+        return self.texto
+
+    def SetClipboardText(self, texto, formato):
+        assert self.aberto
+        self.texto = texto
+
+
+class SelecaoMultiplaTests(unittest.TestCase):
+    """preenche_selecao nos três modos, na seleção múltipla da SE16N simulada."""
+
+    def setUp(self):
+        self.dados = DadosSimulados.sinteticos(n_contratos=10, n_centros=40, n_ordens=7_000, semente=11)
+        self.sessao = SessaoSimulada(self.dados)
+        self.clipboard = _ClipboardFake("texto do usuário")
+        patcher = mock.patch.dict(sys.modules, {"win32clipboard": self.clipboard})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _clipboard_no_sap(self):
+        """btn[24] do simulador lendo o clipboard fake (o simulador sozinho não tem área de transferência)."""
+        original = simulador._Telas._selecao_multipla
+        clipboard = self.clipboard
+
+        def selecao_multipla(telas, operacao, id_, janela):
+            if operacao == "press" and id_ == f"wnd[{janela}]/tbar[0]/btn[24]":
+                telas.selecao.extend(v.strip() for v in clipboard.texto.splitlines() if v.strip())
+                return True
+            return original(telas, operacao, id_, janela)
+
+        return mock.patch.object(simulador._Telas, "_selecao_multipla", selecao_multipla)
+
+    def _abre_selecao(self):
+        """SE16N da AUFK com o diálogo de seleção múltipla do AUFNR aberto em wnd[1]."""
+        s = self.sessao
+        s.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16N"
+        s.findById("wnd[0]").sendVKey(0)
+        s.findById(se16n.TABELA).text = "AUFK"
+        s.findById("wnd[0]").sendVKey(0)
+        s.findById("wnd[0]/usr/tblSAPLSE16NSELFIELDS_TC/btnPUSH[4,0]").press()
+        # seleção que sobrou de uma execução anterior: preenche_selecao apaga
+        s._telas.selecao = ["000000000001"]
+
+    def _preenche(self, valores, modo):
+        self._abre_selecao()
+        with self.sessao.esperas(), contextlib.redirect_stdout(io.StringIO()):
+            usado = preenche_selecao(self.sessao, valores, janela=1, modo=modo)
+        return usado, list(self.sessao._telas.selecao)
+
+    def test_modos_carregam_os_mesmos_valores(self):
+        valores = list(self.dados.ordens)[:LIMITE_LOTE]
+        with self._clipboard_no_sap():
+            for modo in selecao_multipla.MODOS:
+                with self.subTest(modo=modo):
+                    self.assertEqual(self._preenche(valores, modo), (modo, valores))
+        self.assertEqual(self.clipboard.texto, "texto do usuário")
+        self.assertFalse(self.clipboard.aberto)
+
+    def test_lista_vazia(self):
+        self.assertEqual(self._preenche([], "arquivo"), ("vazio", []))
+
+    def test_clipboard_com_erro_restaura_e_digita(self):
+        # sem o patch, o btn[24] do simulador dá erro de GUI
+        valores = list(self.dados.ordens)[:50]
+        self.assertEqual(self._preenche(valores, "clipboard"), ("um_a_um", valores))
+        self.assertEqual(self.clipboard.texto, "texto do usuário")
+        self.assertFalse(self.clipboard.aberto)
+
+    def test_arquivo_com_erro_digita(self):
+        valores = list(self.dados.ordens)[:50]
+        with mock.patch.object(selecao_multipla, "_texto", side_effect=OSError("disco cheio")):
+            self.assertEqual(self._preenche(valores, "arquivo"), ("um_a_um", valores))
+
+    def test_lotes_de_ate_3000_valores(self):
+        ordens = self.dados.chaves_ordens()
+        esperado = {f"OR{n}": c for n, c in self.dados.ordens.items()}
+        resultados = {}
+        with self._clipboard_no_sap():
+            for modo in selecao_multipla.MODOS:
+                sessao = SessaoSimulada(self.dados)
+                ambiente = mock.patch.dict("os.environ", {"AUTOCL_SELECAO_MULTIPLA": modo})
+                preenche = mock.patch.object(se16n, "preenche_selecao", wraps=preenche_selecao)
+                with ambiente, preenche as chamadas, sessao.esperas():
+                    resultados[modo] = ko03.executar_ko03_lote(sessao, ordens + ordens[:10])
+                self.assertEqual([len(c.args[1]) for c in chamadas.call_args_list], [3000, 3000, 1000], modo)
+        for modo, resultado in resultados.items():
+            self.assertEqual(resultado, esperado, modo)
+
+
+class LeituraGradeTests(unittest.TestCase):
+    """le_grade pela exportação do ALV contra a leitura célula a célula, na SE16N simulada."""
+
+    def setUp(self):
+        self.dados = DadosSimulados.sinteticos(n_contratos=10, n_centros=40, n_ordens=200, semente=13)
+        self.ordens = list(self.dados.ordens)[:120]
+        self.esperado = [
+            {"AUFNR": n.zfill(12), "KOSTV": c} for n, c in self.dados.ordens.items() if n in set(self.ordens)
+        ]
+
+    def _consulta(self, modo=None):
+        sessao = SessaoSimulada(self.dados)
+        le_grade = mock.patch.object(
+            se16n, "le_grade", side_effect=lambda s, g, c: exportacao_alv.le_grade(s, g, c, modo=modo),
+        )
+        with le_grade, contextlib.redirect_stdout(io.StringIO()) as saida, sessao.esperas():
+            registros = se16n.consulta_se16n(sessao, "AUFK", 0, self.ordens, ("AUFNR", "KOSTV"))
+        return registros, sessao.relatorio()["SE16N"]["por_operacao"], saida.getvalue()
+
+    @staticmethod
+    def _exporta_sem_a_ultima_linha():
+        """Exportação que perde a última linha da grade (arquivo truncado)."""
+        original = simulador._Telas._exportacao
+
+        def exportacao(telas, operacao, id_, args):
+            grade = telas.grade
+            gravando = telas.popup == "exporta_arquivo"
+            if gravando:
+                telas.grade = grade[:-1]
+            try:
+                return original(telas, operacao, id_, args)
+            finally:
+                telas.grade = grade
+
+        return mock.patch.object(simulador._Telas, "_exportacao", exportacao)
+
+    def test_arquivo_igual_a_celulas(self):
+        por_arquivo, chamadas_arquivo, _ = self._consulta("arquivo")
+        por_celulas, chamadas_celulas, _ = self._consulta("celulas")
+        self.assertEqual(por_arquivo, self.esperado)
+        self.assertEqual(por_celulas, self.esperado)
+        self.assertNotIn("getCellValue", chamadas_arquivo)
+        self.assertEqual(chamadas_celulas["getCellValue"], 2 * len(self.esperado))
+
+    def test_linhas_diferentes_de_rowcount_le_celulas(self):
+        with self._exporta_sem_a_ultima_linha():
+            registros, chamadas, saida = self._consulta("arquivo")
+        self.assertEqual(registros, self.esperado)
+        self.assertEqual(chamadas["getCellValue"], 2 * len(self.esperado))
+        self.assertIn(f"arquivo com {len(self.esperado) - 1} linhas, grade com {len(self.esperado)}", saida)
+
+    def test_coluna_fora_do_layout_le_celulas(self):
+        sessao = SessaoSimulada(self.dados)
+        with sessao.esperas(), contextlib.redirect_stdout(io.StringIO()):
+            sessao.findById("wnd[0]/tbar[0]/okcd").text = "/nSE16N"
+            sessao.findById("wnd[0]").sendVKey(0)
+            sessao.findById(se16n.TABELA).text = "AUFK"
+            sessao.findById("wnd[0]").sendVKey(8)
+            registros = exportacao_alv.le_grade(sessao, se16n.GRADE, ("AUFNR", "OBJNR"), modo="arquivo")
+        self.assertEqual(len(registros), len(self.dados.ordens))
+        self.assertEqual({r["OBJNR"] for r in registros}, {""})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,58 +1,77 @@
-import time
+from backend.sap_manager.cache import consulta_com_cache
+from backend.sap_manager.espera import aguarda_tela
+from backend.sap_manager.exportacao_alv import le_grade
+from backend.sap_manager.selecao_multipla import lotes, preenche_selecao
 
-def executar_ysrelcont(session, contratos_unicos):
+_TIPO = "wnd[0]/usr/ctxtSC_BSART-LOW"
+_GRADE = "wnd[0]/usr/cntlGRID1/shellcont/shell"
+
+def executar_ysrelcont(session, contratos_unicos, cache=None):
     """Executa YSRELCONT no SAP e retorna dict {contrato: gerente}"""
+    if cache is not None:
+        # só vai ao SAP com as chaves ausentes/vencidas no cache local
+        return consulta_com_cache(cache, "YSRELCONT", contratos_unicos, lambda faltando: executar_ysrelcont(session, faltando))
+
     session.findById("wnd[0]/tbar[0]/okcd").text = "/nYSRELCONT"
     session.findById("wnd[0]").sendVKey(0)
-    time.sleep(1)
+    aguarda_tela(session, "YSRELCONT_inicio", qualquer=(_TIPO,))
 
     gerentes = {}
     contr_types = ["ZCVR", "ZCVM"]
 
     for contr_type in contr_types:
-        session.findById("wnd[0]/usr/ctxtSC_BSART-LOW").text = contr_type
-        session.findById("wnd[0]/usr/ctxtSC_EKORG-LOW").text = "0001"
-        session.findById("wnd[0]/usr/ctxtSC_EKORG-HIGH").text = "9999"
-
-        # Abre seleção de contratos
-        session.findById("wnd[0]/usr/btn%_SC_EBELN_%_APP_%-VALU_PUSH").press()
-        session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA").select()
-        session.findById("wnd[1]/tbar[0]/btn[16]").press()
-
-        for contrato in contratos_unicos:
-            campo = (
-                "wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/"
-                "ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE/"
-                "ctxtRSCSEL_255-SLOW_I[1,0]"
-            )
-            session.findById(campo).text = contrato
-            session.findById("wnd[1]/tbar[0]/btn[13]").press()
-
-        session.findById("wnd[1]/tbar[0]/btn[8]").press()
-        time.sleep(1)
-        try:
+        if contratos_unicos:
+            # contrato já achado no tipo anterior não volta para a seleção
+            restantes = [c for c in contratos_unicos if c not in gerentes]
+            if not restantes:
+                break
+            grupos = list(lotes(restantes))
+        else:
+            grupos = [[]]  # seleção vazia = todos os contratos do tipo
+
+        for grupo in grupos:
+            session.findById(_TIPO).text = contr_type
+            session.findById("wnd[0]/usr/ctxtSC_EKORG-LOW").text = "0001"
+            session.findById("wnd[0]/usr/ctxtSC_EKORG-HIGH").text = "9999"
+
+            # Abre seleção de contratos e carrega o lote de uma vez
+            session.findById("wnd[0]/usr/btn%_SC_EBELN_%_APP_%-VALU_PUSH").press()
+            session.findById("wnd[1]/usr/tabsTAB_STRIP/tabpSIVA").select()
+            preenche_selecao(session, grupo, janela=1)
+
             session.findById("wnd[1]/tbar[0]/btn[8]").press()
-        except Exception:
-            return None
-        time.sleep(2)
-
-        # Verifica popup “sem resultados”
-        try:
-            info_popup = session.findById("wnd[1]", False)
-            if info_popup:
-                session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                continue
-        except:
-            pass
-
-        table = session.findById("wnd[0]/usr/cntlGRID1/shellcont/shell")
-        for r in range(table.rowCount):
-            contrato = table.getCellValue(r, "EBELN").strip()
-            gerente = table.getCellValue(r, "GERENTE").strip()
-            if contrato not in gerentes:
-                gerentes[contrato] = gerente
-
-        session.findById("wnd[0]/tbar[0]/btn[3]").press()
-        time.sleep(1)
+            # popup de confirmação; sem ele o press abaixo falha como antes
+            aguarda_tela(session, "YSRELCONT_selecao", qualquer=("wnd[1]",), levanta=False)
+            try:
+                session.findById("wnd[1]/tbar[0]/btn[8]").press()
+            except Exception:
+                return None
+            # relatório rodando: termina na grade ou no popup "sem resultados"
+            aguarda_tela(session, "YSRELCONT_execucao", qualquer=(_GRADE, "wnd[1]"))
+
+            # Verifica popup “sem resultados”
+            try:
+                info_popup = session.findById("wnd[1]", False)
+                if info_popup:
+                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                    continue
+            except:
+                pass
+
+            # grade inteira exportada de uma vez (exportacao_alv.py)
+            for linha in le_grade(session, _GRADE, ("EBELN", "GERENTE")):
+                if linha["EBELN"] not in gerentes:
+                    gerentes[linha["EBELN"]] = linha["GERENTE"]
+
+            session.findById("wnd[0]/tbar[0]/btn[3]").press()
+            aguarda_tela(session, "YSRELCONT_voltar", qualquer=(_TIPO,))
 
     return gerentes
+
+
+def executar_ysrelcont_completo(session):
+    """
+    Todos os contratos ZCVR/ZCVM -> gerente (sincronização do snapshot).
+    Mesmo fluxo de executar_ysrelcont, com a seleção de contratos vazia.
+    """
+    return executar_ysrelcont(session, [])
@@ -9,6 +9,8 @@ import PathsForm from "./components/PathsForm"
 import RunSection from "./components/RunSection"
 import Avisos from "./components/Avisos"
 import CancelSection from "./components/CancelSection"
+import MetricasEtapas from "./components/MetricasEtapas"
+import ResumoTotais from "./components/ResumoTotais"
 import Footer from "./components/Footer"
 
 import type { Paths, RequestRow, Switches } from "./types/jobs"
@@ -64,7 +66,7 @@ export default function App() {
   const [jobId, setJobId] = useState<string | null>(null)
 
   // ✅ agora o hook expõe close() para parar SSE imediatamente
-  const { status, message, error, logs, done, close } = useJobSse(jobId)
+  const { status, message, error, logs, done, resumo, metricas, close } = useJobSse(jobId)
 
   const anySwitchOn = useMemo(() => Object.values(switches).some(Boolean), [switches])
 
@@ -194,6 +196,10 @@ export default function App() {
         logs={logs}
       />
 
+      {finalStatus?.ok && <ResumoTotais resumos={resumo} />}
+
+      {(isRunningUI || !!finalStatus) && <MetricasEtapas metricas={metricas} />}
+
       {showCancel && <CancelSection onCancel={onCancel} />}
 
       <Footer />
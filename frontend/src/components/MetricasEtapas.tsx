@@ -0,0 +1,60 @@
+// frontend/src/components/MetricasEtapas.tsx
+import type { MetricaEtapa } from "../types/jobs"
+
+type Props = { metricas: MetricaEtapa[] }
+
+const segundos = new Intl.NumberFormat("pt-BR", { minimumFractionDigits: 2, maximumFractionDigits: 2 })
+const inteiro = new Intl.NumberFormat("pt-BR")
+
+const opcional = (v: number | null | undefined, fmt: Intl.NumberFormat) => (v == null ? "—" : fmt.format(v))
+
+// Onde o tempo do job foi gasto: uma linha por etapa, na ordem em que terminaram
+export default function MetricasEtapas({ metricas }: Props) {
+    if (!metricas.length) return null
+
+    return (
+        <div id="metricasSection" className="mt-3 fade-toggle show">
+        <div className="table-container mb-3">
+            <h6 className="mb-2">
+            <i className="bi bi-speedometer2 me-2" />
+            Tempo por etapa
+            </h6>
+            <table className="table table-bordered table-sm">
+            <thead className="table-light">
+                <tr>
+                <th>Script</th>
+                <th>Arquivo</th>
+                <th>Etapa</th>
+                <th className="text-end">Tempo (s)</th>
+                <th className="text-end">Linhas</th>
+                <th className="text-end">Linhas/s</th>
+                <th className="text-end">Pico RSS (MB)</th>
+                </tr>
+            </thead>
+            <tbody>
+                {metricas.map((m, i) => (
+                <tr key={`${m.script}-${m.arquivo}-${m.etapa}-${i}`} className={m.script === "job" ? "fw-bold" : undefined}>
+                    <td>{m.script}</td>
+                    <td>{m.arquivo || "—"}</td>
+                    <td>
+                    {m.etapa}
+                    {m.memoizada && <span className="text-muted"> (reaproveitada)</span>}
+                    {m.esperas != null && (
+                        <span className="text-muted">
+                        {" "}({inteiro.format(m.esperas)} esperas, maior {segundos.format(m.maximo_s ?? 0)} s
+                        {!!m.esgotadas && `, ${inteiro.format(m.esgotadas)} esgotada(s)`})
+                        </span>
+                    )}
+                    </td>
+                    <td className="text-end">{segundos.format(m.segundos)}</td>
+                    <td className="text-end">{opcional(m.linhas, inteiro)}</td>
+                    <td className="text-end">{opcional(m.linhas_por_s, inteiro)}</td>
+                    <td className="text-end">{opcional(m.pico_rss_mb, inteiro)}</td>
+                </tr>
+                ))}
+            </tbody>
+            </table>
+        </div>
+        </div>
+    )
+}
@@ -0,0 +1,56 @@
+// frontend/src/components/ResumoTotais.tsx
+import type { ResumoReduzida } from "../types/jobs"
+
+type Props = { resumos: ResumoReduzida[] }
+
+const moeda = new Intl.NumberFormat("pt-BR", { minimumFractionDigits: 2, maximumFractionDigits: 2 })
+const inteiro = new Intl.NumberFormat("pt-BR")
+
+// Totais por Tipo de Gasto de cada Reduzida (o cubo completo fica em x_Reduzida_Resumo.xlsx)
+export default function ResumoTotais({ resumos }: Props) {
+    if (!resumos.length) return null
+
+    return (
+        <div id="resumoSection" className="mt-3 fade-toggle show">
+        {resumos.map((r) => (
+            <div key={r.arquivo} className="table-container mb-3">
+            <h6 className="mb-2">
+                <i className="bi bi-bar-chart me-2" />
+                {r.arquivo} — {inteiro.format(r.linhas)} linhas
+            </h6>
+            <table className="table table-bordered table-sm">
+                <thead className="table-light">
+                <tr>
+                    <th>Tipo de Gasto</th>
+                    {r.medidas.map((m) => (
+                    <th key={m} className="text-end">{m}</th>
+                    ))}
+                    <th className="text-end">Linhas</th>
+                </tr>
+                </thead>
+                <tbody>
+                {r.por_tipo_gasto.map((linha) => (
+                    <tr key={String(linha["Tipo de Gasto"])}>
+                    <td>{String(linha["Tipo de Gasto"]) || "(vazio)"}</td>
+                    {r.medidas.map((m) => (
+                        <td key={m} className="text-end">{moeda.format(Number(linha[m] ?? 0))}</td>
+                    ))}
+                    <td className="text-end">{inteiro.format(linha.Linhas)}</td>
+                    </tr>
+                ))}
+                </tbody>
+                <tfoot>
+                <tr className="fw-bold">
+                    <td>Total</td>
+                    {r.medidas.map((m) => (
+                    <td key={m} className="text-end">{moeda.format(r.total[m] ?? 0)}</td>
+                    ))}
+                    <td className="text-end">{inteiro.format(r.linhas)}</td>
+                </tr>
+                </tfoot>
+            </table>
+            </div>
+        ))}
+        </div>
+    )
+}
@@ -1,6 +1,8 @@
 // frontend/src/hooks/useJobSse.ts
 import { useCallback, useEffect, useRef, useState } from "react"
 
+import type { MetricaEtapa, ResumoReduzida } from "../types/jobs"
+
 type JobStatus = "queued" | "running" | "success" | "error" | "canceled"
 
 export function useJobSse(jobId: string | null) {
@@ -9,6 +11,8 @@ export function useJobSse(jobId: string | null) {
     const [error, setError] = useState<string | null>(null)
     const [logs, setLogs] = useState<string[]>([])
     const [done, setDone] = useState(false)
+    const [resumo, setResumo] = useState<ResumoReduzida[]>([])
+    const [metricas, setMetricas] = useState<MetricaEtapa[]>([])
 
     const esRef = useRef<EventSource | null>(null)
 
@@ -22,6 +26,8 @@ export function useJobSse(jobId: string | null) {
     useEffect(() => {
         // reset ao iniciar novo job
         setLogs([])
+        setResumo([])
+        setMetricas([])
         setDone(false)
         setError(null)
         setMessage("")
@@ -58,6 +64,20 @@ export function useJobSse(jobId: string | null) {
         setLogs((prev) => [...prev, line])
         })
 
+        es.addEventListener("resumo", (ev: MessageEvent) => {
+        try {
+            const data = JSON.parse(ev.data)
+            if (Array.isArray(data)) setResumo(data)
+        } catch {}
+        })
+
+        es.addEventListener("metric", (ev: MessageEvent) => {
+        try {
+            const data = JSON.parse(ev.data)
+            if (data?.etapa) setMetricas((prev) => [...prev, data])
+        } catch {}
+        })
+
         es.addEventListener("done", (ev: MessageEvent) => {
         try {
             const data = JSON.parse(ev.data)
@@ -77,5 +97,5 @@ export function useJobSse(jobId: string | null) {
         return () => close()
     }, [jobId, close])
 
-    return { status, message, error, logs, done, close }
+    return { status, message, error, logs, done, resumo, metricas, close }
 }
\ No newline at end of file
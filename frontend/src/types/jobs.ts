@@ -29,4 +29,36 @@ export type Paths = {
     path4: string
     path5: string
     path6: string
-}
\ No newline at end of file
+}
+
+// Totais de uma Reduzida (backend/reports/resumo.py -> x_Reduzida_Resumo.json)
+export type LinhaResumo = {
+    [coluna: string]: string | number
+    Linhas: number
+}
+
+export type ResumoReduzida = {
+    arquivo: string
+    medidas: string[]
+    linhas: number
+    total: Record<string, number>
+    por_tipo_gasto: LinhaResumo[]
+    por_disciplina: LinhaResumo[]
+}
+
+// evento SSE "metric": uma etapa de um script (reports/metricas.py) ou do job (JobRunner)
+export type MetricaEtapa = {
+    script: string
+    arquivo: string
+    etapa: string
+    segundos: number
+    linhas?: number | null
+    linhas_por_s?: number | null
+    pico_rss_mb?: number | null
+    ok?: boolean
+    memoizada?: boolean
+    // etapas "espera_<rótulo>": esperas pelo SAP
+    esperas?: number
+    maximo_s?: number
+    esgotadas?: number
+}